@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+"""Compares the results of two runs of `dayabay-benchmark.py`.
+
+The time of each benchmark is compared to the reference. The script exits with non-zero
+status if any of the benchmarks is slower than the reference by more than the threshold or
+exceeds its budget, e.g. the time of `import dayabay_model` is above `IMPORT_TIME_BUDGET`.
+
+Usage:
+- Compare the results with the reference, allow 20% slowdown:
+$ ./extras/scripts/dayabay-benchmark-compare.py output/benchmark_reference.json \
+                                                output/benchmark.json \
+                                                --threshold 0.2
+"""
+
+from __future__ import annotations
+
+from argparse import Namespace
+from sys import exit
+
+from dayabay_model.tools.benchmark import compare_benchmarks, load_benchmarks
+
+
+def main(opts: Namespace) -> int:
+    reference = load_benchmarks(opts.reference)
+    current = load_benchmarks(opts.current)
+
+    for title, results in (("Reference", reference), ("Current", current)):
+        meta = results["meta"]
+        versions = ", ".join(f"{name} {value}" for name, value in meta["versions"].items())
+        print(f"{title}: {meta['time']}, Python {meta['python']}, {versions}")
+
+    rows = compare_benchmarks(reference, current, threshold=opts.threshold, key=opts.key)
+
+    print(f"{'benchmark':<24s} {'reference, s':>14s} {'current, s':>14s} {'ratio':>8s}  status")
+    for row in rows:
+        reference_str = "" if row["reference"] is None else f"{row['reference']:.6f}"
+        current_str = "" if row["current"] is None else f"{row['current']:.6f}"
+        ratio_str = "" if row["ratio"] is None else f"{row['ratio']:.3f}"
+        print(
+            f"{row['name']:<24s} {reference_str:>14s} {current_str:>14s} {ratio_str:>8s}"
+            f"  {row['status']}"
+        )
+
+    regressions = [row["name"] for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+
+    over_budget = [row["name"] for row in rows if row["status"] == "over budget"]
+    if over_budget:
+        print(f"Over budget: {', '.join(over_budget)}")
+
+    return 1 if regressions or over_budget else 0
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Compare the results of the Daya Bay model benchmarks")
+    parser.add_argument("reference", help="JSON file with the reference results")
+    parser.add_argument("current", help="JSON file with the results to check")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="maximal allowed relative slowdown",
+    )
+    parser.add_argument(
+        "--key",
+        default="median",
+        choices=("min", "median"),
+        help="time per iteration to compare",
+    )
+
+    exit(main(parser.parse_args()))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+"""Measures the performance of the model and saves the results to a JSON file.
+
+The construction of the model for each source type, the evaluation of the statistic after a
+change of the oscillation or nuisance parameter, the update of the covariance matrices and
+the generation of the pseudo-experiments are timed. The peak memory usage is measured as
+well. The results of two runs may be compared with `dayabay-benchmark-compare.py`. The script
+exits with non-zero status if any of the benchmarks exceeds its budget, e.g. the time of
+`import dayabay_model` is above `IMPORT_TIME_BUDGET`.
+
+Usage:
+- Run the benchmarks for the hdf5 and npz data:
+$ ./extras/scripts/dayabay-benchmark.py --source-types hdf5 npz \
+                                        --output output/benchmark.json
+"""
+
+from __future__ import annotations
+
+from argparse import Namespace
+from sys import exit
+
+from dag_modelling.tools.logger import set_verbosity
+
+from dayabay_model.tools.benchmark import check_budgets, run_benchmarks, save_benchmarks
+
+
+def main(opts: Namespace) -> int:
+    if opts.verbose:
+        set_verbosity(opts.verbose)
+
+    results = run_benchmarks(
+        source_types=opts.source_types,
+        path_data=opts.path_data,
+        repeat=opts.repeat,
+        ntoys=opts.ntoys,
+        statistic=opts.statistic,
+        model_options={
+            "concatenation_mode": opts.concatenation_mode,
+            "jacobian_mode": opts.jacobian_mode,
+        },
+    )
+
+    for name, benchmark in results["benchmarks"].items():
+        print(
+            f"{name:<24s} {benchmark['median']:12.6f} s (min {benchmark['min']:.6f} s,"
+            f" peak RSS {benchmark['peak_rss_mib']:.1f} MiB,"
+            f" +{benchmark['peak_rss_increase_mib']:.1f} MiB)"
+        )
+
+    save_benchmarks(results, opts.output)
+
+    over_budget = check_budgets(results)
+    if over_budget:
+        print(f"Over budget: {', '.join(over_budget)}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Measure the performance of the Daya Bay model")
+    parser.add_argument("-v", "--verbose", default=1, action="count", help="verbosity level")
+    parser.add_argument(
+        "--path-data",
+        default="dayabay-data-official",
+        help="path to the directory with the data of each source type",
+    )
+    parser.add_argument(
+        "--source-types",
+        nargs="+",
+        default=["hdf5"],
+        choices=("tsv", "hdf5", "root", "npz", "compiled"),
+        help="source types to build the model for",
+    )
+
+    benchmark = parser.add_argument_group("benchmark", "benchmark related options")
+    benchmark.add_argument("--repeat", type=int, default=5, help="number of repetitions")
+    benchmark.add_argument(
+        "--ntoys", type=int, default=20, help="number of pseudo-experiments per repetition"
+    )
+    benchmark.add_argument(
+        "--statistic",
+        default="statistic.full.pull.chi2cnp",
+        help="statistic to evaluate (relative to `outputs`)",
+    )
+
+    model = parser.add_argument_group("model", "model related options")
+    model.add_argument(
+        "--concatenation-mode",
+        default="detector_period",
+        choices=["detector", "detector_period"],
+        help="choose the concatenation mode",
+    )
+    model.add_argument(
+        "--jacobian-mode",
+        default="numerical",
+        choices=["numerical", "forward"],
+        help="method to compute the Jacobians for the covariance matrices",
+    )
+
+    output = parser.add_argument_group("output", "control the ouputs")
+    output.add_argument("-o", "--output", required=True, help="JSON file to save the results")
+
+    exit(main(parser.parse_args()))
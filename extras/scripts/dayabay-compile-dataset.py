@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+"""Converts the dataset of any source type to the compiled dataset.
+
+The compiled dataset contains a single uncompressed file `dataset.compiled` with all the
+arrays of the data files and an offset table. The model maps the file into memory and
+reads the arrays without copying or parsing. The `parameters` directory and the manifest
+`dataset_info.yaml` are copied, the format is set to `compiled`.
+
+Usage:
+- Convert the hdf5 dataset:
+$ ./extras/scripts/dayabay-compile-dataset.py dayabay-data-official/hdf5 \
+                                              output/dayabay-data-compiled
+- Use the compiled dataset:
+$ ./extras/scripts/dayabay-print-summary.py --path-data output/dayabay-data-compiled
+"""
+
+from __future__ import annotations
+
+from argparse import Namespace
+
+from dag_modelling.tools.logger import set_verbosity
+
+from dayabay_model.tools.compiled_dataset import compile_dataset
+
+
+def main(opts: Namespace) -> None:
+    if opts.verbose:
+        set_verbosity(opts.verbose)
+
+    path_container = compile_dataset(opts.path_data, opts.output)
+    print(f"{path_container!s}: {path_container.stat().st_size/1024**2:.1f} MiB")
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Convert the Daya Bay dataset to the compiled dataset")
+    parser.add_argument("-v", "--verbose", default=1, action="count", help="verbosity level")
+    parser.add_argument("path_data", help="path to the source dataset")
+    parser.add_argument("output", help="path to the compiled dataset")
+
+    main(parser.parse_args())
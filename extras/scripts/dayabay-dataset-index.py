@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+"""Writes or checks the index of the dataset.
+
+The index `dataset_index.yaml` lists all the files of the dataset with their sizes,
+modification times and SHA-256 hashes together with the source type. When the index is
+present, the model reads the source type from the index instead of walking the tree of the
+dataset if `dataset_info.yaml` is missing. The files are checked against the index only by
+this script.
+
+Usage:
+- Write the index:
+$ ./extras/scripts/dayabay-dataset-index.py data
+- Check the sizes and modification times of the files:
+$ ./extras/scripts/dayabay-dataset-index.py data --check
+- Check the content of the files:
+$ ./extras/scripts/dayabay-dataset-index.py data --check --check-hash
+"""
+
+from __future__ import annotations
+
+from argparse import Namespace
+from pathlib import Path
+
+from dag_modelling.tools.logger import set_verbosity
+
+from dayabay_model.tools.validate_dataset import (
+    DATASET_INDEX_NAME,
+    load_dataset_index,
+    validate_dataset_index,
+    write_dataset_index,
+)
+
+
+def main(opts: Namespace) -> None:
+    if opts.verbose:
+        set_verbosity(opts.verbose)
+
+    path_data = Path(opts.path_data)
+    if not opts.check:
+        write_dataset_index(path_data)
+        return
+
+    index = load_dataset_index(path_data)
+    if index is None:
+        raise RuntimeError(f"{DATASET_INDEX_NAME} not found in {path_data!s}")
+
+    modified = validate_dataset_index(path_data, index, check_hash=opts.check_hash)
+    for name in modified:
+        print(f"Modified: {name}")
+    if modified:
+        raise SystemExit(1)
+    print(f"{len(index['files'])} files are consistent with {DATASET_INDEX_NAME}")
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Write or check the index of the Daya Bay dataset")
+    parser.add_argument("-v", "--verbose", default=1, action="count", help="verbosity level")
+    parser.add_argument("path_data", help="Path to data")
+    parser.add_argument(
+        "--check", action="store_true", help="check the files against the index instead of writing"
+    )
+    parser.add_argument(
+        "--check-hash", action="store_true", help="check the content of the files, not only stat"
+    )
+
+    main(parser.parse_args())
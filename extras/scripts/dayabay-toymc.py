@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+"""Generates pseudo-experiments (ToyMC) in parallel and saves the chosen outputs.
+
+Each worker process builds its own model. The seed of each pseudo-experiment is spawned from
+the master seed based on its index, so the result does not depend on the number of workers.
+
+Supported formats: npz and hdf5.
+
+Usage:
+- Generate 1000 pseudo-experiments with 4 processes and save χ² CNP values:
+$ ./extras/scripts/dayabay-toymc.py --ntoys 1000 --nworkers 4 \
+                                    --outputs statistic.stat.chi2cnp \
+                                    --output output/toymc.hdf5
+"""
+
+from __future__ import annotations
+
+from argparse import Namespace
+
+from dag_modelling.tools.logger import set_verbosity
+from dag_modelling.tools.save_matrices import save_matrices
+
+from dayabay_model.tools.toymc import run_toymc
+
+
+def main(opts: Namespace) -> None:
+    if opts.verbose:
+        set_verbosity(opts.verbose)
+
+    result = run_toymc(
+        opts.ntoys,
+        opts.outputs,
+        seed=opts.seed,
+        nworkers=opts.nworkers,
+        chunk_size=opts.chunk_size,
+        model_options={
+            "path_data": opts.path_data,
+            "monte_carlo_mode": opts.mc_mode,
+            "parameter_values": dict(opts.par),
+            "shared_data": opts.shared_data,
+        },
+        mc_parameters=not opts.no_mc_parameters,
+        mc_statistics=not opts.no_mc_statistics,
+    )
+
+    save_matrices(result, opts.output)
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Generate Daya Bay pseudo-experiments")
+    parser.add_argument("-v", "--verbose", default=1, action="count", help="verbosity level")
+    parser.add_argument(
+        "--path-data",
+        default=None,
+        help="Path to data",
+    )
+
+    toymc = parser.add_argument_group("toymc", "pseudo-experiments related options")
+    toymc.add_argument("--ntoys", type=int, required=True, help="number of pseudo-experiments")
+    toymc.add_argument("--seed", type=int, default=0, help="master seed")
+    toymc.add_argument("--nworkers", type=int, default=1, help="number of processes")
+    toymc.add_argument("--chunk-size", type=int, default=100, help="pseudo-experiments per task")
+    toymc.add_argument(
+        "--shared-data",
+        default=None,
+        help="directory to share the constant model data between the processes, e.g. /dev/shm",
+    )
+    toymc.add_argument(
+        "--mc-mode",
+        default="poisson",
+        choices=("asimov", "normal-stats", "poisson"),
+        help="mode of fluctuation of the pseudo-data",
+    )
+    toymc.add_argument(
+        "--no-mc-parameters", action="store_true", help="do not fluctuate nuisance parameters"
+    )
+    toymc.add_argument(
+        "--no-mc-statistics", action="store_true", help="do not fluctuate pseudo-data"
+    )
+    toymc.add_argument(
+        "--outputs",
+        nargs="+",
+        default=["statistic.stat.chi2cnp"],
+        help="outputs to save (relative to `outputs`)",
+    )
+
+    output = parser.add_argument_group("output", "control the ouputs")
+    output.add_argument("-o", "--output", nargs="+", required=True, help="output files to save")
+
+    pars = parser.add_argument_group("pars", "setup pars")
+    pars.add_argument("--par", nargs=2, action="append", default=[], help="set parameter value")
+
+    main(parser.parse_args())
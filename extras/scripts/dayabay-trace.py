@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+"""Records the timeline of the model construction and evaluation to a Chrome trace file.
+
+The construction of the model is recorded with the loading of the data, the refine
+bundles, the closing of the graph, the setup of the labels and the evaluations of the nodes.
+Then the parameters are changed and the outputs are evaluated, each node invocation is
+recorded. The file may be opened by Perfetto (https://ui.perfetto.dev) or `chrome://tracing`.
+
+Usage:
+- Record the construction and a change of the mixing angle:
+$ ./extras/scripts/dayabay-trace.py --par survival_probability.SinSq2Theta13 0.09 \
+                                    --output output/trace.json
+"""
+
+from __future__ import annotations
+
+from argparse import Namespace
+from collections import Counter
+
+from dag_modelling.tools.logger import set_verbosity
+
+from dayabay_model.tools.trace import trace_model
+
+
+def main(opts: Namespace) -> None:
+    if opts.verbose:
+        set_verbosity(opts.verbose)
+
+    parameter_values = dict(opts.par) or {"survival_probability.SinSq2Theta13": 0.09}
+    _, recorder = trace_model(
+        opts.output,
+        parameter_values={name: float(value) for name, value in parameter_values.items()},
+        outputs=opts.outputs,
+        model_options={
+            "path_data": opts.path_data,
+            "concatenation_mode": opts.concatenation_mode,
+        },
+    )
+
+    categories = Counter(event["cat"] for event in recorder.events)
+    for category, count in sorted(categories.items()):
+        print(f"{category:<12s} {count:8d} events")
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Record the timeline of the Daya Bay model")
+    parser.add_argument("-v", "--verbose", default=1, action="count", help="verbosity level")
+    parser.add_argument(
+        "--path-data",
+        default=None,
+        help="Path to data",
+    )
+
+    model = parser.add_argument_group("model", "model related options")
+    model.add_argument(
+        "--concatenation-mode",
+        default="detector_period",
+        choices=["detector", "detector_period"],
+        help="choose the concatenation mode",
+    )
+    model.add_argument(
+        "--outputs",
+        nargs="+",
+        default=["statistic.full.pull.chi2cnp"],
+        help="outputs to evaluate (relative to `outputs`)",
+    )
+
+    output = parser.add_argument_group("output", "control the ouputs")
+    output.add_argument("-o", "--output", required=True, help="JSON file to save the trace")
+
+    pars = parser.add_argument_group("pars", "setup pars")
+    pars.add_argument("--par", nargs=2, action="append", default=[], help="set parameter value")
+
+    main(parser.parse_args())
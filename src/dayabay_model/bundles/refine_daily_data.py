@@ -0,0 +1,188 @@
+from collections.abc import Sequence
+
+from nested_mapping import NestedMapping
+from numpy import arange, argsort, array_equal, cumsum, full, isnan, repeat, searchsorted, stack
+from numpy.typing import NDArray
+
+# Bits of `n_det_mask` of the reactor data for each period
+_PERIOD_BITS = {"6AD": 0b001, "8AD": 0b010, "7AD": 0b100}
+
+
+def refine_daily_data(
+    detector_source: NestedMapping,
+    reactor_source: NestedMapping,
+    target: NestedMapping,
+    *,
+    detectors: Sequence[str],
+    reactors: Sequence[str],
+    periods: Sequence[str] = ("6AD", "8AD", "7AD"),
+    columns: Sequence[str] = ("livetime", "eff", "eff_livetime"),
+    skip: Sequence[set[str]] | None = None,
+    clean_source: bool = True,
+) -> None:
+    """Split the daily detector data and the weekly reactor data into synchronized daily
+    arrays for each period.
+
+    All the detectors share the same days, therefore the days are split into periods once: a
+    single stable sort by the period index and a split. Each column is then stacked for all
+    the detectors and split with the same order. The reactor data of all the reactors is
+    stacked as well, converted from weeks to days and synchronized with the detector days at
+    once for each period. The consistency checks are done once for all the detectors and
+    reactors, the operations are vectorized over the days.
+
+    The detector source contains for each detector the columns `day`, `n_det` and `columns`:
+        - day : int
+              number of the day since the start of the data taking, consecutive.
+        - n_det : int
+              number of active detectors (6, 8, 7 or 0).
+    The reactor source contains for each reactor the columns:
+        - period : int
+              number of the week, consecutive.
+        - day : int
+              number of the first day of the week.
+        - n_days : int
+              length of the week in days.
+        - n_det_mask : int
+              mask of the periods, covered by the week (0b001 for 6AD, 0b010 for 8AD and
+              0b100 for 7AD).
+        - neutrino_rate_per_s : float
+              average antineutrino rate during the week.
+
+    The target is populated as follows:
+        - `detector.days.{period}`: days of the period;
+        - `detector.{column}.{period}.{detector}`: daily detector data;
+        - `reactor.days.{period}`: days of the period, same as of the detector;
+        - `reactor.antineutrino_rate_per_s.{reactor}.{period}`: daily antineutrino rate.
+
+    Parameters
+    ----------
+    detector_source : NestedMapping
+        Daily detector data `{column}.{detector}`.
+    reactor_source : NestedMapping
+        Weekly reactor data `{column}.{reactor}`.
+    target : NestedMapping
+        Storage to write the arrays to.
+    detectors : Sequence[str]
+        Names of the detectors.
+    reactors : Sequence[str]
+        Names of the reactors.
+    periods : Sequence[str], default=("6AD", "8AD", "7AD")
+        Names of the periods to select.
+    columns : Sequence[str], default=("livetime", "eff", "eff_livetime")
+        Columns of the detector data to write.
+    skip : Sequence[set[str]] | None
+        Combinations of the period and detector, which are not written.
+    clean_source : bool, default=True
+        If True, remove the data from the sources.
+    """
+    detector_days = _refine_detector_data(
+        detector_source,
+        target,
+        detectors=detectors,
+        periods=periods,
+        columns=columns,
+        skip=skip,
+    )
+    _refine_reactor_data(reactor_source, target, detector_days, reactors=reactors, periods=periods)
+
+    if clean_source:
+        for source in (detector_source, reactor_source):
+            for key in tuple(source.walkkeys()):
+                source.delete_with_parents(key)
+
+
+def _stack_consistent(source: NestedMapping, column: str, names: Sequence[str]) -> NDArray:
+    """Return the column of the first item, check the column is the same for all the items."""
+    first = source[column, names[0]]
+    for name in names[1:]:
+        if not array_equal(source[column, name], first):
+            raise RuntimeError(f"Daily data `{column}` of {name} differs from {names[0]}")
+    return first
+
+
+def _refine_detector_data(
+    source: NestedMapping,
+    target: NestedMapping,
+    *,
+    detectors: Sequence[str],
+    periods: Sequence[str],
+    columns: Sequence[str],
+    skip: Sequence[set[str]] | None,
+) -> dict[str, NDArray]:
+    day = _stack_consistent(source, "day", detectors)
+    if not (day[1:] - day[:-1] == 1).all():
+        raise RuntimeError("Expect detector data for each day")
+    ndet = _stack_consistent(source, "n_det", detectors)
+
+    # Index of the period of each day, the days out of the periods are sorted to the end
+    nperiods = len(periods)
+    period_index = full(day.shape, nperiods)
+    for i, period in enumerate(periods):
+        period_index[ndet == int(period[0])] = i
+    order = argsort(period_index, kind="stable")
+    bounds = searchsorted(period_index[order], arange(nperiods + 1))
+
+    days = {}
+    for i, period in enumerate(periods):
+        days[period] = target["detector", "days", period] = day[order[bounds[i] : bounds[i + 1]]]
+
+    for column in columns:
+        data = stack([source[column, detector] for detector in detectors])[:, order]
+        for i, period in enumerate(periods):
+            data_p = data[:, bounds[i] : bounds[i + 1]]
+            for detector, data_pd in zip(detectors, data_p):
+                key = (column, period, detector)
+                if skip is not None and any(skipkey.issubset(key) for skipkey in skip):
+                    continue
+                target[("detector",) + key] = data_pd
+
+    return days
+
+
+def _refine_reactor_data(
+    source: NestedMapping,
+    target: NestedMapping,
+    detector_days: dict[str, NDArray],
+    *,
+    reactors: Sequence[str],
+    periods: Sequence[str],
+) -> None:
+    week = _stack_consistent(source, "period", reactors)
+    if not (week[1:] - week[:-1] == 1).all():
+        raise RuntimeError("Expect reactor data with distinct periods, no gaps")
+    day = _stack_consistent(source, "day", reactors)
+    ndays = _stack_consistent(source, "n_days", reactors)
+    n_det_mask = _stack_consistent(source, "n_det_mask", reactors)
+    rate = stack([source["neutrino_rate_per_s", reactor] for reactor in reactors])
+
+    for period in periods:
+        mask = (n_det_mask & _PERIOD_BITS[period]) > 0
+        ndays_p = ndays[mask]
+        # The first day of the week for each day and the number of the day within the week
+        first = repeat(day[mask], ndays_p)
+        offsets = repeat(cumsum(ndays_p) - ndays_p, ndays_p)
+        reactor_days = (first + (arange(first.size) - offsets)).astype("i")
+
+        detector_days_p = detector_days[period]
+        start = int(detector_days_p[0] - reactor_days[0])
+        stop = start + detector_days_p.size
+        if start < 0 or stop > reactor_days.size:
+            raise RuntimeError(
+                "Neutrino rate data is expected to start not later and end later then detector"
+                f" data. {period} got start/end for neutrino rate ({reactor_days[0]:.0f},"
+                f" {reactor_days[-1]:.0f}) and detector ({detector_days_p[0]:.0f},"
+                f" {detector_days_p[-1]:.0f})"
+            )
+        reactor_days = reactor_days[start:stop]
+        if not (reactor_days == detector_days_p).all():
+            raise RuntimeError(
+                f"Unable to synchronize neutrino rate and detector data for {period}"
+            )
+
+        rate_p = repeat(rate[:, mask], ndays_p, axis=1)[:, start:stop].astype("d", copy=False)
+        if isnan(rate_p).any():
+            raise ValueError(f"Invalid refined reactor data for {period}")
+
+        target["reactor", "days", period] = reactor_days
+        for reactor, rate_pr in zip(reactors, rate_p):
+            target["reactor", "antineutrino_rate_per_s", reactor, period] = rate_pr
@@ -1,20 +1,28 @@
 from nested_mapping.nested_mapping import NestedMapping
-from numpy import arange, concatenate, linspace
+from numpy import arange, concatenate, empty, linspace, stack
 from numpy.typing import NDArray
-from scipy.interpolate import interp1d
 
 
 def refine_lsnl_data(storage: NestedMapping, *, xname: str, nominalname: str, **kwargs) -> None:
     xcoarse = storage[xname]
+    nominal = storage[nominalname]
 
     refiner = RefineGraph(xcoarse, **kwargs)
 
+    # All the curves share `xcoarse`, therefore they are refined together as a single 2D array
+    keys = []
+    inominal = None
     for key, ycoarse in storage.walkitems():
         if ycoarse is xcoarse:
             continue
+        if ycoarse is nominal:
+            inominal = len(keys)
+        keys.append(key)
+    assert inominal is not None, f"Nominal curve {nominalname} not found"
 
-        nominal = storage[nominalname]
-        storage[key] = refiner.process(ycoarse, nominal)
+    yfine = refiner.process_stack(stack([storage[key] for key in keys]), inominal)
+    for key, y in zip(keys, yfine):
+        storage[key] = y
 
     storage[xname] = refiner.xfine_extended
 
@@ -96,20 +104,31 @@ class RefineGraph:
         y: NDArray,
         nominal: NDArray,
     ) -> NDArray:
-        skip_diff = y is nominal
+        """Refine the curve `y`, the difference to `nominal` is returned unless `y` is
+        `nominal`. Both curves are defined on `xcoarse`."""
+        if y is nominal:
+            return self.process_stack(y[None, :], 0)[0]
+        return self.process_stack(stack((nominal, y)), 0)[1]
+
+    def process_stack(self, y: NDArray, inominal: int) -> NDArray:
+        """Refine the curves `y[i]`, defined on `xcoarse`.
+
+        The curves are processed together: a single spline is built for all the curves, the
+        extrapolation and the filter are applied along the last axis. The nominal curve
+        `y[inominal]` is returned refined, the other curves are returned as the differences
+        to the refined nominal curve.
+        """
         yabs = self._method_reltoabs(y)
         yfine = self._method_interpolate(yabs)
         yunbound = self._method_extrapolate(yfine)
 
-        if skip_diff:
-            return yunbound
+        ynominal = yunbound[inominal].copy()
+        ydiff = self._method_diff(ynominal, yunbound)
+        if self.savgol_filter_smoothen is not None:
+            ydiff = self._method_filter(ydiff)
+        ydiff[inominal] = ynominal
 
-        ydiff = self._method_diff(nominal, yunbound)
-        if self.savgol_filter_smoothen is None:
-            return ydiff
-
-        ydiff_smooth = self._method_filter(ydiff)
-        return ydiff_smooth
+        return ydiff
 
     def _method_reltoabs(self, yrel: NDArray) -> NDArray:
         return yrel * self.xcoarse
@@ -118,32 +137,24 @@ class RefineGraph:
         if self.refine_times == 1:
             return ycoarse.copy()
 
-        fcn = interp1d(
-            self.xcoarse,
-            ycoarse,
-            kind="cubic",
-            bounds_error=False,
-            fill_value="extrapolate",
-        )
-        return fcn(self.xfine_bound)
+        from scipy.interpolate import make_interp_spline
+
+        spline = make_interp_spline(self.xcoarse, ycoarse, k=3, axis=-1, check_finite=False)
+        return spline(self.xfine_bound)
 
     def _method_extrapolate(self, ybound: NDArray) -> NDArray:
-        fcn = interp1d(
-            self.xfine_bound,
-            ybound,
-            kind="linear",
-            bounds_error=False,
-            fill_value="extrapolate",
-        )
-
-        xleft, _, xright = self.xfine_extended_stack
-        ystack = [None, ybound, None]
+        xleft, xbound, xright = self.xfine_extended_stack
+        ileft = 0 if xleft is None else xleft.size
+        iright = ileft + xbound.size
+
+        ret = empty(ybound.shape[:-1] + (self.xfine_extended.size,), dtype=ybound.dtype)
+        ret[..., ileft:iright] = ybound
         if xleft is not None:
-            ystack[0] = fcn(xleft)
+            ret[..., :ileft] = _extrapolate_linear(xleft, xbound[:2], ybound[..., :2])
         if xright is not None:
-            ystack[-1] = fcn(xright)
+            ret[..., iright:] = _extrapolate_linear(xright, xbound[-2:], ybound[..., -2:])
 
-        return concatenate(ystack)
+        return ret
 
     def _method_diff(self, nominal: NDArray, y: NDArray) -> NDArray:
         return nominal if nominal is y else y - nominal
@@ -155,4 +166,10 @@ class RefineGraph:
         from scipy.signal import savgol_filter
 
         npoints_coarse, deg = self.savgol_filter_smoothen
-        return savgol_filter(y, npoints_coarse * self.refine_times, deg)
+        return savgol_filter(y, npoints_coarse * self.refine_times, deg, axis=-1)
+
+
+def _extrapolate_linear(x: NDArray, xedge: NDArray, yedge: NDArray) -> NDArray:
+    """Extrapolate the curves `yedge[..., :2]` linearly from the points `xedge[:2]` to `x`."""
+    slope = (yedge[..., 1:] - yedge[..., :1]) / (xedge[1] - xedge[0])
+    return slope * (x - xedge[0]) + yedge[..., :1]
@@ -0,0 +1,50 @@
+from nested_mapping import NestedMapping
+
+
+def sum_daily_data(
+    reactor_data: NestedMapping,
+    detector_data: NestedMapping,
+    target: NestedMapping,
+) -> None:
+    """Sum the synchronized daily data over the days of each period.
+
+    The daily data enters the model only via its sums, the parameters scale the sums.
+    Therefore the sums may be computed once, and the daily arrays are not needed. Each sum
+    is stored as an array of a single element, the same way as `ArraySum` does:
+        - `detector.livetime.{period}.{detector}`: total livetime [s];
+        - `detector.eff_livetime.{period}.{detector}`: total effective livetime [s];
+        - `background.count_acc_fixed_s_day.{detector}.{period}`: accidental events
+          [#·s/day], sum of effective livetime times rate of accidentals [#/day];
+        - `reactor_detector.antineutrinos_eff_livetime.{reactor}.{detector}.{period}`: sum
+          of the antineutrino rate of the reactor [#/s] times effective livetime of the
+          detector [s].
+
+    Parameters
+    ----------
+    reactor_data : NestedMapping
+        Daily reactor data `antineutrino_rate_per_s.{reactor}.{period}`.
+    detector_data : NestedMapping
+        Daily detector data `{column}.{period}.{detector}`.
+    target : NestedMapping
+        Storage for the sums.
+    """
+    antineutrino_rate = reactor_data("antineutrino_rate_per_s")
+
+    for (period, detector), eff_livetime in detector_data("eff_livetime").walkitems():
+        livetime = detector_data["livetime", period, detector]
+        rate_accidentals = detector_data["rate_accidentals", period, detector]
+
+        target["detector", "livetime", period, detector] = livetime.sum(keepdims=True)
+        target["detector", "eff_livetime", period, detector] = eff_livetime.sum(keepdims=True)
+        target["background", "count_acc_fixed_s_day", detector, period] = (
+            eff_livetime * rate_accidentals
+        ).sum(keepdims=True)
+
+        for reactor, antineutrino_rate_r in antineutrino_rate.items():
+            antineutrino_rate_rp = antineutrino_rate_r[period]
+            assert (
+                antineutrino_rate_rp.shape == eff_livetime.shape
+            ), f"Reactor data for {reactor} is not synchronized with {detector} in {period}"
+            target["reactor_detector", "antineutrinos_eff_livetime", reactor, detector, period] = (
+                antineutrino_rate_rp * eff_livetime
+            ).sum(keepdims=True)
@@ -0,0 +1,10 @@
+from .axis_distortion_pointwise_product import AxisDistortionPointwiseProduct
+from .banded_vector_matrix_product import BandedMatrix, BandedVectorMatrixProduct
+from .cast import Cast
+from .rebin_segment_sum import RebinSegments, RebinSegmentSum
+from .single_precision import (
+    AxisDistortionMatrixPointwiseSingle,
+    EnergyResolutionSingle,
+    HistSmearNormalMatrixBCSingle,
+    RenormalizeDiagSingle,
+)
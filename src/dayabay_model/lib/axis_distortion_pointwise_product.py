@@ -0,0 +1,420 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from dag_modelling.core.input_strategy import AddNewInputAddNewOutput
+from dag_modelling.core.node import Node
+from dag_modelling.core.storage import NodeStorage
+from dag_modelling.core.type_functions import (
+    AllPositionals,
+    check_dimension_of_inputs,
+    check_inputs_have_same_dtype,
+    check_inputs_have_same_shape,
+    check_size_of_inputs,
+    evaluate_dtype_of_outputs,
+)
+from dag_modelling.lib.hist.axis_distortion_matrix_pointwise import _project_y_to_x_linear
+from numba import njit
+from numpy import digitize, empty, fabs, zeros
+
+if TYPE_CHECKING:
+    from dag_modelling.core.input import Input
+    from nested_mapping.nested_mapping import KeyLike
+    from numpy.typing import NDArray
+
+
+class AxisDistortionPointwiseProduct(Node):
+    """Apply the distortion of the X axis, given by a curve, to the histograms.
+
+    The node is equivalent to `AxisDistortionMatrixPointwise` followed by
+    `VectorMatrixProduct` in the column mode. The distortion matrix has only one or two
+    non-zero elements in each column, therefore it is not computed. Instead the non-zero
+    elements are computed directly from the distortion curve as (row, column, weight)
+    triplets, which are then applied to each histogram.
+
+    The triplets are recomputed only if any of the nodes of the edges or of the curve was
+    evaluated since the last computation. The triplets are shared by all the histograms of
+    the node. The weights are computed in the dtype of the edges, while the dtype of the
+    results follows the histograms, as for `VectorMatrixProduct`.
+
+    inputs:
+        `EdgesOriginal`: bin edges of the histogram (N+1 elements)
+        `EdgesTarget`: bin edges of the result, should be the same as `EdgesOriginal`
+        `DistortionOriginal`: X of the distortion curve
+        `DistortionTarget`: Y of the distortion curve
+        `0`, `1`, ... or `vector`: histograms (N elements)
+
+    outputs:
+        `0`, `1`, ... or `result`: distorted histograms (N elements)
+    """
+
+    __slots__ = (
+        "_edges_original",
+        "_edges_target",
+        "_distortion_original",
+        "_distortion_target",
+        "_rows",
+        "_columns",
+        "_weights",
+        "_nnz",
+        "_version",
+    )
+
+    _edges_original: Input
+    _edges_target: Input
+    _distortion_original: Input
+    _distortion_target: Input
+    _rows: NDArray
+    _columns: NDArray
+    _weights: NDArray
+    _nnz: int
+    _version: tuple[int, ...]
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault(
+            "input_strategy",
+            AddNewInputAddNewOutput(input_fmt="vector", output_fmt="result"),
+        )
+        super().__init__(*args, **kwargs)
+        self._labels.setdefault("mark", "D(x)@col(v)")
+        self._edges_original = self._add_input("EdgesOriginal", positional=False)
+        self._edges_target = self._add_input("EdgesTarget", positional=False)
+        self._distortion_original = self._add_input("DistortionOriginal", positional=False)
+        self._distortion_target = self._add_input("DistortionTarget", positional=False)
+        self._rows = empty(0, dtype="i8")
+        self._columns = empty(0, dtype="i8")
+        self._weights = empty(0)
+        self._nnz = 0
+        self._version = ()
+
+    @classmethod
+    def replicate(
+        cls,
+        *,
+        name: str,
+        replicate_outputs: tuple[KeyLike, ...] = ((),),
+        verbose: bool = False,
+        **kwargs,
+    ) -> tuple[AxisDistortionPointwiseProduct | None, NodeStorage]:
+        """Create a node for each value of the first element of the keys.
+
+        The histograms with the same first element of the key, e.g. of the same detector
+        during different periods, share the node and the distortion. The keyword inputs are
+        stored as `name.EdgesOriginal.key0`, etc., the histograms as `name.vector.key` and
+        the results as `name.key`. The node is stored as `name.key` for each key.
+        """
+        storage = NodeStorage(default_containers=True)
+        nodes = storage("nodes")
+        inputs = storage("inputs")
+        outputs = storage("outputs")
+
+        if not replicate_outputs:
+            raise RuntimeError("`replicate_outputs` tuple should have at least one item")
+
+        tuplename = (name,)
+        instances = {}
+        for key in replicate_outputs:
+            key = (key,) if isinstance(key, str) else tuple(key)
+            groupkey = key[:1]
+            if (instance := instances.get(groupkey)) is None:
+                instance = cls(".".join(tuplename + groupkey), **kwargs)
+                instances[groupkey] = instance
+                for iname, input in instance.inputs.iter_kw_items():
+                    inputs[tuplename + (iname,) + groupkey] = input
+
+            input = instance()
+            nodes[tuplename + key] = instance
+            inputs[tuplename + ("vector",) + key] = input
+            outputs[tuplename + key] = input.child_output
+
+        NodeStorage.update_current(storage, strict=True, verbose=verbose)
+
+        return (instance, storage) if len(instances) == 1 else (None, storage)
+
+    @property
+    def nnz(self) -> int:
+        """Number of the computed non-zero elements (triplets)."""
+        self._update_weights()
+        return self._nnz
+
+    def dense_matrix(self) -> NDArray:
+        """Return the distortion matrix as a dense array."""
+        self._update_weights()
+        nbins = self._edges_original.dd.shape[0] - 1
+        matrix = zeros((nbins, nbins), dtype=self._weights.dtype)
+        _expand_triplets(self._rows, self._columns, self._weights, self._nnz, matrix)
+        return matrix
+
+    def _update_weights(self) -> None:
+        """Compute the triplets if any of the inputs was recomputed since the last call."""
+        inputs = (
+            self._edges_original,
+            self._edges_target,
+            self._distortion_original,
+            self._distortion_target,
+        )
+        data = [input.data for input in inputs]
+        version = tuple(input.parent_node.n_calls for input in inputs)
+        if version == self._version:
+            return
+
+        while True:
+            nnz = _axis_distortion_pointwise_triplets(
+                *data, self._rows, self._columns, self._weights
+            )
+            if nnz >= 0:
+                break
+            # Not enough capacity, which may happen only for a non-monotonous curve
+            capacity = 2 * self._weights.size
+            self._rows = empty(capacity, dtype="i8")
+            self._columns = empty(capacity, dtype="i8")
+            self._weights = empty(capacity, dtype=self._weights.dtype)
+        self._nnz = nnz
+        self._version = version
+
+    def _function(self):
+        self._update_weights()
+        rows = self._rows
+        columns = self._columns
+        weights = self._weights
+        nnz = self._nnz
+        for column, outdata in zip(self.inputs.iter_data(), self.outputs.iter_data_unsafe()):
+            _product_triplets(rows, columns, weights, nnz, column, outdata)
+
+    def _type_function(self) -> None:
+        names_edges = ("EdgesOriginal", "EdgesTarget", "DistortionOriginal", "DistortionTarget")
+        check_dimension_of_inputs(self, names_edges, 1)
+        check_dimension_of_inputs(self, AllPositionals, 1)
+        check_inputs_have_same_dtype(self, names_edges)
+        (nedges,) = check_inputs_have_same_shape(self, names_edges[:2])
+        check_inputs_have_same_shape(self, names_edges[2:])
+        check_size_of_inputs(self, "EdgesOriginal", min=2)
+        check_size_of_inputs(self, "DistortionOriginal", min=2)
+        check_size_of_inputs(self, AllPositionals, exact=nedges - 1)
+        evaluate_dtype_of_outputs(self, AllPositionals, AllPositionals)
+
+        edges_target = self._edges_target.parent_output
+        for output in self.outputs:
+            output.dd.shape = (nedges - 1,)
+            output.dd.axes_edges = (edges_target,)
+
+        # For a monotonous curve each step of the walk advances the bin of X or Y
+        capacity = 2 * nedges + self._distortion_original.dd.shape[0]
+        dtype = self._edges_original.dd.dtype
+        self._rows = empty(capacity, dtype="i8")
+        self._columns = empty(capacity, dtype="i8")
+        self._weights = empty(capacity, dtype=dtype)
+        self._nnz = 0
+        self._version = ()
+
+
+@njit
+def _product_triplets(
+    rows: NDArray, columns: NDArray, weights: NDArray, nnz: int, column: NDArray, result: NDArray
+) -> None:
+    result[:] = 0.0
+    for k in range(nnz):
+        result[rows[k]] += weights[k] * column[columns[k]]
+
+
+@njit
+def _expand_triplets(
+    rows: NDArray, columns: NDArray, weights: NDArray, nnz: int, matrix: NDArray
+) -> None:
+    for k in range(nnz):
+        matrix[rows[k], columns[k]] += weights[k]
+
+
+@njit
+def _axis_distortion_pointwise_triplets(
+    edges_original: NDArray,
+    edges_target: NDArray,
+    distortion_original: NDArray,
+    distortion_target: NDArray,
+    rows: NDArray,
+    columns: NDArray,
+    weights: NDArray,
+) -> int:
+    """Compute the non-zero elements of the distortion matrix.
+
+    The walk over the bins and the curve is the same as in `AxisDistortionMatrixPointwise`
+    and uses its projection of Y to X, but each element is stored as a triplet (row, column,
+    weight) instead of being added to the dense matrix. An element may be stored several
+    times, the weights should be summed.
+
+    Returns
+    -------
+    int
+        Number of the triplets or -1 if the capacity of the arrays is not enough.
+    """
+    if distortion_original[0] >= edges_original[-1] or distortion_original[-1] < edges_original[0]:
+        return 0
+
+    capacity = weights.shape[0]
+    nnz = 0
+
+    n_bins_x = edges_original.size - 1
+    n_bins_y = edges_target.size - 1
+
+    n_points = distortion_original.size
+    idx_last_point = n_points - 1
+    last_x = distortion_original[idx_last_point]
+
+    large_negative_number = -1e30
+    large_positive_number = -large_negative_number
+
+    idx = 0
+    x0, x1 = distortion_original[idx], distortion_original[idx + 1]
+    y0, y1 = distortion_target[idx], distortion_target[idx + 1]
+
+    skip_incomplete_x = False
+    bin_idx_y = digitize(y0, edges_target, right=False) - 1
+    if bin_idx_y < 0:
+        bottom_y = large_negative_number
+        top_y = edges_target[0]
+    elif bin_idx_y < n_bins_x:
+        bottom_y = edges_target[bin_idx_y]
+        top_y = edges_target[bin_idx_y + 1]
+    else:
+        bottom_y = edges_target[-1]
+        top_y = large_positive_number
+
+    bin_idx_x = digitize(x0, edges_original, right=False) - 1
+    if bin_idx_x < 0:
+        left_x = large_negative_number
+        right_x = edges_original[0]
+        right = large_negative_number
+        left = large_negative_number
+
+        skip_incomplete_x = True
+    else:
+        left_x = edges_original[bin_idx_x]
+        right_x = edges_original[bin_idx_x + 1]
+
+        right = min(right_x, x1)
+        left = max(left_x, x0)
+
+        skip_incomplete_x = (x0 != left_x) & (y0 > bottom_y) & (y0 < top_y)
+    width_x_full = right_x - left_x
+
+    did_advance = True
+    while did_advance:
+        did_advance = False
+
+        passed_x = x1 >= right_x
+        passed_top_y = y1 >= top_y
+        passed_bottom_y = (y1 < bottom_y) & (y1 > large_negative_number)
+
+        assert not (
+            passed_bottom_y & passed_top_y
+        ), "Can not pass left and right edge on Y at the same time"
+
+        passed_any = False
+
+        passed_x_first = False
+        passed_top_y_first = False
+        passed_bottom_y_first = False
+
+        if passed_x:
+            passed_any = True
+            right = right_x
+            passed_x_first = True
+
+        if passed_top_y:
+            right_x_from_top_y = _project_y_to_x_linear(top_y, x0, x1, y0, y1)
+            if passed_any:
+                if right_x_from_top_y == right:
+                    passed_top_y_first = True
+                elif right_x_from_top_y <= right:
+                    passed_x_first = False
+                    passed_top_y_first = True
+
+                    right = right_x_from_top_y
+            else:
+                passed_top_y_first = True
+                right = right_x_from_top_y
+                passed_any = True
+        elif passed_bottom_y:
+            right_x_from_bottom_y = _project_y_to_x_linear(bottom_y, x0, x1, y0, y1)
+            if passed_any:
+                if right_x_from_bottom_y == right:
+                    passed_bottom_y_first = True
+                elif right_x_from_bottom_y < right:
+                    passed_x_first = False
+                    passed_bottom_y_first = True
+
+                    right = right_x_from_bottom_y
+            else:
+                passed_bottom_y_first = True
+                right = right_x_from_bottom_y
+                passed_any = True
+
+        if not passed_any:
+            idx += 1
+            if idx >= idx_last_point:
+                break
+
+            x0 = distortion_original[idx]
+            y0 = distortion_target[idx]
+            x1 = distortion_original[idx + 1]
+            y1 = distortion_target[idx + 1]
+            did_advance = True
+            assert x1 > x0, "Allow only ascending x"
+
+            continue
+
+        is_inside_limits = (not skip_incomplete_x) & (
+            (bin_idx_x >= 0) & (bin_idx_y >= 0) & (bin_idx_y < n_bins_y)
+        )
+        if is_inside_limits:
+            width_x_partial = fabs(right - left)
+            if width_x_partial != 0:
+                if nnz == capacity:
+                    return -1
+                rows[nnz] = bin_idx_y
+                columns[nnz] = bin_idx_x
+                weights[nnz] = width_x_partial / width_x_full
+                nnz += 1
+
+        skip_incomplete_x = False
+        if left < right:
+            left = right
+
+        if passed_x_first:
+            bin_idx_x += 1
+            if bin_idx_x >= n_bins_x:
+                break
+
+            left_x = edges_original[bin_idx_x]
+            did_advance = True
+            if left_x > last_x:
+                break
+
+            right_x = edges_original[bin_idx_x + 1]
+            width_x_full = right_x - left_x
+
+        if passed_top_y_first:
+            if bin_idx_y == n_bins_y:
+                continue
+
+            bin_idx_y += 1
+            did_advance = True
+            bottom_y = edges_target[bin_idx_y]
+            if bin_idx_y == n_bins_y:
+                top_y = large_positive_number
+            else:
+                top_y = edges_target[bin_idx_y + 1]
+        elif passed_bottom_y_first:
+            if bin_idx_y < 0:
+                continue
+
+            top_y = edges_target[bin_idx_y]
+            bin_idx_y -= 1
+            did_advance = True
+            if bin_idx_y >= 0:
+                bottom_y = edges_target[bin_idx_y]
+                continue
+            else:
+                bottom_y = large_negative_number
+
+    return nnz
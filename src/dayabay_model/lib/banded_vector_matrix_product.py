@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from dag_modelling.core.exception import TypeFunctionError
+from dag_modelling.core.input_strategy import AddNewInputAddNewOutput
+from dag_modelling.core.node import Node
+from dag_modelling.core.type_functions import (
+    AllPositionals,
+    check_dimension_of_inputs,
+    check_size_of_inputs,
+    evaluate_dtype_of_outputs,
+)
+from numba import njit
+from numpy import empty, zeros
+
+if TYPE_CHECKING:
+    from dag_modelling.core.input import Input
+    from dag_modelling.core.output import Output
+    from numpy.typing import NDArray
+
+
+class BandedMatrix(Node):
+    """Store a matrix in the variable band (profile) form.
+
+    For each row only the elements between the first and the last significant element are
+    kept. The form is suitable for the smearing (Gaussian energy resolution) and distortion
+    (IAV) matrices, which are banded or triangular. The band is applied to the histograms by
+    `BandedVectorMatrixProduct`, any number of products may share the band.
+
+    An element is significant if its absolute value exceeds `threshold` times the maximal
+    absolute value of its column. With `threshold=0` only the zeros are dropped. For a column,
+    which is a Gaussian, the threshold `exp(-nσ²/2)` truncates it at nσ.
+
+    The support of the band (the first element and the length of each row) is found once,
+    when the types are evaluated, for the matrix at the current (nominal) values of the
+    parameters. Then only the values within the support are copied when the matrix changes.
+    Therefore, the band is a linear function of the matrix and the result stays a smooth
+    function of the parameters. The elements outside of the support are dropped even if they
+    become significant, so the threshold should include a margin for the expected changes of
+    the matrix.
+
+    inputs:
+        `matrix`: dense matrix
+
+    outputs:
+        `band`: values of the band, row by row
+    """
+
+    __slots__ = ("_matrix", "_band", "_threshold", "_starts", "_offsets")
+
+    _matrix: Input
+    _band: Output
+    _threshold: float
+    _starts: NDArray | None
+    _offsets: NDArray | None
+
+    def __init__(self, *args, threshold: float = 0.0, **kwargs):
+        if threshold < 0.0:
+            raise RuntimeError(f"Invalid BandedMatrix {threshold=} (must be ≥0)")
+        super().__init__(*args, **kwargs)
+        self._labels.setdefault("mark", "band(M)")
+        self._threshold = threshold
+        self._matrix = self._add_input("matrix", positional=False)
+        self._band = self._add_output("band")
+        self._starts = None
+        self._offsets = None
+
+    @property
+    def threshold(self) -> float:
+        return self._threshold
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        """Shape of the dense matrix."""
+        return self._matrix.dd.shape
+
+    @property
+    def starts(self) -> NDArray:
+        """Index of the first stored element of each row."""
+        assert self._starts is not None
+        return self._starts
+
+    @property
+    def offsets(self) -> NDArray:
+        """Offsets of the rows within the band (number of the rows+1 elements)."""
+        assert self._offsets is not None
+        return self._offsets
+
+    @property
+    def nnz(self) -> int:
+        """Number of the stored elements of the band."""
+        return int(self.offsets[-1])
+
+    def expand(self, values: NDArray) -> NDArray:
+        """Return the dense matrix for the values of the band, e.g. of its derivative."""
+        matrix = zeros(self.shape, dtype=values.dtype)
+        _expand_band(self.starts, self.offsets, values, matrix)
+        return matrix
+
+    def _function(self):
+        _fill_band(self._matrix.data, self._starts, self._offsets, self._band._data)
+
+    def _type_function(self) -> None:
+        check_dimension_of_inputs(self, "matrix", 2)
+        nrows = self._matrix.dd.shape[0]
+        if self._starts is None or self._starts.shape[0] != nrows:
+            # The support is found only once, for the nominal matrix
+            self._matrix.parent_node.close()
+            self._starts, self._offsets = _find_band(
+                self._matrix.parent_output.data, self._threshold
+            )
+
+        self._band.dd.shape = (self.nnz,)
+        self._band.dd.dtype = self._matrix.dd.dtype
+
+
+class BandedVectorMatrixProduct(Node):
+    """Compute matrix product `C=M@column(v)` for a matrix in the variable band form.
+
+    The matrix is given by the output of `BandedMatrix`. The product is computed only over
+    the band of each row.
+
+    inputs:
+        `band`: the band of the matrix, the output of `BandedMatrix`
+        `0`, `1`, ... or `vector`: the columns
+
+    outputs:
+        `0`, `1`, ... or `result`: the products
+    """
+
+    __slots__ = ("_band",)
+
+    _band: Input
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault(
+            "input_strategy",
+            AddNewInputAddNewOutput(input_fmt="vector", output_fmt="result"),
+        )
+        super().__init__(*args, **kwargs)
+        self._labels.setdefault("mark", "band(M)@col(v)")
+        self._band = self._add_input("band", positional=False)
+
+    @property
+    def banded_matrix(self) -> BandedMatrix:
+        node = self._band.parent_node
+        assert isinstance(node, BandedMatrix)
+        return node
+
+    @property
+    def nnz(self) -> int:
+        """Number of the stored elements of the band."""
+        return self.banded_matrix.nnz
+
+    def dense_matrix(self) -> NDArray:
+        """Return the truncated matrix as a dense array."""
+        return self.banded_matrix.expand(self._band.data)
+
+    def _function(self):
+        matrix = self.banded_matrix
+        starts = matrix.starts
+        offsets = matrix.offsets
+        values = self._band.data
+        for column, outdata in zip(self.inputs.iter_data(), self.outputs.iter_data_unsafe()):
+            _product_band(starts, offsets, values, column, outdata)
+
+    def _type_function(self) -> None:
+        matrix = self._band.parent_node
+        if not isinstance(matrix, BandedMatrix):
+            raise TypeFunctionError(
+                "BandedVectorMatrixProduct requires the band of BandedMatrix", node=self
+            )
+        nrows, ncols = matrix.shape
+        check_dimension_of_inputs(self, AllPositionals, 1)
+        check_size_of_inputs(self, AllPositionals, exact=ncols)
+        evaluate_dtype_of_outputs(self, AllPositionals, AllPositionals)
+
+        matrix_edges = matrix.inputs["matrix"].dd.axes_edges
+        for output in self.outputs:
+            output.dd.shape = (nrows,)
+            if matrix_edges:
+                output.dd.axes_edges = (matrix_edges[0],)
+
+
+@njit
+def _find_band(matrix: NDArray, threshold: float) -> tuple[NDArray, NDArray]:
+    nrows, ncols = matrix.shape
+    column_thresholds = empty(ncols)
+    for j in range(ncols):
+        column_max = 0.0
+        for i in range(nrows):
+            column_max = max(column_max, abs(matrix[i, j]))
+        column_thresholds[j] = threshold * column_max
+
+    starts = zeros(nrows, dtype="i8")
+    offsets = zeros(nrows + 1, dtype="i8")
+    for i in range(nrows):
+        start, stop = 0, 0
+        for j in range(ncols):
+            if abs(matrix[i, j]) > column_thresholds[j]:
+                start = j
+                break
+        for j in range(ncols - 1, start - 1, -1):
+            if abs(matrix[i, j]) > column_thresholds[j]:
+                stop = j + 1
+                break
+        starts[i] = start
+        offsets[i + 1] = offsets[i] + stop - start
+
+    return starts, offsets
+
+
+@njit
+def _fill_band(matrix: NDArray, starts: NDArray, offsets: NDArray, values: NDArray) -> None:
+    for i in range(starts.shape[0]):
+        start = starts[i]
+        offset = offsets[i]
+        for k in range(offsets[i + 1] - offset):
+            values[offset + k] = matrix[i, start + k]
+
+
+@njit(fastmath=True)
+def _product_band(
+    starts: NDArray, offsets: NDArray, values: NDArray, column: NDArray, result: NDArray
+) -> None:
+    # The slices make the inner loop contiguous, so it is vectorized
+    for i in range(starts.shape[0]):
+        row = values[offsets[i] : offsets[i + 1]]
+        column_row = column[starts[i] : starts[i] + row.shape[0]]
+        total = 0.0
+        for k in range(row.shape[0]):
+            total += row[k] * column_row[k]
+        result[i] = total
+
+
+@njit
+def _expand_band(starts: NDArray, offsets: NDArray, values: NDArray, matrix: NDArray) -> None:
+    for i in range(starts.shape[0]):
+        start = starts[i]
+        offset = offsets[i]
+        for k in range(offsets[i + 1] - offset):
+            matrix[i, start + k] = values[offset + k]
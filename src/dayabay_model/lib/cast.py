@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from dag_modelling.lib.abstract import OneToOneNode
+from numpy import copyto
+from numpy import dtype as numpy_dtype
+
+if TYPE_CHECKING:
+    from numpy.typing import DTypeLike
+
+
+class Cast(OneToOneNode):
+    """Convert the arrays to the given dtype.
+
+    The node is used to switch the precision of a part of the graph, e.g. to evaluate the
+    detector response in single precision. The dtype of the nodes, consuming the result, is
+    then derived from it. The values are rounded to the nearest representable numbers.
+
+    inputs:
+        `0`, `1`, ...: arrays
+
+    outputs:
+        `0`, `1`, ...: arrays of the given dtype with the same shape and axes
+    """
+
+    __slots__ = ("_dtype",)
+
+    _dtype: numpy_dtype
+
+    def __init__(self, *args, dtype: DTypeLike = "f", **kwargs):
+        super().__init__(*args, **kwargs)
+        self._dtype = numpy_dtype(dtype)
+        self._labels.setdefault("mark", f"→{self._dtype.char}")
+
+    @property
+    def dtype(self) -> numpy_dtype:
+        return self._dtype
+
+    def _function(self):
+        for indata, outdata in zip(self.inputs.iter_data(), self.outputs.iter_data_unsafe()):
+            copyto(outdata, indata, casting="unsafe")
+
+    def _type_function(self) -> None:
+        super()._type_function()
+        for output in self.outputs:
+            output.dd.dtype = self._dtype
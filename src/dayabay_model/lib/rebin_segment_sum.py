@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from dag_modelling.core.input_strategy import AddNewInputAddNewOutput
+from dag_modelling.core.node import Node
+from dag_modelling.core.type_functions import (
+    AllPositionals,
+    check_dimension_of_inputs,
+    check_inputs_have_same_dtype,
+    check_size_of_inputs,
+    evaluate_dtype_of_outputs,
+)
+from numba import njit
+from numpy import asarray, empty, finfo, zeros
+
+if TYPE_CHECKING:
+    from dag_modelling.core.input import Input
+    from dag_modelling.core.output import Output
+    from numpy.typing import DTypeLike, NDArray
+
+
+class RebinSegments(Node):
+    """Compute the plan for rebinning of histograms with `RebinSegmentSum`.
+
+    Each new edge should coincide (within `atol` and `rtol`) with one of the old edges. The
+    plan is the array of the indices of the old edges, which coincide with the new edges.
+    The new bin `j` is then the sum of the old bins from `segments[j]` to `segments[j+1]`.
+
+    inputs:
+        `edges_old`: old bin edges
+        `edges_new`: new bin edges
+
+    outputs:
+        `segments`: indices of the old edges for each new edge (integer)
+    """
+
+    __slots__ = ("_edges_old", "_edges_new", "_segments", "_atol", "_rtol")
+
+    _edges_old: Input
+    _edges_new: Input
+    _segments: Output
+    _atol: float
+    _rtol: float
+
+    def __init__(
+        self,
+        *args,
+        atol: float = float(finfo("d").resolution) * 10.0,
+        rtol: float = 0.0,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self._labels.setdefault("text", "Plan for rebinning")
+        self._atol = atol
+        self._rtol = rtol
+        self._edges_old = self._add_input("edges_old", positional=False)
+        self._edges_new = self._add_input("edges_new", positional=False)
+        self._segments = self._add_output("segments", positional=False)
+
+    @property
+    def atol(self) -> float:
+        return self._atol
+
+    @property
+    def rtol(self) -> float:
+        return self._rtol
+
+    @staticmethod
+    def edges_are_aligned(
+        edges_old: NDArray,
+        edges_new: NDArray,
+        *,
+        atol: float = float(finfo("d").resolution) * 10.0,
+        rtol: float = 0.0,
+    ) -> bool:
+        """Check whether each new edge coincides with one of the old edges.
+
+        Used to check, whether the rebinning may be done by `RebinSegmentSum`, before the
+        graph is closed.
+        """
+        edges_old = asarray(edges_old, dtype="d")
+        edges_new = asarray(edges_new, dtype="d")
+        segments = empty(edges_new.shape[0], dtype="i8")
+        return _find_segments(edges_old, edges_new, segments, atol, rtol) < 0
+
+    def _function(self):
+        edges_old = self._edges_old.data
+        edges_new = self._edges_new.data
+        inew = _find_segments(edges_old, edges_new, self._segments._data, self._atol, self._rtol)
+        if inew >= 0:
+            raise RuntimeError(
+                f"Inconsistent edges: new edge {inew} ({edges_new[inew]}) does not coincide "
+                "with any of the old edges"
+            )
+
+    def _type_function(self) -> None:
+        names = ("edges_old", "edges_new")
+        check_dimension_of_inputs(self, names, 1)
+        check_inputs_have_same_dtype(self, names)
+        check_size_of_inputs(self, names, min=2)
+        self._segments.dd.shape = self._edges_new.dd.shape
+        self._segments.dd.dtype = "i8"
+
+
+class RebinSegmentSum(Node):
+    """Rebin histograms by summing the segments of the old bins.
+
+    The node is equivalent to `Rebin` (rebinning matrix and `VectorMatrixProduct`), but the
+    rebinning matrix, which contains only ones and zeros, is not used. Each new bin is the
+    sum of a contiguous segment of the old bins, as given by the plan of `RebinSegments`.
+    A single plan may be shared between any number of nodes.
+
+    The sums are accumulated in double precision. The dtype of the results is the dtype of
+    the histograms, unless `dtype` is given, e.g. to rebin single precision histograms into
+    double precision ones.
+
+    inputs:
+        `segments`: plan of rebinning, see `RebinSegments`
+        `edges_new`: new bin edges (N+1 elements)
+        `0`, `1`, ... or `vector`: histograms in the old binning
+
+    outputs:
+        `0`, `1`, ... or `result`: histograms in the new binning (N elements)
+    """
+
+    __slots__ = ("_segments_input", "_edges_new", "_dtype")
+
+    _segments_input: Input
+    _edges_new: Input
+    _dtype: DTypeLike | None
+
+    def __init__(self, *args, dtype: DTypeLike | None = None, **kwargs):
+        kwargs.setdefault(
+            "input_strategy",
+            AddNewInputAddNewOutput(input_fmt="vector", output_fmt="result"),
+        )
+        super().__init__(*args, **kwargs)
+        self._labels.setdefault("mark", "Σ(segments)")
+        self._dtype = dtype
+        self._segments_input = self._add_input("segments", positional=False)
+        self._edges_new = self._add_input("edges_new", positional=False)
+
+    def dense_matrix(self) -> NDArray:
+        """Return the equivalent rebinning matrix as a dense array."""
+        segments = self._segments_input.data
+        nold = self.inputs[0].dd.shape[0]
+        matrix = zeros((segments.shape[0] - 1, nold), dtype=self.outputs[0].dd.dtype)
+        for i in range(segments.shape[0] - 1):
+            matrix[i, segments[i] : segments[i + 1]] = 1.0
+        return matrix
+
+    def _function(self):
+        segments = self._segments_input.data
+        for column, outdata in zip(self.inputs.iter_data(), self.outputs.iter_data_unsafe()):
+            _sum_segments(segments, column, outdata)
+
+    def _type_function(self) -> None:
+        check_dimension_of_inputs(self, ("segments", "edges_new"), 1)
+        check_dimension_of_inputs(self, AllPositionals, 1)
+        (nedges,) = self._edges_new.dd.shape
+        check_size_of_inputs(self, "segments", exact=nedges)
+        evaluate_dtype_of_outputs(self, AllPositionals, AllPositionals)
+
+        edges_new = self._edges_new.parent_output
+        for output in self.outputs:
+            if self._dtype is not None:
+                output.dd.dtype = self._dtype
+            output.dd.shape = (nedges - 1,)
+            output.dd.axes_edges = (edges_new,)
+
+
+@njit
+def _find_segments(
+    edges_old: NDArray, edges_new: NDArray, segments: NDArray, atol: float, rtol: float
+) -> int:
+    """Find the indices of the old edges, which coincide with the new edges.
+
+    Returns
+    -------
+    int
+        -1 on success or the index of the first new edge without the old counterpart.
+    """
+    nold = edges_old.shape[0]
+    iold = 0
+    for inew in range(edges_new.shape[0]):
+        edge_new = edges_new[inew]
+        while iold < nold and edges_old[iold] < edge_new:
+            if abs(edges_old[iold] - edge_new) <= atol + rtol * abs(edge_new):
+                break
+            iold += 1
+        if iold == nold or abs(edges_old[iold] - edge_new) > atol + rtol * abs(edge_new):
+            return inew
+        segments[inew] = iold
+        iold += 1
+    return -1
+
+
+@njit(fastmath=True)
+def _sum_segments(segments: NDArray, column: NDArray, result: NDArray) -> None:
+    for i in range(segments.shape[0] - 1):
+        segment = column[segments[i] : segments[i + 1]]
+        total = 0.0
+        for k in range(segment.shape[0]):
+            total += segment[k]
+        result[i] = total
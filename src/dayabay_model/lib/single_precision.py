@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from dag_modelling.lib.hist import AxisDistortionMatrixPointwise
+from dag_modelling.lib.hist.hist_smear_normal_matrix_b_c import HistSmearNormalMatrixBC
+from dag_modelling.lib.normalization import RenormalizeDiag
+from dag_modelling.lib.physics import EnergyResolution
+from numpy import dtype
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+
+class SinglePrecisionOutputs:
+    """Mixin, which stores the outputs of a node in single precision.
+
+    The result is computed by the function of the node from the inputs in their precision and
+    is rounded, when it is stored to the outputs. The result is the same as of `Cast` applied
+    to the outputs of the original node, but no double precision copy is allocated. The
+    function of the node should support float32 outputs, which is the case for the numba and
+    numpy functions.
+    """
+
+    __slots__ = ()
+
+    def _type_function(self) -> None:
+        super()._type_function()  # pyright: ignore [reportAttributeAccessIssue]
+        for output in self.outputs.iter_all():  # pyright: ignore [reportAttributeAccessIssue]
+            output.dd.dtype = dtype("f")
+
+
+class AxisDistortionMatrixPointwiseSingle(SinglePrecisionOutputs, AxisDistortionMatrixPointwise):
+    """`AxisDistortionMatrixPointwise` with the matrix in single precision."""
+
+    __slots__ = ()
+
+
+class RenormalizeDiagSingle(SinglePrecisionOutputs, RenormalizeDiag):
+    """`RenormalizeDiag` with the result in single precision."""
+
+    __slots__ = ()
+
+
+class HistSmearNormalMatrixBCSingle(SinglePrecisionOutputs, HistSmearNormalMatrixBC):
+    """`HistSmearNormalMatrixBC` with the matrix in single precision."""
+
+    __slots__ = ()
+
+
+class EnergyResolutionSingle(EnergyResolution):
+    """`EnergyResolution` with the smearing matrix in single precision.
+
+    The relative width of the resolution is computed in double precision.
+    """
+
+    __slots__ = ()
+
+    def add_energy_resolution_matrix_bc(
+        self,
+        name: str = "EnergyResolution",
+        label: Mapping = {},
+    ) -> HistSmearNormalMatrixBC:
+        _energy_resolution_matrix_bc = HistSmearNormalMatrixBCSingle(name, label=label)
+        self._energy_resolution_matrix_bc_list.append(_energy_resolution_matrix_bc)
+        self._add_node(
+            _energy_resolution_matrix_bc,
+            kw_inputs=["RelSigma", "Edges", "EdgesOut"],
+            kw_outputs=["SmearMatrix"],
+            merge_inputs=["Edges"],
+            missing_inputs=True,
+            also_missing_outputs=True,
+        )
+        return _energy_resolution_matrix_bc
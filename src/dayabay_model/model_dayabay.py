@@ -6,20 +6,30 @@ from os.path import relpath
 from pathlib import Path
 from typing import TYPE_CHECKING
 
-from dag_modelling.core import Graph, NodeStorage
 from dag_modelling.tools.logger import INFO, logger
-from nested_mapping import NestedMapping
-from numpy import ndarray
-from numpy.random import Generator
-from pandas import DataFrame
 
 # pyright: reportUnusedExpression=false
 
+# The heavy dependencies (dag_modelling.core, pandas, numpy, the nodes and bundles) are
+# imported within the methods, where they are used, in order to keep `import dayabay_model`
+# fast.
 if TYPE_CHECKING:
+    from collections.abc import Iterable
     from typing import KeysView, Literal, ValuesView
 
+    from dag_modelling.core import Graph, NodeStorage
     from dag_modelling.core.meta_node import MetaNode
+    from numpy.random import Generator, SeedSequence
     from numpy.typing import NDArray
+    from pandas import DataFrame
+
+    from .tools.batch_evaluation import OscillationKernel
+    from .tools.build_cache import BuildCache
+    from .tools.covariance_update import CovarianceUpdate
+    from .tools.deferred_storage import DeferredNodeStorage
+    from .tools.node_counters import NodeCounters
+    from .tools.parallel_branches import ParallelBranches
+    from .tools.shared_data import SharedData
 
 # Define a dictionary of groups of nuisance parameters in a format `name: path`,
 # where path denotes the location of the parameters in the storage.
@@ -40,14 +50,87 @@ _SYSTEMATIC_UNCERTAINTIES_GROUPS = {
     "absolute_efficiency": "detector.detector_absolute",
 }
 
+# Define a dictionary of the items, which may be built on demand, in a format
+# `name: dependencies`. The name denotes the location of the outputs in the storage. The items
+# are built in the order of the dictionary.
+_DEFERRED_ITEMS = {
+    "summary": (),
+    "cholesky.stat.variable": (),
+    "cholesky.stat.fixed": (),
+    "cholesky.stat.data.fixed": (),
+    "covariance.covmat_full_p.fixed_stat": (),
+    "cholesky.covmat_full_p.fixed_stat": ("covariance.covmat_full_p.fixed_stat",),
+    "covariance.covmat_full_p.variable_stat": (),
+    "cholesky.covmat_full_p.variable_stat": ("covariance.covmat_full_p.variable_stat",),
+    "covariance.covmat_full_n": (),
+    "cholesky.covmat_full_n": ("covariance.covmat_full_n",),
+    "statistic.stat.chi2p_iterative": ("cholesky.stat.fixed",),
+    "statistic.stat.chi2n": ("cholesky.stat.data.fixed",),
+    "statistic.stat.chi2p": ("cholesky.stat.variable",),
+    "statistic.full.covmat.chi2p_iterative": ("cholesky.covmat_full_p.fixed_stat",),
+    "statistic.full.covmat.chi2n": ("cholesky.covmat_full_n",),
+    "statistic.full.covmat.chi2p": ("cholesky.covmat_full_p.variable_stat",),
+    "statistic.log_prod_diag.full": ("cholesky.covmat_full_p.variable_stat",),
+    "statistic.full.covmat.chi2p_unbiased": (
+        "statistic.full.covmat.chi2p",
+        "statistic.log_prod_diag.full",
+    ),
+    "statistic.staterr.cnp": (),
+    "statistic.stat.chi2cnp": ("statistic.staterr.cnp",),
+    "statistic.stat.chi2poisson": (),
+    "statistic.full.pull.chi2p_iterative": ("statistic.stat.chi2p_iterative",),
+    "statistic.full.pull.chi2p": ("statistic.stat.chi2p",),
+    "statistic.full.pull.chi2cnp": ("statistic.stat.chi2cnp",),
+    "statistic.log_prod_diag.stat": ("cholesky.stat.variable",),
+    "statistic.stat.chi2p_unbiased": ("statistic.stat.chi2p", "statistic.log_prod_diag.stat"),
+    "statistic.full.pull.chi2p_unbiased": ("statistic.stat.chi2p_unbiased",),
+    "statistic.staterr.cnp_variance": (),
+    "covariance.covmat_full_cnp": ("statistic.staterr.cnp_variance",),
+    "cholesky.covmat_full_cnp": ("covariance.covmat_full_cnp",),
+    "statistic.full.covmat.chi2cnp": ("cholesky.covmat_full_cnp",),
+    "statistic.full.pull.chi2poisson": ("statistic.stat.chi2poisson",),
+}
+
+# Define a dictionary of the data files of the dataset in a format `name: (path, kind)`. The
+# name is the item of `cfg_file_mapping`, the path is relative to the dataset and has no
+# extension, `{}` is replaced by the name of the period. The kind is the kind of the objects
+# (`FileReader.get_{kind}`), as requested by the loaders. The files may be read in advance
+# and are converted to the compiled dataset.
+_DATASET_FILES = {
+    "reactor_antineutrino_spectra": ("reactor_antineutrino_spectra_hm", "graph"),
+    "reactor_antineutrino_spectra_uncertainties": (
+        "reactor_antineutrino_spectra_hm_uncertainties",
+        "graph",
+    ),
+    "nonequilibrium_correction": ("nonequilibrium_correction", "graph"),
+    "snf_correction": ("snf_correction", "graph"),
+    "daily_detector_data": ("dayabay_dataset/dayabay_daily_detector_data", "record"),
+    "daily_antineutrino_rate_data": ("neutrino_rate", "record"),
+    "iav_matrix": ("detector_iav_matrix", "array"),
+    "lsnl_curves": ("detector_lsnl_curves", "graph"),
+    "background_spectra": ("dayabay_dataset/dayabay_background_spectra_{}", "hist"),
+    "dataset": ("dayabay_dataset/dayabay_ibd_spectra_{}", "hist"),
+}
+
+# Define the stages of the replicated outputs, which may be evaluated concurrently. Each item
+# is a path of the outputs within `outputs`, the outputs depend on the outputs of the previous
+# stages: the oscillated cross sections of each reactor and detector, the integrals for each
+# source, reactor, isotope and detector, and the spectra of each detector and period.
+_PARALLEL_STAGES = (
+    "kinematics.ibd.crosssection_jacobian_oscillations",
+    "kinematics.integral",
+    "eventscount.final.detector_period",
+)
+
 
 class model_dayabay:
     """The Daya Bay model implementation version v1.
 
     Attributes
     ----------
-    storage : NodeStorage
-        Nested dictionary with model elements: nodes, parameters, etc.
+    storage : DeferredNodeStorage
+        Nested dictionary with model elements: nodes, parameters, etc. The deferred items
+        are built on first access.
     graph : Graph
         Graph instance.
     index : dict[str, tuple[str, ...]]
@@ -108,11 +191,118 @@ class model_dayabay:
         Path to the data.
     leading_mass_splitting_3l_name: Literal["DeltaMSq32", "DeltaMSq31"], default="DeltaMSq32"
         Leading mass splitting.
+    build_cache : str | Path | None, default=None
+        Directory for the persistent build cache. The data, read from the files, and the
+        preprocessed daily data and LSNL curves are saved to the cache on the first build and
+        reused by the following builds with the same arguments. The cache is invalidated when
+        the dataset version, the model arguments or the modification times of the files change.
+        The resolved labels of the nodes and outputs are stored in the same directory, see
+        `LabelIndex`.
+    jacobian_mode : Literal["numerical", "forward"], default="numerical"
+        Method to compute the Jacobians for the covariance matrices. "numerical" uses finite
+        differences for the whole model. "forward" uses finite differences only up to the
+        linear part of the model (integration, detector response, rebinning, sums) and
+        propagates the derivatives through it analytically.
+    shared_data : str | Path | None, default=None
+        Directory for the memory-mapped files with the constant arrays of the model (daily
+        data, IAV matrix, antineutrino spectra, LSNL curves, etc.). The files are written by
+        the first build and mapped in read-only mode by the following builds with the same
+        arguments, so the memory is shared between the processes, e.g. the ToyMC workers.
+        The files are named by the storage keys of the nodes and the hashes of the data, so
+        only the files with the same content are reused. A directory on a memory-based file
+        system, e.g. `/dev/shm`, should be used.
+    statistics : Sequence[str] | None, default=None
+        List of the statistics (relative to `outputs`, e.g. "statistic.full.pull.chi2cnp") to
+        be built together with the model. The other statistics, the related covariance
+        matrices and the summary are built on demand by `build_outputs()`. If None, all the
+        statistics and the summary are built.
+    integration_mode : Literal["parts", "kernel"], default="parts"
+        Order of the integration over Edep and cosθ:
+            - "parts": each antineutrino source (main, NEQ, SNF) of each isotope of each
+              reactor is integrated for each detector and then scaled by the number of
+              fissions, protons, efficiency and live time of each period.
+            - "kernel": the scaled antineutrino spectra are summed over the sources and
+              isotopes and multiplied by the cross section first. The resulting kernel does
+              not depend on the oscillation parameters, it is only multiplied by the
+              survival probability and summed over the reactors before the integration. A
+              single integration is done for each detector and period. The fit over the
+              oscillation parameters is faster, while the change of the nuisance parameters
+              of the reactor flux or the detector normalization triggers the recomputation of
+              the kernels.
+    detector_response_mode : Literal["stages", "fused"], default="stages"
+        Application of the detector response (IAV, LSNL, energy resolution and rebinning):
+            - "stages": the matrices are applied to the spectrum of each detector during each
+              period one by one.
+            - "fused": the product of the matrices is computed for each detector and applied
+              as a single matrix. The product is recomputed only when the parameters of IAV,
+              LSNL or energy resolution change. The outputs of the stages are still available
+              and are computed on demand.
+    detector_matrix_mode : Literal["dense", "banded"], default="dense"
+        Representation of the IAV, LSNL and energy resolution matrices in the stages of the
+        detector response:
+            - "dense": the matrices are applied as dense matrices.
+            - "banded": for each row only the band between the first and the last significant
+              element is stored and multiplied. The IAV matrix is triangular and only the
+              zeros are dropped. The Gaussian of the energy resolution is truncated, see
+              `eres_nsigma`. The band of each matrix is stored once and is shared by the
+              periods. The support of the band is found for the nominal parameters and is
+              kept fixed, so the prediction is a smooth function of the parameters. The dense
+              LSNL matrix is not built, unless the response is fused: only the non-zero
+              weights are kept, they are computed once for all the periods of a detector,
+              when the LSNL curves change.
+    eres_nsigma : float, default=5.0
+        Truncation of the energy resolution Gaussian for `detector_matrix_mode="banded"` in
+        units of σ for the nominal resolution. The band includes one more σ as a margin for
+        the changes of the resolution.
+    daily_data_mode : Literal["arrays", "sums"], default="arrays"
+        Usage of the daily detector and reactor data:
+            - "arrays": the daily arrays are the nodes of the model, the daily products are
+              computed and summed by the model.
+            - "sums": the sums of the daily data (livetime, number of accidentals,
+              antineutrino rate times effective livetime) for each reactor, detector and
+              period are computed during the build. The daily arrays are not kept. The
+              change of a parameter requires a single operation for each combination
+              instead of the operations over all the days.
+    rebin_mode : Literal["matrix", "segments", "auto"], default="matrix"
+        Rebinning of the histograms to the final binning:
+            - "matrix": the rebinning matrix is computed for each kind of histograms (IBD,
+              background, data) and is applied as a dense matrix.
+            - "segments": each final bin is computed as a sum of a contiguous segment of the
+              fine bins. A single plan of the segments is shared by all the histograms. The
+              rebinning matrix for IBD is still computed for `detector_response_mode="fused"`.
+              Each final edge should coincide with one of the fine edges.
+            - "auto": "segments" if each final edge coincides with one of the fine edges,
+              otherwise "matrix". The edges are checked during the build. The recommended
+              option. The default "matrix" keeps the graph of the previous versions.
+    precision : Literal["double", "mixed"], default="double"
+        Precision of the prediction:
+            - "double": all the arrays are in double precision (float64).
+            - "mixed": the detector response is evaluated in single precision (float32): the
+              IBD spectra after the integration, the normalization and the rebinning. The
+              IAV, LSNL and energy resolution matrices are computed in double precision and
+              are stored only in single precision. The integration, the fused response and
+              the rebinning matrices, the backgrounds, the sum of the final spectra, the
+              covariance matrices and the statistics are computed in double precision.
+              The accuracy with respect to the double precision model is checked by
+              `make_precision_report()`.
+    prefetch_threads : int, default=0
+        Number of threads to read the data files in advance. All the objects of the data
+        files are read concurrently before the graph is constructed, the loaders then get
+        them from memory. 0 disables the prefetching: the files are read sequentially by the
+        loaders.
+    evaluation_threads : int, default=0
+        Number of threads to evaluate the independent replicated branches of the graph
+        concurrently: the oscillated cross sections, the integrals and the spectra of each
+        detector and period, see `ParallelBranches`. The branches are evaluated, when the
+        final spectra are requested. 0 disables the concurrent evaluation.
+    profiling : bool, default=False
+        Count the evaluations of the nodes, their wall time and memory. The counters are
+        aggregated by `make_profiling_table()`. The profiling slows down the evaluation.
 
     Technical attributes
     --------------------
     _source_type : str, default="hdf5"
-        Type of the data to read ("tsv", "hdf5", "root" or "npz").
+        Type of the data to read ("tsv", "hdf5", "root", "npz" or "compiled").
     _strict : bool, default=True
         Strict mode. Stop execution if:
             - the model is not complete,
@@ -124,9 +314,42 @@ class model_dayabay:
         numpy random generator to be used for ToyMC.
     _covariance_matrix : MetaNode
         covariance matrix, computed on this model.
+    _covariance_update : CovarianceUpdate
+        tracker of the covariance groups, affected by the changes of the parameters.
     _frozen_nodes : dict[str, tuple]
         storage with nodes, which are being fixed at their values and
         require manual intervention in order to be recalculated.
+    _build_cache : BuildCache
+        persistent cache of the data, used during the build.
+    _shared_data : SharedData
+        storage of the constant arrays, shared between the processes.
+    _statistics : tuple[str, ...] | None
+        statistics to be built together with the model, all if None.
+    _deferred_built : set[str]
+        deferred items (see `_DEFERRED_ITEMS`), which are already built.
+    _integration_mode : Literal["parts", "kernel"]
+        order of the integration over Edep and cosθ.
+    _detector_response_mode : Literal["stages", "fused"]
+        application of the detector response matrices.
+    _detector_matrix_mode : Literal["dense", "banded"]
+        representation of the IAV, LSNL and energy resolution matrices.
+    _eres_nsigma : float
+        truncation of the energy resolution Gaussian in the banded mode.
+    _daily_data_mode : Literal["arrays", "sums"]
+        usage of the daily detector and reactor data.
+    _rebin_mode : Literal["matrix", "segments", "auto"]
+        rebinning of the histograms to the final binning, "auto" is replaced by the chosen
+        mode during the build.
+    _precision : Literal["double", "mixed"]
+        precision of the prediction.
+    _prefetch_threads : int
+        number of threads to read the data files in advance.
+    _parallel_branches : ParallelBranches | None
+        concurrent evaluation of the replicated branches, if enabled.
+    _node_counters : NodeCounters | None
+        counters of the evaluations of the nodes, if profiling is enabled.
+    _oscillation_kernel : OscillationKernel | None
+        oscillation independent part of the prediction for the batch evaluation.
     """
 
     __slots__ = (
@@ -150,11 +373,28 @@ class model_dayabay:
         "_close",
         "_process_labels",
         "_covariance_matrix",
+        "_covariance_update",
         "_frozen_nodes",
         "_random_generator",
+        "_build_cache",
+        "_jacobian_mode",
+        "_shared_data",
+        "_statistics",
+        "_deferred_built",
+        "_integration_mode",
+        "_detector_response_mode",
+        "_detector_matrix_mode",
+        "_eres_nsigma",
+        "_daily_data_mode",
+        "_rebin_mode",
+        "_precision",
+        "_prefetch_threads",
+        "_parallel_branches",
+        "_node_counters",
+        "_oscillation_kernel",
     )
 
-    storage: NodeStorage
+    storage: DeferredNodeStorage
     graph: Graph
     index: dict[str, tuple[str, ...]]
     combinations: dict[str, tuple[tuple[str, ...], ...]]
@@ -205,13 +445,30 @@ class model_dayabay:
     _arrays_dict: dict[str, Path | NDArray | None]
     _mc_parameters: Sequence | ValuesView
     _is_absolute_efficiency_fixed: bool
-    _source_type: Literal["tsv", "hdf5", "root", "npz"]
+    _source_type: Literal["tsv", "hdf5", "root", "npz", "compiled"]
     _strict: bool
     _close: bool
     _process_labels: bool
     _random_generator: Generator
     _covariance_matrix: MetaNode
+    _covariance_update: CovarianceUpdate
     _frozen_nodes: dict[str, tuple]
+    _build_cache: BuildCache
+    _jacobian_mode: Literal["numerical", "forward"]
+    _shared_data: SharedData
+    _statistics: tuple[str, ...] | None
+    _deferred_built: set[str]
+    _integration_mode: Literal["parts", "kernel"]
+    _detector_response_mode: Literal["stages", "fused"]
+    _detector_matrix_mode: Literal["dense", "banded"]
+    _eres_nsigma: float
+    _daily_data_mode: Literal["arrays", "sums"]
+    _rebin_mode: Literal["matrix", "segments", "auto"]
+    _precision: Literal["double", "mixed"]
+    _prefetch_threads: int
+    _parallel_branches: ParallelBranches | None
+    _node_counters: NodeCounters | None
+    _oscillation_kernel: OscillationKernel | None
 
     def __init__(
         self,
@@ -272,6 +529,20 @@ class model_dayabay:
         ] = [],
         mc_parameters: Sequence | ValuesView = [],
         is_absolute_efficiency_fixed: bool = True,
+        build_cache: str | Path | None = None,
+        jacobian_mode: Literal["numerical", "forward"] = "numerical",
+        shared_data: str | Path | None = None,
+        statistics: Sequence[str] | None = None,
+        integration_mode: Literal["parts", "kernel"] = "parts",
+        detector_response_mode: Literal["stages", "fused"] = "stages",
+        detector_matrix_mode: Literal["dense", "banded"] = "dense",
+        eres_nsigma: float = 5.0,
+        daily_data_mode: Literal["arrays", "sums"] = "arrays",
+        rebin_mode: Literal["matrix", "segments", "auto"] = "matrix",
+        precision: Literal["double", "mixed"] = "double",
+        prefetch_threads: int = 0,
+        evaluation_threads: int = 0,
+        profiling: bool = False,
     ):
         """Model initialization.
 
@@ -297,6 +568,17 @@ class model_dayabay:
         }
         assert monte_carlo_mode in {"asimov", "normal-stats", "poisson"}
         assert concatenation_mode in {"detector", "detector_period"}
+        assert jacobian_mode in {"numerical", "forward"}
+        assert statistics is None or all(name in _DEFERRED_ITEMS for name in statistics)
+        assert integration_mode in {"parts", "kernel"}
+        assert detector_response_mode in {"stages", "fused"}
+        assert detector_matrix_mode in {"dense", "banded"}
+        assert eres_nsigma > 0.0
+        assert daily_data_mode in {"arrays", "sums"}
+        assert rebin_mode in {"matrix", "segments", "auto"}
+        assert precision in {"double", "mixed"}
+        assert prefetch_threads >= 0
+        assert evaluation_threads >= 0
 
         self._is_absolute_efficiency_fixed = is_absolute_efficiency_fixed
 
@@ -359,18 +641,33 @@ class model_dayabay:
             case _:
                 raise RuntimeError(f"Unsupported path option: {path_data}")
 
+        # The reader of the compiled dataset should be registered before the loaders are
+        # imported: the loaders check the extensions of the files on import
+        from .tools.compiled_dataset import FileReaderCompiled  # noqa: F401
+        from .tools.deferred_storage import DeferredNodeStorage
         from .tools.validate_dataset import validate_dataset_get_source_type
 
         self._source_type = validate_dataset_get_source_type(
             self._path_data, "dataset_info.yaml", version_min="1.0.0", version_max="2.0.0"
         )
 
-        self.storage = NodeStorage()
+        self.storage = DeferredNodeStorage()
         self._leading_mass_splitting_3l_name = leading_mass_splitting_3l_name
         self.spectrum_correction_interpolation_mode = spectrum_correction_interpolation_mode
         self.spectrum_correction_location = spectrum_correction_location
         self.concatenation_mode = concatenation_mode
         self.monte_carlo_mode = monte_carlo_mode
+        self._jacobian_mode = jacobian_mode
+        self._statistics = None if statistics is None else tuple(statistics)
+        self._deferred_built = set()
+        self._integration_mode = integration_mode
+        self._detector_response_mode = detector_response_mode
+        self._detector_matrix_mode = detector_matrix_mode
+        self._eres_nsigma = eres_nsigma
+        self._daily_data_mode = daily_data_mode
+        self._rebin_mode = rebin_mode
+        self._precision = precision
+        self._prefetch_threads = prefetch_threads
         self._covariance_groups = covariance_groups
         self._pull_groups = pull_groups
         self._mc_parameters = mc_parameters
@@ -396,6 +693,12 @@ class model_dayabay:
             INFO,
             f"Spectrum correction location: {self.spectrum_correction_location.replace('-', ' ')}",
         )
+        logger.log(INFO, f"Integration mode: {self._integration_mode}")
+        logger.log(INFO, f"Detector response mode: {self._detector_response_mode}")
+        logger.log(INFO, f"Detector matrix mode: {self._detector_matrix_mode}")
+        logger.log(INFO, f"Daily data mode: {self._daily_data_mode}")
+        logger.log(INFO, f"Rebin mode: {self._rebin_mode}")
+        logger.log(INFO, f"Precision: {self._precision}")
         assert self.spectrum_correction_interpolation_mode in {"linear", "exponential"}
         assert self.spectrum_correction_location in {
             "before-integration",
@@ -403,13 +706,65 @@ class model_dayabay:
         }
 
         self._frozen_nodes = {}
+        self._oscillation_kernel = None
         self.combinations = {}
 
         override_indices = {k: tuple(v) for k, v in override_indices.items()}
 
         cfg_file_mapping = self._build_cfg_file_mapping(override_cfg_files)
 
-        self.build(cfg_file_mapping, override_indices)
+        from .tools.build_cache import BuildCache
+        from .tools.shared_data import SharedData
+
+        arguments = {
+            "model": type(self).__name__,
+            "source_type": self._source_type,
+            "cfg_file_mapping": cfg_file_mapping,
+            "override_indices": override_indices,
+            "leading_mass_splitting_3l_name": leading_mass_splitting_3l_name,
+            "spectrum_correction_interpolation_mode": spectrum_correction_interpolation_mode,
+            "spectrum_correction_location": spectrum_correction_location,
+            "monte_carlo_mode": monte_carlo_mode,
+            "concatenation_mode": concatenation_mode,
+            "arrays": self._arrays_dict,
+            "covariance_groups": covariance_groups,
+            "pull_groups": pull_groups,
+            "mc_parameters": mc_parameters,
+            "is_absolute_efficiency_fixed": is_absolute_efficiency_fixed,
+            "integration_mode": integration_mode,
+            "detector_response_mode": detector_response_mode,
+            "detector_matrix_mode": detector_matrix_mode,
+            "eres_nsigma": eres_nsigma,
+            "daily_data_mode": daily_data_mode,
+            "rebin_mode": rebin_mode,
+            "precision": precision,
+            "jacobian_mode": jacobian_mode,
+            "statistics": statistics,
+        }
+        self._build_cache = BuildCache(build_cache, path_data=self._path_data, arguments=arguments)
+        self._shared_data = SharedData(shared_data, path_data=self._path_data, arguments=arguments)
+
+        with self._build_cache:
+            self.build(cfg_file_mapping, override_indices)
+
+        if evaluation_threads and profiling:
+            logger.warning("Concurrent evaluation is disabled for profiling")
+            evaluation_threads = 0
+        if evaluation_threads:
+            from .tools.parallel_branches import ParallelBranches
+
+            self._parallel_branches = ParallelBranches(evaluation_threads)
+            self._start_parallel_branches()
+        else:
+            self._parallel_branches = None
+
+        if profiling:
+            from .tools.node_counters import NodeCounters
+
+            self._node_counters = NodeCounters(self.graph, self.storage("nodes"))
+            self._node_counters.start()
+        else:
+            self._node_counters = None
 
         if parameter_values:
             self.set_parameters(parameter_values)
@@ -471,25 +826,14 @@ class model_dayabay:
             / "background_rate_uncertainty_scale_amc.yaml",
             "parameters.background_rate_uncertainty_scale_site": path_parameters
             / f"background_rate_uncertainty_scale_site.yaml",
-            "reactor_antineutrino_spectra": path_data
-            / f"reactor_antineutrino_spectra_hm.{self.source_type}",
-            "reactor_antineutrino_spectra_uncertainties": path_data
-            / f"reactor_antineutrino_spectra_hm_uncertainties.{self.source_type}",
-            "nonequilibrium_correction": path_data
-            / f"nonequilibrium_correction.{self.source_type}",
-            "snf_correction": path_data / f"snf_correction.{self.source_type}",
-            "daily_detector_data": path_data
-            / f"dayabay_dataset/dayabay_daily_detector_data.{self.source_type}",
-            "daily_antineutrino_rate_data": path_data / f"neutrino_rate.{self.source_type}",
-            "iav_matrix": path_data / f"detector_iav_matrix.{self.source_type}",
-            "lsnl_curves": path_data / f"detector_lsnl_curves.{self.source_type}",
-            "background_spectra": path_data / "dayabay_dataset/dayabay_background_spectra_{}."
-            f"{self.source_type}",
-            "dataset": path_data / "dayabay_dataset/dayabay_ibd_spectra_{}." f"{self.source_type}",
         }
+        for name, (path, _) in _DATASET_FILES.items():
+            cfg_file_mapping[name] = path_data / f"{path}.{self.source_type}"
         for cfg_name, path in override_cfg_files.items():
             cfg_file_mapping.update({cfg_name: Path(path)})
 
+        from numpy import ndarray
+
         for array_name, array in self._arrays_dict.items():
             match array:
                 case ndarray():
@@ -500,13 +844,23 @@ class model_dayabay:
         return cfg_file_mapping
 
     @property
-    def source_type(self) -> Literal["tsv", "hdf5", "npz", "root"]:
+    def source_type(self) -> Literal["tsv", "hdf5", "npz", "root", "compiled"]:
         return self._source_type
 
     @property
     def path_data(self) -> Path:
         return self._path_data
 
+    @property
+    def precision(self) -> Literal["double", "mixed"]:
+        return self._precision
+
+    @property
+    def _final_ibd_single(self) -> bool:
+        """Whether the final IBD spectra are in single precision in the mixed precision mode:
+        they are rebinned by a matrix or computed by the fused response matrix."""
+        return self._rebin_mode == "matrix" or self._detector_response_mode == "fused"
+
     @property
     def nbins(self) -> int:
         return self.storage["outputs.eventscount.final.concatenated.selected"].data.shape[0]
@@ -539,6 +893,7 @@ class model_dayabay:
         from dag_modelling.bundles.load_parameters import load_parameters
         from dag_modelling.bundles.load_record import load_record_data
         from dag_modelling.bundles.make_y_parameters_for_x import make_y_parameters_for_x
+        from dag_modelling.core import Graph
         from dag_modelling.lib.arithmetic import (
             Abs,
             Difference,
@@ -550,10 +905,10 @@ class model_dayabay:
         from dag_modelling.lib.axis import BinCenter, BinWidth
         from dag_modelling.lib.common import Array, Concatenation, Proxy, View
         from dag_modelling.lib.exponential import Exp
-        from dag_modelling.lib.hist import AxisDistortionMatrixPointwise, Rebin
+        from dag_modelling.lib.hist import AxisDistortionMatrixPointwise, Rebin, RebinMatrix
         from dag_modelling.lib.integration import Integrator
         from dag_modelling.lib.interpolation import Interpolator
-        from dag_modelling.lib.linalg import Cholesky, VectorMatrixProduct
+        from dag_modelling.lib.linalg import Cholesky, MatrixProductAB, VectorMatrixProduct
         from dag_modelling.lib.normalization import RenormalizeDiag
         from dag_modelling.lib.parameters import ParArrayInput
         from dag_modelling.lib.physics import EnergyResolution
@@ -571,17 +926,33 @@ class model_dayabay:
             InverseSquareLaw,
             NueSurvivalProbability,
         )
+        from nested_mapping import NestedMapping
         from nested_mapping.tools import remap_items
-        from numpy import linspace
+        from numpy import exp, linspace, ndarray
 
-        from .bundles.refine_detector_data import refine_detector_data
+        from .bundles.refine_daily_data import refine_daily_data
         from .bundles.refine_lsnl_data import refine_lsnl_data
-        from .bundles.refine_neutrino_rate_data import refine_neutrino_rate_data
-        from .bundles.sync_neutrino_rate_detector_data import sync_neutrino_rate_detector_data
+        from .bundles.sum_daily_data import sum_daily_data
+        from .lib import (
+            AxisDistortionMatrixPointwiseSingle,
+            AxisDistortionPointwiseProduct,
+            BandedMatrix,
+            BandedVectorMatrixProduct,
+            Cast,
+            EnergyResolutionSingle,
+            RebinSegments,
+            RebinSegmentSum,
+            RenormalizeDiagSingle,
+        )
 
         # Initialize the storage and paths
         storage = self.storage
 
+        # The parameters configuration files, read by `load_parameters`, are taken from the build
+        # cache, when it is enabled
+        build_cache = self._build_cache
+        load_parameters = build_cache.wrap_load_parameters(load_parameters)
+
         # Read Eν edges for the parametrization of free antineutrino spectrum model
         # Loads the python file and returns variable "edges", which should be defined
         # in the file and has type `ndarray`.
@@ -783,6 +1154,22 @@ class model_dayabay:
         self.graph = Graph(close_on_exit=self._close, strict=self._strict)
 
         with self.graph, storage, FileReader:
+            # The readers of the build cache return the cached objects instead of reading the
+            # files
+            build_cache.register_readers(cfg_file_mapping.values())
+
+            if self._prefetch_threads:
+                from .tools.prefetch import prefetch_files
+
+                prefetch_files(
+                    (
+                        (cfg_file_mapping[name], kind)
+                        for name, (_, kind) in _DATASET_FILES.items()
+                        if name in cfg_file_mapping
+                    ),
+                    self._prefetch_threads,
+                )
+
             # Load all the parameters, necessary for the model. The parameters are divided into
             # three lists:
             # - constant - parameters are not expected to be modified during the analysis and thus
@@ -1127,6 +1514,15 @@ class model_dayabay:
                     "E_rec_MeV"
                 ]
 
+            # Choose the rebinning: the sums of the segments of the fine bins require each
+            # final edge to coincide with one of the fine edges.
+            if self._rebin_mode == "auto":
+                if RebinSegments.edges_are_aligned(in_edges_fine, in_edges_final):
+                    self._rebin_mode = "segments"
+                else:
+                    self._rebin_mode = "matrix"
+                logger.log(INFO, f"Rebin mode (auto): {self._rebin_mode}")
+
             # Instantiate the storage nodes for bin edges. In what follows all the
             # nodes, outputs and inputs are automatically added to the relevant storage
             # locations. This is done via usage of the `Node.replicate()` class method.
@@ -1253,18 +1649,26 @@ class model_dayabay:
             # each combination of "antineutrino_source.reactor.isotope.detector" indices. Note,
             # that NEQ part (antineutrino_source) has no contribution from ²³⁸U and SNF part has
             # not isotope index at all. In particular 384 integration nodes are created.
+            # In the "kernel" integration mode a single integration node is created for each
+            # combination of "detector.period" indices instead, see below.
+            if self._integration_mode == "parts":
+                name_integral = "integral"
+                replicate_integral = combinations["antineutrino_source.reactor.isotope.detector"]
+            else:
+                name_integral = "kernel.integral"
+                replicate_integral = combinations["detector.period"]
             Integrator.replicate(
                 "gl2d",
                 path="kinematics",
                 names={
                     "sampler": "sampler",
-                    "integrator": "integral",
+                    "integrator": name_integral,
                     "mesh_x": "sampler.mesh_edep",
                     "mesh_y": "sampler.mesh_costheta",
                     "orders_x": "sampler.orders_edep",
                     "orders_y": "sampler.orders_costheta",
                 },
-                replicate_outputs=combinations["antineutrino_source.reactor.isotope.detector"],
+                replicate_outputs=replicate_integral,
             )
             # Pass the integration orders to the sampler inputs. The operator `>>` is
             # used to make a connection `input >> output` or batch connection
@@ -1984,155 +2388,169 @@ class model_dayabay:
             # - livetime, eff, rate_accidentals - daily detector data according to the
             #                                     description above.
             # - eff_livetime - effective livetime = livetime*eff.
-            load_record_data(
-                name="daily_data.detector_all",
-                filenames=cfg_file_mapping["daily_detector_data"],
-                replicate_outputs=index["detector"],
-                columns=("day", "n_det", "livetime", "eff", "eff_livetime", "rate_accidentals"),
-                skip=inactive_detectors,
-            )
-
-            # The data of each detector is stored for the whole period of data taking.
-            # For this particular analysis the data should be split into arrays for each
-            # particular period. This is done by the `refine_detector_data` function,
-            # which reads columns and splits them based on `n_det` value. The function
-            # processes `days` and columns, specified in the `columns` argument.
-            # The data is read from "daily_data.detector_all" and stored in
-            # "daily_data.detector".
-            refine_detector_data(
-                data("daily_data.detector_all"),
-                data.create_child("daily_data.detector"),
-                detectors=index["detector"],
-                skip=inactive_detectors,
-                columns=("livetime", "eff", "eff_livetime", "rate_accidentals"),
-            )
-
-            # The reactor data is stored and read in a similar way and contains the
-            # following columns:
-            # - period - number of period for which data is presented, 0-based.
-            # - day - number of the first day of the period relative to the start of the data
-            #       taking, 0-based.
-            # - n_det_mask — binary mask, specifying which data taking periods are covered by the
-            #                current line (0b001 for 6AD, 0b010 for 8AD and 0b101 for 7AD).
-            # - n_days - length of the period in days. Weekly (7 days) data is provided.
-            # - neutrino_rate_per_s - average neutrino rate per period (week).
-            load_record_data(
-                name="daily_data.antineutrino_rate_all",
-                filenames=cfg_file_mapping["daily_antineutrino_rate_data"],
-                replicate_outputs=index["reactor"],
-                columns=("period", "day", "n_det_mask", "n_days", "neutrino_rate_per_s"),
-            )
-
-            # Antineutrino rate data is then converted from weekly to daily (no interpolation) and
-            # split into data taking periods. The data is read from "daily_data.neutrino_rate_all"
-            # and stored in "daily_data.reactor".
-            refine_neutrino_rate_data(
-                data("daily_data.antineutrino_rate_all"),
-                data.create_child("daily_data.reactor"),
-                reactors=index["reactor"],
-            )
-
-            # The detector and reactor data have different periods, therefore the arrays may not
-            # match. With the following procedure we produce matching arrays for detector properties
-            # and reactor data based on the `day`. The procedure also checks that the data ranges
-            # are consistent.
-            sync_neutrino_rate_detector_data(
-                data("daily_data.reactor"),
-                data("daily_data.detector"),
-            )
+            # The refined daily data is restored from the build cache if it is available.
+            if not build_cache.restore_storage(data, "daily_data"):
+                load_record_data(
+                    name="daily_data.detector_all",
+                    filenames=cfg_file_mapping["daily_detector_data"],
+                    replicate_outputs=index["detector"],
+                    columns=("day", "n_det", "livetime", "eff", "eff_livetime", "rate_accidentals"),
+                    skip=inactive_detectors,
+                )
 
-            # Finally for convenience we change the nesting order of the storage making the data
-            # taking period the innermost index. This does not affect matching the indices, however
-            # it is more convenient for plotting.
-            data["daily_data.reactor.antineutrino_rate_per_s"] = remap_items(
-                data.get_dict("daily_data.reactor.neutrino_rate_per_s"),
-                reorder_indices={
-                    "from": ["period", "reactor"],
-                    "to": ["reactor", "period"],
-                },
-            )
-            del data["daily_data.reactor.neutrino_rate_per_s"]
+                # The reactor data is stored and read in a similar way and contains the
+                # following columns:
+                # - period - number of period for which data is presented, 0-based.
+                # - day - number of the first day of the period relative to the start of the data
+                #       taking, 0-based.
+                # - n_det_mask — binary mask, specifying which data taking periods are covered by the
+                #                current line (0b001 for 6AD, 0b010 for 8AD and 0b100 for 7AD).
+                # - n_days - length of the period in days. Weekly (7 days) data is provided.
+                # - neutrino_rate_per_s - average neutrino rate per period (week).
+                load_record_data(
+                    name="daily_data.antineutrino_rate_all",
+                    filenames=cfg_file_mapping["daily_antineutrino_rate_data"],
+                    replicate_outputs=index["reactor"],
+                    columns=("period", "day", "n_det_mask", "n_days", "neutrino_rate_per_s"),
+                )
 
-            # After the data is split into arrays and synchronized we create array nodes
-            # for each input using `Array.from_storage` class method.
-            # `remove_processed_arrays` instructs the constructor to remove the data from
-            # storage after node is created in order not to keep duplicated data. We
-            # specifically set the data type to ensure the model does not depend on the
-            # datatype of the input.
-            #
-            # The following arrays are created:
-            # - days — an array of day numbers. A dedicated array for each period is
-            # stored.
-            # - detector data for each detector and period:
-            #   - livetime
-            #   - eff
-            #   - eff_livetime
-            #   - rate_accidentals
-            # - reactor data for each reactor and period:
-            #   - power
-            #   - fission_fractions
-            Array.from_storage(
-                "daily_data.detector.days",
-                storage.get_dict("data"),
-                remove_processed_arrays=True,
-                dtype="i",
-            )
+                # The data of each detector and reactor is stored for the whole period of data
+                # taking. For this particular analysis the data should be split into arrays for
+                # each particular period. This is done by the `refine_daily_data` function in a
+                # single pass:
+                # - the detector columns are split into periods based on `n_det` value, a single
+                #   split is done for all the detectors and columns.
+                # - the antineutrino rate is converted from weekly to daily (no interpolation) and
+                #   split into data taking periods based on `n_det_mask`.
+                # - the detector and reactor data have different periods, therefore the arrays are
+                #   synchronized based on the `day`. The procedure also checks that the data
+                #   ranges are consistent.
+                # The data is read from "daily_data.detector_all" and
+                # "daily_data.antineutrino_rate_all" and stored in "daily_data.detector" and
+                # "daily_data.reactor". The reactor data is stored with the data taking period
+                # as the innermost index: this does not affect matching the indices, however it
+                # is more convenient for plotting.
+                refine_daily_data(
+                    data("daily_data.detector_all"),
+                    data("daily_data.antineutrino_rate_all"),
+                    data.create_child("daily_data"),
+                    detectors=index["detector"],
+                    reactors=index["reactor"],
+                    skip=inactive_detectors,
+                    columns=("livetime", "eff", "eff_livetime", "rate_accidentals"),
+                )
 
-            # For convenience the array with days is moved one level up the structure.
-            # It may be used for both reactor and detector data.
-            outputs["daily_data.days"] = outputs.pop(
-                "daily_data.detector.days", delete_parents=True
-            )
+                build_cache.store_storage(data, "daily_data")
+
+            if self._daily_data_mode == "arrays":
+                # After the data is split into arrays and synchronized we create array nodes
+                # for each input using `Array.from_storage` class method.
+                # `remove_processed_arrays` instructs the constructor to remove the data from
+                # storage after node is created in order not to keep duplicated data. We
+                # specifically set the data type to ensure the model does not depend on the
+                # datatype of the input.
+                #
+                # The following arrays are created:
+                # - days — an array of day numbers. A dedicated array for each period is
+                # stored.
+                # - detector data for each detector and period:
+                #   - livetime
+                #   - eff
+                #   - eff_livetime
+                #   - rate_accidentals
+                # - reactor data for each reactor and period:
+                #   - power
+                #   - fission_fractions
+                Array.from_storage(
+                    "daily_data.detector.days",
+                    storage.get_dict("data"),
+                    remove_processed_arrays=True,
+                    dtype="i",
+                )
 
-            Array.from_storage(
-                "daily_data.detector.livetime",
-                storage.get_dict("data"),
-                remove_processed_arrays=True,
-                dtype="d",
-            )
+                # For convenience the array with days is moved one level up the structure.
+                # It may be used for both reactor and detector data.
+                outputs["daily_data.days"] = outputs.pop(
+                    "daily_data.detector.days", delete_parents=True
+                )
 
-            Array.from_storage(
-                "daily_data.detector.eff",
-                storage.get_dict("data"),
-                remove_processed_arrays=True,
-                dtype="d",
-            )
+                Array.from_storage(
+                    "daily_data.detector.livetime",
+                    storage.get_dict("data"),
+                    remove_processed_arrays=True,
+                    dtype="d",
+                )
 
-            Array.from_storage(
-                "daily_data.detector.eff_livetime",
-                storage.get_dict("data"),
-                remove_processed_arrays=True,
-                dtype="d",
-            )
+                Array.from_storage(
+                    "daily_data.detector.eff",
+                    storage.get_dict("data"),
+                    remove_processed_arrays=True,
+                    dtype="d",
+                )
 
-            Array.from_storage(
-                "daily_data.detector.rate_accidentals",
-                storage.get_dict("data"),
-                remove_processed_arrays=True,
-                dtype="d",
-            )
+                Array.from_storage(
+                    "daily_data.detector.eff_livetime",
+                    storage.get_dict("data"),
+                    remove_processed_arrays=True,
+                    dtype="d",
+                )
 
-            Array.from_storage(
-                "daily_data.reactor.antineutrino_rate_per_s",
-                storage.get_dict("data"),
-                remove_processed_arrays=True,
-                dtype="d",
-            )
-            del storage["data.daily_data"]
+                Array.from_storage(
+                    "daily_data.detector.rate_accidentals",
+                    storage.get_dict("data"),
+                    remove_processed_arrays=True,
+                    dtype="d",
+                )
 
-            # Compute a total (effective) livetime for each detector.
-            # ArraySum operation does not to combine different array: and produces an
-            # output for each input. Therefore there is no need to provide
-            # `replicate_outputs` argument this time.
-            ArraySum.replicate(
-                outputs.get_dict("daily_data.detector.livetime"),
-                name="detector.livetime",
-            )
+                Array.from_storage(
+                    "daily_data.reactor.antineutrino_rate_per_s",
+                    storage.get_dict("data"),
+                    remove_processed_arrays=True,
+                    dtype="d",
+                )
+                del storage["data.daily_data"]
+
+                # Compute a total (effective) livetime for each detector.
+                # ArraySum operation does not to combine different array: and produces an
+                # output for each input. Therefore there is no need to provide
+                # `replicate_outputs` argument this time.
+                ArraySum.replicate(
+                    outputs.get_dict("daily_data.detector.livetime"),
+                    name="detector.livetime",
+                )
 
-            ArraySum.replicate(
-                outputs.get_dict("daily_data.detector.eff_livetime"),
-                name="detector.eff_livetime",
-            )
+                ArraySum.replicate(
+                    outputs.get_dict("daily_data.detector.eff_livetime"),
+                    name="detector.eff_livetime",
+                )
+            else:
+                # The daily data enters the model only via the sums over the days of each
+                # period: the parameters (e.g. thermal power scale, efficiency) scale the
+                # sums. Therefore the sums are computed once with `sum_daily_data` and the
+                # daily arrays are not kept. The following arrays are created:
+                # - total livetime and effective livetime for each detector,
+                # - total number of accidentals [#·s/day] for each detector,
+                # - sum of the daily antineutrino rate of each reactor times the daily
+                #   effective livetime of each detector.
+                sum_daily_data(
+                    data("daily_data.reactor"),
+                    data("daily_data.detector"),
+                    data,
+                )
+                del storage["data.daily_data"]
+
+                for name in (
+                    "detector.livetime",
+                    "detector.eff_livetime",
+                    "background.count_acc_fixed_s_day",
+                    "reactor_detector.antineutrinos_eff_livetime",
+                ):
+                    Array.from_storage(
+                        name,
+                        storage.get_dict("data"),
+                        remove_processed_arrays=True,
+                        dtype="d",
+                    )
 
             # At this point we have the information to compute the antineutrino
             # flux.
@@ -2249,12 +2667,13 @@ class model_dayabay:
             # Using daily antineutrino rate for each reactor and nominal average number of
             # antineutrinos per MeV obtain an estimate of daily thermal power per reactor during
             # each period.
-            Division.replicate(
-                outputs.get_dict("daily_data.reactor.antineutrino_rate_per_s"),
-                outputs.get_value("reactor.antineutrinos_per_MeV_nominal_average"),
-                name="daily_data.reactor.thermal_power_average_MeV_per_s",
-                replicate_outputs=combinations["reactor.period"],
-            )
+            if self._daily_data_mode == "arrays":
+                Division.replicate(
+                    outputs.get_dict("daily_data.reactor.antineutrino_rate_per_s"),
+                    outputs.get_value("reactor.antineutrinos_per_MeV_nominal_average"),
+                    name="daily_data.reactor.thermal_power_average_MeV_per_s",
+                    replicate_outputs=combinations["reactor.period"],
+                )
 
             # In the few following operations we do similar calculations, but in a simplified form
             # for SNF, which has a minor contribution and therefore we avoid it depending on some of
@@ -2287,21 +2706,33 @@ class model_dayabay:
             # corresponding combination of indices may arise during iteration. Therefore
             # we provide a list of indices, which should not trigger an exception.
             # TODO
-            Product.replicate(
-                outputs.get_dict("daily_data.reactor.thermal_power_average_MeV_per_s"),
-                outputs.get_dict("daily_data.detector.eff_livetime"),
-                name="daily_data.reactor_detector.thermal_energy_MeV",
-                replicate_outputs=combinations["reactor.detector.period"],
-                allow_skip_inputs=True,
-                skippable_inputs_should_contain=inactive_detectors,
-            )
+            if self._daily_data_mode == "arrays":
+                Product.replicate(
+                    outputs.get_dict("daily_data.reactor.thermal_power_average_MeV_per_s"),
+                    outputs.get_dict("daily_data.detector.eff_livetime"),
+                    name="daily_data.reactor_detector.thermal_energy_MeV",
+                    replicate_outputs=combinations["reactor.detector.period"],
+                    allow_skip_inputs=True,
+                    skippable_inputs_should_contain=inactive_detectors,
+                )
 
-            # Sum up each array of daily data to obtain number of fissions as seen by
-            # each detector from each isotope from each reactor during each period.
-            ArraySum.replicate(
-                outputs.get_dict("daily_data.reactor_detector.thermal_energy_MeV"),
-                name="reactor_detector.thermal_energy_MeV",
-            )
+                # Sum up each array of daily data to obtain number of fissions as seen by
+                # each detector from each isotope from each reactor during each period.
+                ArraySum.replicate(
+                    outputs.get_dict("daily_data.reactor_detector.thermal_energy_MeV"),
+                    name="reactor_detector.thermal_energy_MeV",
+                )
+            else:
+                # The sums of the daily products are precomputed, only the division by the
+                # number of antineutrinos per MeV is done, which is O(1).
+                Division.replicate(
+                    outputs.get_dict("reactor_detector.antineutrinos_eff_livetime"),
+                    outputs.get_value("reactor.antineutrinos_per_MeV_nominal_average"),
+                    name="reactor_detector.thermal_energy_MeV",
+                    replicate_outputs=combinations["reactor.detector.period"],
+                    allow_skip_inputs=True,
+                    skippable_inputs_should_contain=inactive_detectors,
+                )
 
             # Based on the distances compute baseline factors (1/[4πL²]) for
             # reactor-detector combinations using `InverseSquareLaw` node. A scale
@@ -2422,100 +2853,171 @@ class model_dayabay:
                 name="kinematics.ibd.crosssection_jacobian",
             )
 
-            # For each reactor-detector pair make a product of survival probability,
-            # cross section and Jacobian.
-            Product.replicate(
-                outputs.get_value("kinematics.ibd.crosssection_jacobian"),
-                outputs.get_dict("survival_probability"),
-                name="kinematics.ibd.crosssection_jacobian_oscillations",
-                replicate_outputs=combinations["reactor.detector"],
-            )
+            if self._integration_mode == "parts":
+                # For each reactor-detector pair make a product of survival probability,
+                # cross section and Jacobian.
+                Product.replicate(
+                    outputs.get_value("kinematics.ibd.crosssection_jacobian"),
+                    outputs.get_dict("survival_probability"),
+                    name="kinematics.ibd.crosssection_jacobian_oscillations",
+                    replicate_outputs=combinations["reactor.detector"],
+                )
 
-            # Finally, multiply it by the antineutrino spectrum from each isotope.
-            # The result has three indices: isotope, reactor, detector.
-            Product.replicate(
-                outputs.get_dict("kinematics.ibd.crosssection_jacobian_oscillations"),
-                outputs.get_dict("reactor_antineutrino.part.neutrino_per_fission_per_MeV_main"),
-                name="kinematics.neutrino_cm2_per_MeV_per_fission_per_proton.part.nu_main",
-                replicate_outputs=combinations["reactor.isotope.detector"],
-            )
+                # Finally, multiply it by the antineutrino spectrum from each isotope.
+                # The result has three indices: isotope, reactor, detector.
+                Product.replicate(
+                    outputs.get_dict("kinematics.ibd.crosssection_jacobian_oscillations"),
+                    outputs.get_dict("reactor_antineutrino.part.neutrino_per_fission_per_MeV_main"),
+                    name="kinematics.neutrino_cm2_per_MeV_per_fission_per_proton.part.nu_main",
+                    replicate_outputs=combinations["reactor.isotope.detector"],
+                )
 
-            # Do the same the antineutrino spectrum, related to the NEQ correction
-            # (applies to 3 isotopes out of 4).
-            Product.replicate(
-                outputs.get_dict("kinematics.ibd.crosssection_jacobian_oscillations"),
+                # Do the same the antineutrino spectrum, related to the NEQ correction
+                # (applies to 3 isotopes out of 4).
+                Product.replicate(
+                    outputs.get_dict("kinematics.ibd.crosssection_jacobian_oscillations"),
+                    outputs.get_dict(
+                        "reactor_antineutrino.part.neutrino_per_fission_per_MeV_neq_nominal"
+                    ),
+                    name="kinematics.neutrino_cm2_per_MeV_per_fission_per_proton.part.nu_neq",
+                    replicate_outputs=combinations["reactor.isotope_neq.detector"],
+                )
+
+                # And for SNF.
+                Product.replicate(
+                    outputs.get_dict("kinematics.ibd.crosssection_jacobian_oscillations"),
+                    outputs.get_dict(
+                        "reactor_antineutrino.snf_antineutrino.neutrino_per_second_snf"
+                    ),
+                    name="kinematics.neutrino_cm2_per_MeV_per_fission_per_proton.part.nu_snf",
+                    replicate_outputs=combinations["reactor.detector"],
+                )
+
+                # Main, NEQ and SNF contributions are now stored in nearby with indices
+                # `nu_main`, `nu_neq` and `nu_snf` and may be connected to the relevant
+                # inputs of the 2d integrators.
                 outputs.get_dict(
-                    "reactor_antineutrino.part.neutrino_per_fission_per_MeV_neq_nominal"
-                ),
-                name="kinematics.neutrino_cm2_per_MeV_per_fission_per_proton.part.nu_neq",
-                replicate_outputs=combinations["reactor.isotope_neq.detector"],
-            )
+                    "kinematics.neutrino_cm2_per_MeV_per_fission_per_proton.part"
+                ) >> inputs.get_dict("kinematics.integral")
+
+                # Multiply by the integrated functions by relevant scaling factors, which
+                # together consist of:
+                #  - nu_main:   fissions_per_second[p,r,i] ×
+                #             × effective live time[p,d] ×
+                #             × N protons[d] ×
+                #             × efficiency[d]
+                Product.replicate(
+                    outputs.get_dict("kinematics.integral.nu_main"),
+                    outputs.get_dict("reactor_detector.n_fissions_n_protons_per_cm2_scaled"),
+                    name="eventscount.parts.nu_main",
+                    replicate_outputs=combinations["reactor.isotope.detector.period"],
+                )
 
-            # And for SNF.
-            Product.replicate(
-                outputs.get_dict("kinematics.ibd.crosssection_jacobian_oscillations"),
-                outputs.get_dict("reactor_antineutrino.snf_antineutrino.neutrino_per_second_snf"),
-                name="kinematics.neutrino_cm2_per_MeV_per_fission_per_proton.part.nu_snf",
-                replicate_outputs=combinations["reactor.detector"],
-            )
+                #  - nu_neq:    fissions_per_second[p,r,i] ×
+                #             × effective live time[p,d] ×
+                #             × N protons[d] ×
+                #             × efficiency[d] ×
+                #             × NEQ scale[r,i] ×
+                #             × neq_factor(=1)
+                # As NEQ is not applied to ²³⁸U, allow related inputs to be left
+                # unprocessed.
+                Product.replicate(
+                    outputs.get_dict("kinematics.integral.nu_neq"),
+                    outputs.get_dict("reactor_detector.n_fissions_n_protons_per_cm2_neq"),
+                    name="eventscount.parts.nu_neq",
+                    replicate_outputs=combinations["reactor.isotope_neq.detector.period"],
+                    allow_skip_inputs=True,
+                    skippable_inputs_should_contain=("U238",),
+                )
 
-            # Main, NEQ and SNF contributions are now stored in nearby with indices
-            # `nu_main`, `nu_neq` and `nu_snf` and may be connected to the relevant
-            # inputs of the 2d integrators.
-            outputs.get_dict(
-                "kinematics.neutrino_cm2_per_MeV_per_fission_per_proton.part"
-            ) >> inputs.get_dict("kinematics.integral")
-
-            # Multiply by the integrated functions by relevant scaling factors, which
-            # together consist of:
-            #  - nu_main:   fissions_per_second[p,r,i] ×
-            #             × effective live time[p,d] ×
-            #             × N protons[d] ×
-            #             × efficiency[d]
-            Product.replicate(
-                outputs.get_dict("kinematics.integral.nu_main"),
-                outputs.get_dict("reactor_detector.n_fissions_n_protons_per_cm2_scaled"),
-                name="eventscount.parts.nu_main",
-                replicate_outputs=combinations["reactor.isotope.detector.period"],
-            )
+                #  - nu_snf:    effective live time[p,d] ×
+                #             × N protons[d] ×
+                #             × efficiency[d] ×
+                #             × SNF scale[r] ×
+                #             × snf_factor(=1)
+                Product.replicate(
+                    outputs.get_dict("kinematics.integral.nu_snf"),
+                    outputs.get_dict("reactor_detector.eff_livetime_n_protons_per_cm2_snf"),
+                    name="eventscount.parts.nu_snf",
+                    replicate_outputs=combinations["reactor.detector.period"],
+                )
 
-            #  - nu_neq:    fissions_per_second[p,r,i] ×
-            #             × effective live time[p,d] ×
-            #             × N protons[d] ×
-            #             × efficiency[d] ×
-            #             × NEQ scale[r,i] ×
-            #             × neq_factor(=1)
-            # As NEQ is not applied to ²³⁸U, allow related inputs to be left
-            # unprocessed.
-            Product.replicate(
-                outputs.get_dict("kinematics.integral.nu_neq"),
-                outputs.get_dict("reactor_detector.n_fissions_n_protons_per_cm2_neq"),
-                name="eventscount.parts.nu_neq",
-                replicate_outputs=combinations["reactor.isotope_neq.detector.period"],
-                allow_skip_inputs=True,
-                skippable_inputs_should_contain=("U238",),
-            )
+                # Finally sum together the contributions from reactors and from antineutrino
+                # sources (main, NEQ, SNF) obtaining an expected spectrum in each detector
+                # during each period.
+                Sum.replicate(
+                    outputs.get_dict("eventscount.parts"),
+                    name="eventscount.stages.raw",
+                    replicate_outputs=combinations["detector.period"],
+                )
+            else:
+                # The integration is linear, therefore the scaling factors and the sums may
+                # be applied before the integration. The scaled antineutrino spectra are
+                # combined into the kernel for each reactor, detector and period, which does
+                # not depend on the oscillation parameters.
+                Product.replicate(
+                    outputs.get_dict("reactor_antineutrino.part.neutrino_per_fission_per_MeV_main"),
+                    outputs.get_dict("reactor_detector.n_fissions_n_protons_per_cm2_scaled"),
+                    name="kinematics.kernel.part.nu_main",
+                    replicate_outputs=combinations["reactor.isotope.detector.period"],
+                )
+                Product.replicate(
+                    outputs.get_dict(
+                        "reactor_antineutrino.part.neutrino_per_fission_per_MeV_neq_nominal"
+                    ),
+                    outputs.get_dict("reactor_detector.n_fissions_n_protons_per_cm2_neq"),
+                    name="kinematics.kernel.part.nu_neq",
+                    replicate_outputs=combinations["reactor.isotope_neq.detector.period"],
+                    allow_skip_inputs=True,
+                    skippable_inputs_should_contain=("U238",),
+                )
+                Product.replicate(
+                    outputs.get_dict(
+                        "reactor_antineutrino.snf_antineutrino.neutrino_per_second_snf"
+                    ),
+                    outputs.get_dict("reactor_detector.eff_livetime_n_protons_per_cm2_snf"),
+                    name="kinematics.kernel.part.nu_snf",
+                    replicate_outputs=combinations["reactor.detector.period"],
+                )
 
-            #  - nu_snf:    effective live time[p,d] ×
-            #             × N protons[d] ×
-            #             × efficiency[d] ×
-            #             × SNF scale[r] ×
-            #             × snf_factor(=1)
-            Product.replicate(
-                outputs.get_dict("kinematics.integral.nu_snf"),
-                outputs.get_dict("reactor_detector.eff_livetime_n_protons_per_cm2_snf"),
-                name="eventscount.parts.nu_snf",
-                replicate_outputs=combinations["reactor.detector.period"],
-            )
+                # Sum the antineutrino sources and isotopes for each reactor and multiply by
+                # the cross section and the Jacobian.
+                Sum.replicate(
+                    outputs.get_dict("kinematics.kernel.part"),
+                    name="kinematics.kernel.reactor",
+                    replicate_outputs=combinations["reactor.detector.period"],
+                )
+                Product.replicate(
+                    outputs.get_value("kinematics.ibd.crosssection_jacobian"),
+                    outputs.get_dict("kinematics.kernel.reactor"),
+                    name="kinematics.kernel.reactor_crosssection_jacobian",
+                    replicate_outputs=combinations["reactor.detector.period"],
+                )
 
-            # Finally sum together the contributions from reactors and from antineutrino
-            # sources (main, NEQ, SNF) obtaining an expected spectrum in each detector
-            # during each period.
-            Sum.replicate(
-                outputs.get_dict("eventscount.parts"),
-                name="eventscount.stages.raw",
-                replicate_outputs=combinations["detector.period"],
-            )
+                # Only the following part depends on the oscillation parameters: the kernel
+                # is multiplied by the survival probability and summed over the reactors.
+                Product.replicate(
+                    outputs.get_dict("survival_probability"),
+                    outputs.get_dict("kinematics.kernel.reactor_crosssection_jacobian"),
+                    name="kinematics.kernel.reactor_oscillations",
+                    replicate_outputs=combinations["reactor.detector.period"],
+                )
+                Sum.replicate(
+                    outputs.get_dict("kinematics.kernel.reactor_oscillations"),
+                    name="kinematics.kernel.integrand",
+                    replicate_outputs=combinations["detector.period"],
+                )
+
+                # A single integral is computed for each detector and period
+                outputs.get_dict("kinematics.kernel.integrand") >> inputs.get_dict(
+                    "kinematics.kernel.integral"
+                )
+
+                Sum.replicate(
+                    outputs.get_dict("kinematics.kernel.integral"),
+                    name="eventscount.stages.raw",
+                    replicate_outputs=combinations["detector.period"],
+                )
 
             # TODO: doc
             if self.spectrum_correction_location == "after-integration":
@@ -2527,6 +3029,30 @@ class model_dayabay:
                     name="eventscount.stages.raw_antineutrino_spectrum_corrected",
                     replicate_outputs=combinations["detector.period"],
                 )
+                key_raw = "eventscount.stages.raw_antineutrino_spectrum_corrected"
+            else:
+                key_raw = "eventscount.stages.raw"
+
+            # In the mixed precision mode the detector response is evaluated in single
+            # precision. The integrated spectra are converted to float32, the dtype of the
+            # products and sums is then derived from them. The IAV, LSNL and energy
+            # resolution matrices are computed from the double precision inputs and are
+            # stored directly in float32. The final spectra are converted back to float64,
+            # when summed with the backgrounds.
+            if self._precision == "mixed":
+                Cast.replicate(
+                    outputs.get_dict(key_raw),
+                    name="eventscount.stages.raw_single",
+                    dtype="f",
+                )
+                key_raw = "eventscount.stages.raw_single"
+                RenormalizeDiagNode = RenormalizeDiagSingle
+                AxisDistortionMatrixNode = AxisDistortionMatrixPointwiseSingle
+                EnergyResolutionNode = EnergyResolutionSingle
+            else:
+                RenormalizeDiagNode = RenormalizeDiag
+                AxisDistortionMatrixNode = AxisDistortionMatrixPointwise
+                EnergyResolutionNode = EnergyResolution
 
             # At this points the IBD spectra at each detector are available assuming the
             # ideal detector response. 4 transformations will be applied in the
@@ -2561,7 +3087,7 @@ class model_dayabay:
             # The IAV distortion has an uncorrelated between detector uncertainty,
             # introduced as a factor, which scales the off-diagonal elements of the IAV
             # matrix.
-            RenormalizeDiag.replicate(
+            RenormalizeDiagNode.replicate(
                 mode="offdiag",
                 name="detector.iav.matrix_rescaled",
                 replicate_outputs=index["detector"],
@@ -2579,26 +3105,37 @@ class model_dayabay:
 
             # The correction is applied as matrix multiplication of smearing matrix over
             # column for each detector during each period..
-            VectorMatrixProduct.replicate(
-                name="eventscount.stages.iav",
-                mode="column",
-                replicate_outputs=combinations["detector.period"],
-            )
-            # Match and connect rescaled IAV distortion matrix for each detector to the
-            # smearing node of each detector during each period.
-            outputs.get_dict("detector.iav.matrix_rescaled") >> inputs.get_dict(
-                "eventscount.stages.iav.matrix"
-            )
-            # Match and connect IBD histogram each detector during each period to the
-            # relevant IAV smearing input.
-            if self.spectrum_correction_location == "after-integration":
-                outputs.get_dict(
-                    "eventscount.stages.raw_antineutrino_spectrum_corrected"
-                ) >> inputs.get_dict("eventscount.stages.iav.vector")
+            # In the banded mode only the non-zero part of each row of the triangular IAV
+            # matrix is stored, once for each detector, and multiplied.
+            if self._detector_matrix_mode == "dense":
+                VectorMatrixProduct.replicate(
+                    name="eventscount.stages.iav",
+                    mode="column",
+                    replicate_outputs=combinations["detector.period"],
+                )
+                # Match and connect rescaled IAV distortion matrix for each detector to the
+                # smearing node of each detector during each period.
+                outputs.get_dict("detector.iav.matrix_rescaled") >> inputs.get_dict(
+                    "eventscount.stages.iav.matrix"
+                )
             else:
-                outputs.get_dict("eventscount.stages.raw") >> inputs.get_dict(
-                    "eventscount.stages.iav.vector"
+                BandedMatrix.replicate(
+                    name="detector.iav.matrix_banded",
+                    replicate_outputs=index["detector"],
+                )
+                outputs.get_dict("detector.iav.matrix_rescaled") >> inputs.get_dict(
+                    "detector.iav.matrix_banded"
+                )
+                BandedVectorMatrixProduct.replicate(
+                    name="eventscount.stages.iav",
+                    replicate_outputs=combinations["detector.period"],
                 )
+                outputs.get_dict("detector.iav.matrix_banded") >> inputs.get_dict(
+                    "eventscount.stages.iav.band"
+                )
+            # Match and connect IBD histogram each detector during each period to the
+            # relevant IAV smearing input.
+            outputs.get_dict(key_raw) >> inputs.get_dict("eventscount.stages.iav.vector")
 
             # The LSNL distortion matrix is created based on a relative energy scale
             # distortion curve and a few nuisance curves, loaded with `load_graph_data`
@@ -2606,33 +3143,37 @@ class model_dayabay:
             #
             # Within our definition LSNL converts the deposited within scintillator
             # energy (Escint) into visible energy (Evis).
-            load_graph_data(
-                name="detector.lsnl.curves",
-                x="escint",
-                y="evis_parts",
-                merge_x=True,
-                filenames=cfg_file_mapping["lsnl_curves"],
-                replicate_outputs=index["lsnl"],
-            )
+            # The refined LSNL curves are restored from the build cache if they are available.
+            if not build_cache.restore_storage(storage, "data.detector.lsnl.curves"):
+                load_graph_data(
+                    name="detector.lsnl.curves",
+                    x="escint",
+                    y="evis_parts",
+                    merge_x=True,
+                    filenames=cfg_file_mapping["lsnl_curves"],
+                    replicate_outputs=index["lsnl"],
+                )
 
-            # Pre-process LSNL curves in the following order:
-            # - convert relative curves to absolute ones.
-            # - interpolate with 4 times smaller step using `cubic` interpolation (`refine_times`
-            #   argument).
-            # - extrapolate linearly absolute curves to an extended range (`newmin` and `newmax`).
-            # - compute (nominal-pullᵢ) difference curves to be used as corrections.
-            #
-            # The new fine Escint will be stored to `xname`. The argument `nominalname` selects the
-            # nominal curve. The curves will be overwritten.
-            refine_lsnl_data(
-                storage.get_dict("data.detector.lsnl.curves"),
-                xname="escint",
-                nominalname="evis_parts.nominal",
-                refine_times=4,
-                newmin=0.5,
-                newmax=12.1,
-                # savgol_filter_smoothen = (10, 4)
-            )
+                # Pre-process LSNL curves in the following order:
+                # - convert relative curves to absolute ones.
+                # - interpolate with 4 times smaller step using `cubic` interpolation (`refine_times`
+                #   argument).
+                # - extrapolate linearly absolute curves to an extended range (`newmin` and `newmax`).
+                # - compute (nominal-pullᵢ) difference curves to be used as corrections.
+                #
+                # The new fine Escint will be stored to `xname`. The argument `nominalname` selects the
+                # nominal curve. The curves will be overwritten.
+                refine_lsnl_data(
+                    storage.get_dict("data.detector.lsnl.curves"),
+                    xname="escint",
+                    nominalname="evis_parts.nominal",
+                    refine_times=4,
+                    newmin=0.5,
+                    newmax=12.1,
+                    # savgol_filter_smoothen = (10, 4)
+                )
+
+                build_cache.store_storage(storage, "data.detector.lsnl.curves")
 
             # Create (graph) arrays for the LSNL curves. A dedicated array for X axis,
             # based on meshname="escint" will be created. Each curve will have a
@@ -2737,30 +3278,55 @@ class model_dayabay:
                 replicate_outputs=index["detector"],
             )
 
-            AxisDistortionMatrixPointwise.replicate(
-                name="detector.lsnl.matrix",
-                replicate_outputs=index["detector"],
-            )
-            edges_energy_escint.outputs[0] >> inputs.get_dict("detector.lsnl.matrix.EdgesOriginal")
-            edges_energy_evis.outputs[0] >> inputs.get_dict("detector.lsnl.matrix.EdgesTarget")
+            # The dense LSNL matrix is needed for the dense product and for the fused
+            # response. In the banded mode each escint bin is mapped onto one or two evis
+            # bins, and only these weights are computed from the curves, once for all the
+            # periods of a detector.
+            if self._detector_matrix_mode == "dense" or self._detector_response_mode == "fused":
+                AxisDistortionMatrixNode.replicate(
+                    name="detector.lsnl.matrix",
+                    replicate_outputs=index["detector"],
+                )
+                edges_energy_escint.outputs[0] >> inputs.get_dict(
+                    "detector.lsnl.matrix.EdgesOriginal"
+                )
+                edges_energy_evis.outputs[0] >> inputs.get_dict("detector.lsnl.matrix.EdgesTarget")
 
-            outputs.get_value("detector.lsnl.curves.escint") >> inputs.get_dict(
-                "detector.lsnl.matrix.DistortionOriginal",
-            )
-            outputs.get_dict("detector.lsnl.curves.evis_coarse_scaled") >> inputs.get_dict(
-                "detector.lsnl.matrix.DistortionTarget",
-            )
+                outputs.get_value("detector.lsnl.curves.escint") >> inputs.get_dict(
+                    "detector.lsnl.matrix.DistortionOriginal",
+                )
+                outputs.get_dict("detector.lsnl.curves.evis_coarse_scaled") >> inputs.get_dict(
+                    "detector.lsnl.matrix.DistortionTarget",
+                )
 
             # Finally as in the case with IAV apply distortions to the spectra for each
             # detector and period.
-            VectorMatrixProduct.replicate(
-                name="eventscount.stages.evis",
-                mode="column",
-                replicate_outputs=combinations["detector.period"],
-            )
-            outputs.get_dict("detector.lsnl.matrix") >> inputs.get_dict(
-                "eventscount.stages.evis.matrix"
-            )
+            if self._detector_matrix_mode == "dense":
+                VectorMatrixProduct.replicate(
+                    name="eventscount.stages.evis",
+                    mode="column",
+                    replicate_outputs=combinations["detector.period"],
+                )
+                outputs.get_dict("detector.lsnl.matrix") >> inputs.get_dict(
+                    "eventscount.stages.evis.matrix"
+                )
+            else:
+                AxisDistortionPointwiseProduct.replicate(
+                    name="eventscount.stages.evis",
+                    replicate_outputs=combinations["detector.period"],
+                )
+                edges_energy_escint.outputs[0] >> inputs.get_dict(
+                    "eventscount.stages.evis.EdgesOriginal"
+                )
+                edges_energy_evis.outputs[0] >> inputs.get_dict(
+                    "eventscount.stages.evis.EdgesTarget"
+                )
+                outputs.get_value("detector.lsnl.curves.escint") >> inputs.get_dict(
+                    "eventscount.stages.evis.DistortionOriginal",
+                )
+                outputs.get_dict("detector.lsnl.curves.evis_coarse_scaled") >> inputs.get_dict(
+                    "eventscount.stages.evis.DistortionTarget",
+                )
             # Use outputs after IAV correction to serve as inputs.
             outputs.get_dict("eventscount.stages.iav") >> inputs.get_dict(
                 "eventscount.stages.evis.vector"
@@ -2782,7 +3348,7 @@ class model_dayabay:
             # - BinCenter — tiny node to compute bin centers.
             #
             # TODO: target edges (to output_edges)
-            EnergyResolution.replicate(path="detector.eres")
+            EnergyResolutionNode.replicate(path="detector.eres")
 
             # Pass energy resolution parameters a_nonuniform, b_stat, c_noise to the
             # common σ-node.
@@ -2804,14 +3370,35 @@ class model_dayabay:
             # Finally as on previous steps compute a product of a common energy
             # resolution matrix and input spectrum (after LSNL) for each detector during
             # period.
-            VectorMatrixProduct.replicate(
-                name="eventscount.stages.erec",
-                mode="column",
-                replicate_outputs=combinations["detector.period"],
-            )
-            outputs.get_value("detector.eres.matrix") >> inputs.get_dict(
-                "eventscount.stages.erec.matrix"
-            )
+            # In the banded mode the band of the energy resolution matrix is stored once. The
+            # Gaussian is truncated at `eres_nsigma`+1: the elements, which are below
+            # exp(-nσ²/2) of the maximum of the column, are dropped. The support of the band
+            # is fixed at the nominal resolution, the extra σ is the margin for the changes
+            # of the resolution.
+            if self._detector_matrix_mode == "dense":
+                VectorMatrixProduct.replicate(
+                    name="eventscount.stages.erec",
+                    mode="column",
+                    replicate_outputs=combinations["detector.period"],
+                )
+                outputs.get_value("detector.eres.matrix") >> inputs.get_dict(
+                    "eventscount.stages.erec.matrix"
+                )
+            else:
+                BandedMatrix.replicate(
+                    name="detector.eres.matrix_banded",
+                    threshold=exp(-0.5 * (self._eres_nsigma + 1.0) ** 2),
+                )
+                outputs.get_value("detector.eres.matrix") >> inputs.get_value(
+                    "detector.eres.matrix_banded"
+                )
+                BandedVectorMatrixProduct.replicate(
+                    name="eventscount.stages.erec",
+                    replicate_outputs=combinations["detector.period"],
+                )
+                outputs.get_value("detector.eres.matrix_banded") >> inputs.get_dict(
+                    "eventscount.stages.erec.band"
+                )
             outputs.get_dict("eventscount.stages.evis") >> inputs.get_dict(
                 "eventscount.stages.erec.vector"
             )
@@ -2825,11 +3412,20 @@ class model_dayabay:
                 name="detector.normalization",
                 replicate_outputs=index["detector"],
             )
+            if self._precision == "mixed":
+                Cast.replicate(
+                    outputs.get_dict("detector.normalization"),
+                    name="detector.normalization_single",
+                    dtype="f",
+                )
+                key_normalization = "detector.normalization_single"
+            else:
+                key_normalization = "detector.normalization"
 
             # Apply individual normalization (per detector) to each detectors prediction
             # during each period.
             Product.replicate(
-                outputs.get_dict("detector.normalization"),
+                outputs.get_dict(key_normalization),
                 outputs.get_dict("eventscount.stages.erec"),
                 name="eventscount.fine.ibd_normalized",
                 replicate_outputs=combinations["detector.period"],
@@ -2847,25 +3443,122 @@ class model_dayabay:
             # Rebin the expected histograms for each detector during each period into
             # final binning. It is done by MetaNode Rebin, which combine the computation
             # of the rebin matrix and its application via VectorMatrixProduct.
-            Rebin.replicate(
-                names={
-                    "matrix": "detector.rebin.matrix_ibd",
-                    "product": "eventscount.final.ibd",
-                },
-                replicate_outputs=combinations["detector.period"],
-            )
-            # Connect old (Erec) and new (final) energy edges.
-            edges_energy_erec >> inputs.get_value("detector.rebin.matrix_ibd.edges_old")
-            edges_energy_final >> inputs.get_value("detector.rebin.matrix_ibd.edges_new")
-            # Pass the fine-bin spectra into inputs.
-            outputs.get_dict("eventscount.fine.ibd_normalized") >> inputs.get_dict(
-                "eventscount.final.ibd"
-            )
-
-            # The following block is related to the computation and application of the
-            # background spectra. The background rates are given per day, therefore
-            # first we need to convert the effective livetime in s to day. This will be
-            # used for most of the sources of backgrounds, except for accidentals as
+            # In the fused mode the stage by stage result is stored separately and is
+            # computed only on demand.
+            if self._detector_response_mode == "stages":
+                key_final_ibd = "eventscount.final.ibd"
+            else:
+                key_final_ibd = "eventscount.final.ibd_stages"
+            if self._rebin_mode == "matrix":
+                Rebin.replicate(
+                    names={
+                        "matrix": "detector.rebin.matrix_ibd",
+                        "product": key_final_ibd,
+                    },
+                    replicate_outputs=combinations["detector.period"],
+                )
+                # Connect old (Erec) and new (final) energy edges.
+                edges_energy_erec >> inputs.get_value("detector.rebin.matrix_ibd.edges_old")
+                edges_energy_final >> inputs.get_value("detector.rebin.matrix_ibd.edges_new")
+                # Pass the fine-bin spectra into inputs.
+                outputs.get_dict("eventscount.fine.ibd_normalized") >> inputs.get_dict(
+                    key_final_ibd
+                )
+            else:
+                # The final edges are a subset of the Erec edges, therefore each final bin
+                # is a sum of a contiguous segment of the fine bins. The plan of the
+                # segments is computed once and is used to rebin all the histograms: IBD,
+                # backgrounds and data.
+                RebinSegments.replicate(name="detector.rebin.segments")
+                edges_energy_erec >> inputs.get_value("detector.rebin.segments.edges_old")
+                edges_energy_final >> inputs.get_value("detector.rebin.segments.edges_new")
+
+                # The sums are accumulated in double precision, therefore the final spectra
+                # are in double precision also in the mixed precision mode.
+                RebinSegmentSum.replicate(
+                    name=key_final_ibd,
+                    replicate_outputs=combinations["detector.period"],
+                    dtype="d",
+                )
+                outputs.get_value("detector.rebin.segments") >> inputs.get_dict(
+                    f"{key_final_ibd}.segments"
+                )
+                edges_energy_final >> inputs.get_dict(f"{key_final_ibd}.edges_new")
+                outputs.get_dict("eventscount.fine.ibd_normalized") >> inputs.get_dict(
+                    f"{key_final_ibd}.vector"
+                )
+
+                # The rebinning matrix is needed only for the fused detector response.
+                if self._detector_response_mode == "fused":
+                    RebinMatrix.replicate(name="detector.rebin.matrix_ibd")
+                    edges_energy_erec >> inputs.get_value("detector.rebin.matrix_ibd.edges_old")
+                    edges_energy_final >> inputs.get_value("detector.rebin.matrix_ibd.edges_new")
+
+            if self._detector_response_mode == "fused":
+                # All the stages of the detector response are linear, therefore the
+                # matrices may be multiplied into a single matrix for each detector:
+                # rebin @ eres @ lsnl[d] @ iav[d]. The rebinning and energy resolution
+                # matrices are common and are multiplied first, the product has as many
+                # rows as the final binning. The fused matrix depends only on the
+                # parameters of the detector response and is not recomputed, when
+                # the other parameters are changed.
+                MatrixProductAB.replicate(name="detector.response.rebin_eres")
+                outputs.get_value("detector.rebin.matrix_ibd") >> inputs.get_value(
+                    "detector.response.rebin_eres.left"
+                )
+                outputs.get_value("detector.eres.matrix") >> inputs.get_value(
+                    "detector.response.rebin_eres.right"
+                )
+
+                MatrixProductAB.replicate(
+                    name="detector.response.rebin_eres_lsnl",
+                    replicate_outputs=index["detector"],
+                )
+                outputs.get_value("detector.response.rebin_eres") >> inputs.get_dict(
+                    "detector.response.rebin_eres_lsnl.left"
+                )
+                outputs.get_dict("detector.lsnl.matrix") >> inputs.get_dict(
+                    "detector.response.rebin_eres_lsnl.right"
+                )
+
+                MatrixProductAB.replicate(
+                    name="detector.response.matrix",
+                    replicate_outputs=index["detector"],
+                )
+                outputs.get_dict("detector.response.rebin_eres_lsnl") >> inputs.get_dict(
+                    "detector.response.matrix.left"
+                )
+                outputs.get_dict("detector.iav.matrix_rescaled") >> inputs.get_dict(
+                    "detector.response.matrix.right"
+                )
+
+                # Apply the fused matrix to the spectrum of each detector during each
+                # period and then the normalization.
+                VectorMatrixProduct.replicate(
+                    name="eventscount.final.ibd_unnormalized",
+                    mode="column",
+                    replicate_outputs=combinations["detector.period"],
+                )
+                # The result follows the dtype of the spectrum. The fused matrices are small
+                # and are kept in double precision.
+                outputs.get_dict("detector.response.matrix") >> inputs.get_dict(
+                    "eventscount.final.ibd_unnormalized.matrix"
+                )
+                outputs.get_dict(key_raw) >> inputs.get_dict(
+                    "eventscount.final.ibd_unnormalized.vector"
+                )
+
+                Product.replicate(
+                    outputs.get_dict(key_normalization),
+                    outputs.get_dict("eventscount.final.ibd_unnormalized"),
+                    name="eventscount.final.ibd",
+                    replicate_outputs=combinations["detector.period"],
+                )
+
+            # The following block is related to the computation and application of the
+            # background spectra. The background rates are given per day, therefore
+            # first we need to convert the effective livetime in s to day. This will be
+            # used for most of the sources of backgrounds, except for accidentals as
             # accidental rates are given on a daily basis.
             Product.replicate(
                 outputs.get_dict("detector.eff_livetime"),
@@ -2878,20 +3571,22 @@ class model_dayabay:
 
             # Compute the daily number accidental background events by multiplying daliy
             # rate of accidentals and daily effective livetime. The temporary unit is
-            # [#·s/day].
-            Product.replicate(
-                outputs.get_dict("daily_data.detector.eff_livetime"),
-                outputs.get_dict("daily_data.detector.rate_accidentals"),
-                name="daily_data.detector.num_acc_s_day",
-                replicate_outputs=combinations["detector.period"],
-            )
+            # [#·s/day]. With the precomputed sums of the daily data the total number is
+            # already available.
+            if self._daily_data_mode == "arrays":
+                Product.replicate(
+                    outputs.get_dict("daily_data.detector.eff_livetime"),
+                    outputs.get_dict("daily_data.detector.rate_accidentals"),
+                    name="daily_data.detector.num_acc_s_day",
+                    replicate_outputs=combinations["detector.period"],
+                )
 
-            # Sum the contents of each array to obtain the total number of accidental
-            # events in each detector during each period. Still [#·s/day].
-            ArraySum.replicate(
-                outputs.get_dict("daily_data.detector.num_acc_s_day"),
-                name="background.count_acc_fixed_s_day",
-            )
+                # Sum the contents of each array to obtain the total number of accidental
+                # events in each detector during each period. Still [#·s/day].
+                ArraySum.replicate(
+                    outputs.get_dict("daily_data.detector.num_acc_s_day"),
+                    name="background.count_acc_fixed_s_day",
+                )
 
             # Finally, normalize the unit by dividing by number of seconds in day and
             # obtain total number of accidentals.
@@ -2994,42 +3689,92 @@ class model_dayabay:
                 replicate_outputs=combinations["background.detector"],
             )
 
-            Rebin.replicate(
-                names={
-                    "matrix": "detector.rebin.matrix_background_by_source",
-                    "product": "eventscount.final.background_by_source",
-                },
-                replicate_outputs=combinations["background.detector"],
-            )
-            edges_energy_erec >> inputs.get_value("detector.rebin.matrix_background_by_source.edges_old")
-            edges_energy_final >> inputs.get_value(
-                "detector.rebin.matrix_background_by_source.edges_new"
-            )
-            outputs("eventscount.fine.background_by_source") >> inputs("eventscount.final.background_by_source")
+            if self._rebin_mode == "matrix":
+                Rebin.replicate(
+                    names={
+                        "matrix": "detector.rebin.matrix_background_by_source",
+                        "product": "eventscount.final.background_by_source",
+                    },
+                    replicate_outputs=combinations["background.detector"],
+                )
+                edges_energy_erec >> inputs.get_value("detector.rebin.matrix_background_by_source.edges_old")
+                edges_energy_final >> inputs.get_value(
+                    "detector.rebin.matrix_background_by_source.edges_new"
+                )
+                outputs("eventscount.fine.background_by_source") >> inputs("eventscount.final.background_by_source")
+            else:
+                RebinSegmentSum.replicate(
+                    name="eventscount.final.background_by_source",
+                    replicate_outputs=combinations["background.detector"],
+                )
+                outputs.get_value("detector.rebin.segments") >> inputs.get_dict(
+                    "eventscount.final.background_by_source.segments"
+                )
+                edges_energy_final >> inputs.get_dict(
+                    "eventscount.final.background_by_source.edges_new"
+                )
+                outputs("eventscount.fine.background_by_source") >> inputs(
+                    "eventscount.final.background_by_source.vector"
+                )
+
+            # In the mixed precision mode the IBD spectra are converted back to double
+            # precision before they are summed with the backgrounds. The final spectra are
+            # already in double precision, when they are rebinned by `RebinSegmentSum`.
+            if self._precision == "mixed":
+                Cast.replicate(
+                    outputs.get_dict("eventscount.fine.ibd_normalized"),
+                    name="eventscount.fine.ibd_normalized_double",
+                    dtype="d",
+                )
+                key_ibd_fine = "eventscount.fine.ibd_normalized_double"
+            else:
+                key_ibd_fine = "eventscount.fine.ibd_normalized"
+            if self._precision == "mixed" and self._final_ibd_single:
+                Cast.replicate(
+                    outputs.get_dict("eventscount.final.ibd"),
+                    name="eventscount.final.ibd_double",
+                    dtype="d",
+                )
+                key_ibd_final = "eventscount.final.ibd_double"
+            else:
+                key_ibd_final = "eventscount.final.ibd"
 
             Sum.replicate(
-                outputs("eventscount.fine.ibd_normalized"),
+                outputs(key_ibd_fine),
                 outputs("eventscount.fine.background"),
                 name="eventscount.fine.total",
                 replicate_outputs=combinations["detector.period"],
                 check_edges_contents=True,
             )
 
-            Rebin.replicate(
-                names={
-                    "matrix": "detector.rebin.matrix_background",
-                    "product": "eventscount.final.background",
-                },
-                replicate_outputs=combinations["detector.period"],
-            )
-            edges_energy_erec >> inputs.get_value("detector.rebin.matrix_background.edges_old")
-            edges_energy_final >> inputs.get_value(
-                "detector.rebin.matrix_background.edges_new"
-            )
-            outputs("eventscount.fine.background") >> inputs("eventscount.final.background")
+            if self._rebin_mode == "matrix":
+                Rebin.replicate(
+                    names={
+                        "matrix": "detector.rebin.matrix_background",
+                        "product": "eventscount.final.background",
+                    },
+                    replicate_outputs=combinations["detector.period"],
+                )
+                edges_energy_erec >> inputs.get_value("detector.rebin.matrix_background.edges_old")
+                edges_energy_final >> inputs.get_value(
+                    "detector.rebin.matrix_background.edges_new"
+                )
+                outputs("eventscount.fine.background") >> inputs("eventscount.final.background")
+            else:
+                RebinSegmentSum.replicate(
+                    name="eventscount.final.background",
+                    replicate_outputs=combinations["detector.period"],
+                )
+                outputs.get_value("detector.rebin.segments") >> inputs.get_dict(
+                    "eventscount.final.background.segments"
+                )
+                edges_energy_final >> inputs.get_dict("eventscount.final.background.edges_new")
+                outputs("eventscount.fine.background") >> inputs(
+                    "eventscount.final.background.vector"
+                )
 
             Sum.replicate(
-                outputs("eventscount.final.ibd"),
+                outputs(key_ibd_final),
                 outputs("eventscount.final.background"),
                 name="eventscount.final.detector_period",
                 replicate_outputs=combinations["detector.period"],
@@ -3078,6 +3823,37 @@ class model_dayabay:
                 >> self._covariance_matrix
             )
 
+            from .tools.covariance_update import CovarianceUpdate
+
+            covariance_update_groups = {}
+            for group in self._covariance_groups:
+                parameters_group = parameters_nuisance_normalized[
+                    self.systematic_uncertainties_groups[group]
+                ]
+                covariance_update_groups[group] = (
+                    tuple(parameters_group.walkvalues())
+                    if isinstance(parameters_group, NestedMapping)
+                    else (parameters_group,)
+                )
+            if self._jacobian_mode == "forward":
+                from .tools.forward_jacobian import ForwardJacobian
+
+                for group, parameters_group in covariance_update_groups.items():
+                    jacobian = nodes.get_value(f"covariance.jacobians.{group}")
+                    forward_jacobian = ForwardJacobian(
+                        outputs.get_value("eventscount.final.concatenated.selected"),
+                        parameters_group,
+                    )
+                    jacobian._functions_dict["forward"] = forward_jacobian.make_function(jacobian)
+                    jacobian.choose_function("forward")
+
+            self._covariance_update = CovarianceUpdate(
+                storage,
+                covariance_update_groups,
+                output=outputs.get_value("eventscount.final.concatenated.selected"),
+                parameters=storage.get_dict("parameters.all").walkvalues(),
+            )
+
             # Here we filtering parameters that would be used in MC sampling
             list_parameters_nuisance_normalized = []
             for mc_parameter_prefix in self._mc_parameters:
@@ -3109,20 +3885,35 @@ class model_dayabay:
                 name_function=lambda _, idx: f"ibd_spectrum_{idx[1]}",
             )
 
-            Rebin.replicate(
-                names={
-                    "matrix": "detector.rebin.matrix_data",
-                    "product": "data.real.final.detector_period",
-                },
-                replicate_outputs=combinations["detector.period"],
-            )
-            edges_energy_erec >> inputs.get_value(
-                "detector.rebin.matrix_data.edges_old"
-            )
-            edges_energy_final >> inputs.get_value(
-                "detector.rebin.matrix_data.edges_new"
-            )
-            outputs["data.real.fine"] >> inputs.get_dict("data.real.final.detector_period")
+            if self._rebin_mode == "matrix":
+                Rebin.replicate(
+                    names={
+                        "matrix": "detector.rebin.matrix_data",
+                        "product": "data.real.final.detector_period",
+                    },
+                    replicate_outputs=combinations["detector.period"],
+                )
+                edges_energy_erec >> inputs.get_value(
+                    "detector.rebin.matrix_data.edges_old"
+                )
+                edges_energy_final >> inputs.get_value(
+                    "detector.rebin.matrix_data.edges_new"
+                )
+                outputs["data.real.fine"] >> inputs.get_dict("data.real.final.detector_period")
+            else:
+                RebinSegmentSum.replicate(
+                    name="data.real.final.detector_period",
+                    replicate_outputs=combinations["detector.period"],
+                )
+                outputs.get_value("detector.rebin.segments") >> inputs.get_dict(
+                    "data.real.final.detector_period.segments"
+                )
+                edges_energy_final >> inputs.get_dict(
+                    "data.real.final.detector_period.edges_new"
+                )
+                outputs["data.real.fine"] >> inputs.get_dict(
+                    "data.real.final.detector_period.vector"
+                )
 
             remap_items(
                 outputs.get_dict("data.real.final.detector_period"),
@@ -3154,157 +3945,8 @@ class model_dayabay:
             # Summary
             # Collect some summary data for output tables
             #
-            ArraySum.replicate(
-                outputs("data.real.final.detector"),
-                name="summary.total.ibd_candidates",
-            )
-
-            ArraySum.replicate(
-                outputs("data.real.final.detector_period"),
-                name="summary.periods.ibd_candidates",
-            )
-            outputs["summary.periods.ibd_candidates"] = remap_items(
-                outputs.get_dict("summary.periods.ibd_candidates"),
-                reorder_indices={
-                    "from": ["detector", "period"],
-                    "to": ["period", "detector"],
-                },
-            )
-
-            Sum.replicate(
-                outputs("detector.livetime"),
-                name="summary.total.livetime",
-                replicate_outputs=index["detector"],
-            )
-
-            Sum.replicate(
-                outputs("detector.livetime"),
-                name="summary.periods.livetime",
-                replicate_outputs=combinations["period.detector"],
-            )
-
-            Sum.replicate(
-                outputs("detector.eff_livetime"),
-                name="summary.total.eff_livetime",
-                replicate_outputs=index["detector"],
-            )
-
-            Sum.replicate(
-                outputs("detector.eff_livetime"),
-                name="summary.periods.eff_livetime",
-                replicate_outputs=combinations["period.detector"],
-            )
-
-            Division.replicate(
-                outputs("summary.total.eff_livetime"),
-                outputs("summary.total.livetime"),
-                name="summary.total.eff",
-                replicate_outputs=index["detector"],
-            )
-
-            Division.replicate(
-                outputs("summary.periods.eff_livetime"),
-                outputs("summary.periods.livetime"),
-                name="summary.periods.eff",
-                replicate_outputs=combinations["period.detector"],
-            )
-
-            Sum.replicate(
-                outputs("background.count"),
-                name="summary.total.background_count",
-                replicate_outputs=combinations["background.detector"],
-            )
-
-            remap_items(
-                outputs("background.count"),
-                outputs.create_child("summary.periods.background_count"),
-                reorder_indices={
-                    "from": ["background", "detector", "period"],
-                    "to": ["background", "period", "detector"],
-                },
-            )
-
-            Division.replicate(
-                outputs("summary.total.background_count"),
-                outputs("summary.total.eff_livetime"),
-                name="summary.total.background_rate_s",
-                replicate_outputs=combinations["background.detector"],
-            )
-
-            Division.replicate(
-                outputs("summary.periods.background_count"),
-                outputs("summary.periods.eff_livetime"),
-                name="summary.periods.background_rate_s",
-                replicate_outputs=combinations["background.period.detector"],
-            )
-
-            Product.replicate(
-                outputs("summary.total.background_rate_s"),
-                parameters["constant.conversion.seconds_in_day"],
-                name="summary.total.background_rate",
-                replicate_outputs=combinations["background.detector"],
-            )
-
-            Product.replicate(
-                outputs("summary.periods.background_rate_s"),
-                parameters["constant.conversion.seconds_in_day"],
-                name="summary.periods.background_rate",
-                replicate_outputs=combinations["background.period.detector"],
-            )
-
-            Sum.replicate(
-                outputs("summary.total.background_rate"),
-                name="summary.total.background_rate_total",
-                replicate_outputs=index["detector"],
-            )
-
-            Sum.replicate(
-                outputs("summary.periods.background_rate"),
-                name="summary.periods.background_rate_total",
-                replicate_outputs=combinations["period.detector"],
-            )
-
-            Division.replicate(
-                outputs("summary.total.ibd_candidates"),
-                outputs("summary.total.eff_livetime"),
-                name="summary.total.rate_ibd_candidates_s",
-                replicate_outputs=combinations["detector"],
-            )
-
-            Division.replicate(
-                outputs("summary.periods.ibd_candidates"),
-                outputs("summary.periods.eff_livetime"),
-                name="summary.periods.rate_ibd_candidates_s",
-                replicate_outputs=combinations["period.detector"],
-            )
-
-            Product.replicate(
-                outputs("summary.total.rate_ibd_candidates_s"),
-                parameters["constant.conversion.seconds_in_day"],
-                name="summary.total.rate_ibd_candidates",
-                replicate_outputs=combinations["detector"],
-            )
-
-            Product.replicate(
-                outputs("summary.periods.rate_ibd_candidates_s"),
-                parameters["constant.conversion.seconds_in_day"],
-                name="summary.periods.rate_ibd_candidates",
-                replicate_outputs=combinations["period.detector"],
-            )
-
-            Difference.replicate(
-                outputs("summary.total.rate_ibd_candidates"),
-                outputs("summary.total.background_rate"),
-                name="summary.total.rate_ibd",
-                replicate_outputs=combinations["detector"],
-            )
-
-            Difference.replicate(
-                outputs("summary.periods.rate_ibd_candidates"),
-                outputs("summary.periods.background_rate"),
-                name="summary.periods.rate_ibd",
-                replicate_outputs=combinations["period.detector"],
-            )
+            if self._statistics is None:
+                self._build_deferred(("summary",))
 
             #
             # Statistic
@@ -3366,279 +4008,615 @@ class model_dayabay:
             nodes["mc.parameters.inputs"] = parinp_mc
 
             #
-            # Covariance matrices and Cholesky decomposition
+            # Covariance matrices, Cholesky decomposition and chi-squared functions. Only the
+            # requested items are built, the other ones are built on demand
             #
-            Cholesky.replicate(name="cholesky.stat.variable")
-            outputs.get_value(
-                "eventscount.final.concatenated.selected"
-            ) >> inputs.get_value("cholesky.stat.variable")
-
-            Cholesky.replicate(name="cholesky.stat.fixed")
-            outputs.get_value("covariance.data.fixed") >> inputs.get_value(
-                "cholesky.stat.fixed"
+            self._build_deferred(
+                _DEFERRED_ITEMS if self._statistics is None else self._statistics
             )
 
-            Cholesky.replicate(name="cholesky.stat.data.fixed")
-            outputs.get_value("data.proxy") >> inputs.get_value(
-                "cholesky.stat.data.fixed"
-            )
+            # fmt: on
 
-            SumMatOrDiag.replicate(name="covariance.covmat_full_p.fixed_stat")
-            outputs.get_value("covariance.data.fixed") >> nodes.get_value(
-                "covariance.covmat_full_p.fixed_stat"
-            )
-            outputs.get_value("covariance.covmat_syst.sum") >> nodes.get_value(
-                "covariance.covmat_full_p.fixed_stat"
-            )
+            # Replace the constant arrays by the shared ones before the graph is closed
+            self._shared_data.share(self.graph, storage)
 
-            Cholesky.replicate(name="cholesky.covmat_full_p.fixed_stat")
-            outputs.get_value(
-                "covariance.covmat_full_p.fixed_stat"
-            ) >> inputs.get_value("cholesky.covmat_full_p.fixed_stat")
+        self._setup_labels()
 
-            SumMatOrDiag.replicate(name="covariance.covmat_full_p.variable_stat")
-            outputs.get_value(
-                "eventscount.final.concatenated.selected"
-            ) >> nodes.get_value("covariance.covmat_full_p.variable_stat")
-            outputs.get_value("covariance.covmat_syst.sum") >> nodes.get_value(
-                "covariance.covmat_full_p.variable_stat"
-            )
+        # The deferred items are built on first access to their nodes or outputs
+        self.storage.build_missing = self._build_missing_items
 
-            Cholesky.replicate(name="cholesky.covmat_full_p.variable_stat")
-            outputs.get_value(
-                "covariance.covmat_full_p.variable_stat"
-            ) >> inputs.get_value("cholesky.covmat_full_p.variable_stat")
+        # Model will load real data
+        self.switch_data("real")
 
+        # Ensure stem nodes are calculated
+        self._touch()
 
-            SumMatOrDiag.replicate(name="covariance.covmat_full_n")
-            outputs.get_value("data.proxy") >> nodes.get_value(
-                "covariance.covmat_full_n"
-            )
-            outputs.get_value("covariance.covmat_syst.sum") >> nodes.get_value(
-                "covariance.covmat_full_n"
-            )
+    def build_outputs(self, names: Iterable[str]) -> None:
+        """Build the deferred outputs, if they are not built yet.
 
-            Cholesky.replicate(name="cholesky.covmat_full_n")
-            outputs.get_value("covariance.covmat_full_n") >> inputs.get_value(
-                "cholesky.covmat_full_n"
-            )
+        With the `statistics` argument only the requested statistics are built together with
+        the model. The other statistics, the related covariance matrices and the summary are
+        built on first access to their nodes or outputs in the storage, or in advance by this
+        method.
 
-            #
-            # Chi-squared functions
-            #
+        Parameters
+        ----------
+        names : Iterable[str]
+            Names of the outputs (relative to `outputs`) or their groups, e.g.
+            "statistic.full.pull.chi2cnp", "summary" or "statistic.stat". The names, which are
+            not deferred, are ignored.
+        """
+        names = tuple(names)
+        items = [
+            item
+            for item in _DEFERRED_ITEMS
+            if item not in self._deferred_built
+            and any(_is_within(item, name) or _is_within(name, item) for name in names)
+        ]
+        if not items:
+            return
 
-            # Chi-squared Pearson, stat (fixed stat errors)
-            Chi2.replicate(name="statistic.stat.chi2p_iterative")
-            outputs.get_value(
-                "eventscount.final.concatenated.selected"
-            ) >> inputs.get_value("statistic.stat.chi2p_iterative.theory")
-            outputs.get_value("cholesky.stat.fixed") >> inputs.get_value(
-                "statistic.stat.chi2p_iterative.errors"
-            )
-            outputs.get_value("data.proxy") >> inputs.get_value(
-                "statistic.stat.chi2p_iterative.data"
-            )
+        logger.log(INFO, f"Build deferred outputs: {', '.join(items)}")
 
-            # Chi-squared Neyman, stat
-            Chi2.replicate(name="statistic.stat.chi2n")
-            outputs.get_value(
-                "eventscount.final.concatenated.selected"
-            ) >> inputs.get_value("statistic.stat.chi2n.theory")
-            outputs.get_value("cholesky.stat.data.fixed") >> inputs.get_value(
-                "statistic.stat.chi2n.errors"
-            )
-            outputs.get_value("data.proxy") >> inputs.get_value(
-                "statistic.stat.chi2n.data"
-            )
+        storage_nodes = self.storage("nodes")
+        storage_outputs = self.storage("outputs")
+        keys_nodes = set(storage_nodes.walkjoinedkeys())
+        keys_outputs = set(storage_outputs.walkjoinedkeys())
 
-            # Chi-squared Pearson, stat (variable stat errors)
-            Chi2.replicate(name="statistic.stat.chi2p")
-            outputs.get_value(
-                "eventscount.final.concatenated.selected"
-            ) >> inputs.get_value("statistic.stat.chi2p.theory")
-            outputs.get_value("cholesky.stat.variable") >> inputs.get_value(
-                "statistic.stat.chi2p.errors"
-            )
-            outputs.get_value("data.proxy") >> inputs.get_value(
-                "statistic.stat.chi2p.data"
-            )
+        self.graph.open(close_on_exit=self._close)
+        with self.graph, self.storage:
+            self._build_deferred(items)
 
-            # Chi-squared Pearson, stat+syst, cov. matrix (fixed stat errors)
-            Chi2.replicate(name="statistic.full.covmat.chi2p_iterative")
-            outputs.get_value("data.proxy") >> inputs.get_value(
-                "statistic.full.covmat.chi2p_iterative.data"
-            )
-            outputs.get_value(
-                "eventscount.final.concatenated.selected"
-            ) >> inputs.get_value("statistic.full.covmat.chi2p_iterative.theory")
-            outputs.get_value("cholesky.covmat_full_p.fixed_stat") >> inputs.get_value(
-                "statistic.full.covmat.chi2p_iterative.errors"
-            )
+        from dag_modelling.core import NodeStorage
 
-            # Chi-squared Neyman, stat+syst, cov. matrix
-            Chi2.replicate(name="statistic.full.covmat.chi2n")
-            outputs.get_value("data.proxy") >> inputs.get_value(
-                "statistic.full.covmat.chi2n.data"
-            )
-            outputs.get_value(
-                "eventscount.final.concatenated.selected"
-            ) >> inputs.get_value("statistic.full.covmat.chi2n.theory")
-            outputs.get_value("cholesky.covmat_full_n") >> inputs.get_value(
-                "statistic.full.covmat.chi2n.errors"
-            )
+        storage_new = NodeStorage()
+        for key, node in storage_nodes.walkjoineditems():
+            if key not in keys_nodes:
+                storage_new[f"nodes.{key}"] = node
+        for key, output in storage_outputs.walkjoineditems():
+            if key not in keys_outputs:
+                storage_new[f"outputs.{key}"] = output
+        self._setup_labels(storage_new)
 
-            # Chi-squared Pearson, stat+syst, cov. matrix (variable stat errors)
-            Chi2.replicate(name="statistic.full.covmat.chi2p")
-            outputs.get_value("data.proxy") >> inputs.get_value(
-                "statistic.full.covmat.chi2p.data"
-            )
-            outputs.get_value(
-                "eventscount.final.concatenated.selected"
-            ) >> inputs.get_value("statistic.full.covmat.chi2p.theory")
-            outputs.get_value(
-                "cholesky.covmat_full_p.variable_stat"
-            ) >> inputs.get_value("statistic.full.covmat.chi2p.errors")
+        if self._parallel_branches is not None:
+            self._start_parallel_branches()
+        if self._node_counters is not None:
+            self._node_counters.start(storage_new("nodes"))
 
-            LogProdDiag.replicate(name="statistic.log_prod_diag.full")
-            outputs.get_value(
-                "cholesky.covmat_full_p.variable_stat"
-            ) >> inputs.get_value("statistic.log_prod_diag.full")
+    def _build_missing_items(self, key: tuple[str, ...]) -> bool:
+        """Build the deferred items for the missing `key` of the storage.
 
-            # Chi-squared Pearson, stat+syst, cov. matrix (variable stat errors)
-            Sum.replicate(
-                outputs.get_value("statistic.full.covmat.chi2p"),
-                outputs.get_value("statistic.log_prod_diag.full"),
-                name="statistic.full.covmat.chi2p_unbiased",
-            )
+        Returns True if any of the items was built.
+        """
+        from dag_modelling.core import Graph
 
-            # CNP stat error
-            CNPStat.replicate(name="statistic.staterr.cnp")
-            outputs.get_value("data.proxy") >> inputs.get_value(
-                "statistic.staterr.cnp.data"
-            )
-            outputs.get_value(
-                "eventscount.final.concatenated.selected"
-            ) >> inputs.get_value("statistic.staterr.cnp.theory")
+        # The storage is accessed while the deferred items are being built
+        if len(key) < 2 or key[0] not in ("nodes", "outputs") or Graph.current() is self.graph:
+            return False
 
-            # Chi-squared CNP, stat
-            Chi2.replicate(name="statistic.stat.chi2cnp")
-            outputs.get_value("data.proxy") >> inputs.get_value(
-                "statistic.stat.chi2cnp.data"
-            )
-            outputs.get_value(
-                "eventscount.final.concatenated.selected"
-            ) >> inputs.get_value("statistic.stat.chi2cnp.theory")
-            outputs.get_value("statistic.staterr.cnp") >> inputs.get_value(
-                "statistic.stat.chi2cnp.errors"
-            )
+        name = ".".join(key[1:])
+        if not any(
+            item not in self._deferred_built and (_is_within(item, name) or _is_within(name, item))
+            for item in _DEFERRED_ITEMS
+        ):
+            return False
 
-            # Log Poisson Ratio
-            LogPoissonRatio.replicate(name="statistic.stat.chi2poisson")
-            outputs.get_value("data.proxy") >> inputs.get_value(
-                "statistic.stat.chi2poisson.data"
-            )
-            outputs.get_value(
-                "eventscount.final.concatenated.selected"
-            ) >> inputs.get_value("statistic.stat.chi2poisson.theory")
+        self.build_outputs((name,))
+        return True
 
-            # Chi-squared Pearson, stat+syst, pull (fixed stat errors)
-            Sum.replicate(
-                outputs.get_value("statistic.stat.chi2p_iterative"),
-                outputs.get_value("statistic.nuisance.all"),
-                name="statistic.full.pull.chi2p_iterative",
-            )
+    def _build_deferred(self, names: Iterable[str]) -> None:
+        """Build the deferred items and their dependencies.
 
-            # Chi-squared Pearson, stat+syst, pull (variable stat errors)
-            Sum.replicate(
-                outputs.get_value("statistic.stat.chi2p"),
-                outputs.get_value("statistic.nuisance.all"),
-                name="statistic.full.pull.chi2p",
-            )
+        The items are built in the order of `_DEFERRED_ITEMS`. Should be called within the
+        graph and storage contexts.
+        """
+        required = set()
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name in required or name in self._deferred_built:
+                continue
+            required.add(name)
+            stack.extend(_DEFERRED_ITEMS[name])
+
+        for name in _DEFERRED_ITEMS:
+            if name in required:
+                self._build_deferred_item(name)
+                self._deferred_built.add(name)
+
+    # fmt: off
+    def _build_deferred_item(self, name: str) -> None:
+        from dag_modelling.lib.arithmetic import Difference, Division, Product, Sum
+        from dag_modelling.lib.linalg import Cholesky
+        from dag_modelling.lib.statistics import Chi2, CNPStat, LogPoissonRatio, LogProdDiag
+        from dag_modelling.lib.summation import ArraySum, SumMatOrDiag
+        from nested_mapping.tools import remap_items
 
-            # Chi-squared CNP, stat+syst, pull
-            Sum.replicate(
-                outputs.get_value("statistic.stat.chi2cnp"),
-                outputs.get_value("statistic.nuisance.all"),
-                name="statistic.full.pull.chi2cnp",
-            )
+        storage = self.storage
+        index = self.index
+        combinations = self.combinations
+        nodes = storage.create_child("nodes")
+        inputs = storage.create_child("inputs")
+        outputs = storage.create_child("outputs")
+        parameters = storage.get_dict("parameters")
+
+        match name:
+            case "summary":
+                ArraySum.replicate(
+                    outputs("data.real.final.detector"),
+                    name="summary.total.ibd_candidates",
+                )
 
-            LogProdDiag.replicate(name="statistic.log_prod_diag.stat")
-            outputs.get_value(
-                "cholesky.stat.variable"
-            ) >> inputs.get_value("statistic.log_prod_diag.stat")
+                ArraySum.replicate(
+                    outputs("data.real.final.detector_period"),
+                    name="summary.periods.ibd_candidates",
+                )
+                outputs["summary.periods.ibd_candidates"] = remap_items(
+                    outputs.get_dict("summary.periods.ibd_candidates"),
+                    reorder_indices={
+                        "from": ["detector", "period"],
+                        "to": ["period", "detector"],
+                    },
+                )
 
-            # Chi-squared Pearson, stat, +log|Vstat| (variable stat errors)
-            Sum.replicate(
-                outputs.get_value("statistic.stat.chi2p"),
-                outputs.get_value("statistic.log_prod_diag.stat"),
-                name="statistic.stat.chi2p_unbiased",
-            )
+                Sum.replicate(
+                    outputs("detector.livetime"),
+                    name="summary.total.livetime",
+                    replicate_outputs=index["detector"],
+                )
 
-            # Chi-squared Pearson, stat+syst, pull, +log|V| (variable stat errors)
-            Sum.replicate(
-                outputs.get_value("statistic.stat.chi2p_unbiased"),
-                outputs.get_value("statistic.nuisance.all"),
-                name="statistic.full.pull.chi2p_unbiased",
-            )
+                Sum.replicate(
+                    outputs("detector.livetime"),
+                    name="summary.periods.livetime",
+                    replicate_outputs=combinations["period.detector"],
+                )
 
-            # CNP stat variance
-            CNPStat.replicate(name="statistic.staterr.cnp_variance", mode="variance")
-            outputs.get_value("data.proxy") >> inputs.get_value(
-                "statistic.staterr.cnp_variance.data"
-            )
-            outputs.get_value(
-                "eventscount.final.concatenated.selected"
-            ) >> inputs.get_value("statistic.staterr.cnp_variance.theory")
+                Sum.replicate(
+                    outputs("detector.eff_livetime"),
+                    name="summary.total.eff_livetime",
+                    replicate_outputs=index["detector"],
+                )
 
-            # CNP, stat+syst, cov. matrix (linear cobination)
-            SumMatOrDiag.replicate(
-                    outputs.get_value("statistic.staterr.cnp_variance"),
-                    outputs.get_value("covariance.covmat_syst.sum"),
-                    name = "covariance.covmat_full_cnp"
-                    )
+                Sum.replicate(
+                    outputs("detector.eff_livetime"),
+                    name="summary.periods.eff_livetime",
+                    replicate_outputs=combinations["period.detector"],
+                )
 
-            # CNP Cholesky
-            Cholesky.replicate(name="cholesky.covmat_full_cnp")
-            outputs.get_value(
-                "covariance.covmat_full_cnp"
-            ) >> inputs.get_value("cholesky.covmat_full_cnp")
+                Division.replicate(
+                    outputs("summary.total.eff_livetime"),
+                    outputs("summary.total.livetime"),
+                    name="summary.total.eff",
+                    replicate_outputs=index["detector"],
+                )
 
-            # CNP, stat+syst, cov. matrix (as in the paper)
-            Chi2.replicate(name="statistic.full.covmat.chi2cnp")
-            outputs.get_value("data.proxy") >> inputs.get_value(
-                "statistic.full.covmat.chi2cnp.data"
-            )
-            outputs.get_value(
-                "eventscount.final.concatenated.selected"
-            ) >> inputs.get_value("statistic.full.covmat.chi2cnp.theory")
-            outputs.get_value(
-                "cholesky.covmat_full_cnp"
-            ) >> inputs.get_value("statistic.full.covmat.chi2cnp.errors")
+                Division.replicate(
+                    outputs("summary.periods.eff_livetime"),
+                    outputs("summary.periods.livetime"),
+                    name="summary.periods.eff",
+                    replicate_outputs=combinations["period.detector"],
+                )
 
-            # Log Poisson Ratio, stat+syst, pull
-            Sum.replicate(
-                outputs.get_value("statistic.stat.chi2poisson"),
-                outputs.get_value("statistic.nuisance.all"),
-                name="statistic.full.pull.chi2poisson",
-            )
-            # fmt: on
+                Sum.replicate(
+                    outputs("background.count"),
+                    name="summary.total.background_count",
+                    replicate_outputs=combinations["background.detector"],
+                )
 
-        self._setup_labels()
+                remap_items(
+                    outputs("background.count"),
+                    outputs.create_child("summary.periods.background_count"),
+                    reorder_indices={
+                        "from": ["background", "detector", "period"],
+                        "to": ["background", "period", "detector"],
+                    },
+                )
 
-        # Model will load real data
-        self.switch_data("real")
+                Division.replicate(
+                    outputs("summary.total.background_count"),
+                    outputs("summary.total.eff_livetime"),
+                    name="summary.total.background_rate_s",
+                    replicate_outputs=combinations["background.detector"],
+                )
 
-        # Ensure stem nodes are calculated
-        self._touch()
+                Division.replicate(
+                    outputs("summary.periods.background_count"),
+                    outputs("summary.periods.eff_livetime"),
+                    name="summary.periods.background_rate_s",
+                    replicate_outputs=combinations["background.period.detector"],
+                )
+
+                Product.replicate(
+                    outputs("summary.total.background_rate_s"),
+                    parameters["constant.conversion.seconds_in_day"],
+                    name="summary.total.background_rate",
+                    replicate_outputs=combinations["background.detector"],
+                )
+
+                Product.replicate(
+                    outputs("summary.periods.background_rate_s"),
+                    parameters["constant.conversion.seconds_in_day"],
+                    name="summary.periods.background_rate",
+                    replicate_outputs=combinations["background.period.detector"],
+                )
+
+                Sum.replicate(
+                    outputs("summary.total.background_rate"),
+                    name="summary.total.background_rate_total",
+                    replicate_outputs=index["detector"],
+                )
+
+                Sum.replicate(
+                    outputs("summary.periods.background_rate"),
+                    name="summary.periods.background_rate_total",
+                    replicate_outputs=combinations["period.detector"],
+                )
+
+                Division.replicate(
+                    outputs("summary.total.ibd_candidates"),
+                    outputs("summary.total.eff_livetime"),
+                    name="summary.total.rate_ibd_candidates_s",
+                    replicate_outputs=combinations["detector"],
+                )
+
+                Division.replicate(
+                    outputs("summary.periods.ibd_candidates"),
+                    outputs("summary.periods.eff_livetime"),
+                    name="summary.periods.rate_ibd_candidates_s",
+                    replicate_outputs=combinations["period.detector"],
+                )
+
+                Product.replicate(
+                    outputs("summary.total.rate_ibd_candidates_s"),
+                    parameters["constant.conversion.seconds_in_day"],
+                    name="summary.total.rate_ibd_candidates",
+                    replicate_outputs=combinations["detector"],
+                )
+
+                Product.replicate(
+                    outputs("summary.periods.rate_ibd_candidates_s"),
+                    parameters["constant.conversion.seconds_in_day"],
+                    name="summary.periods.rate_ibd_candidates",
+                    replicate_outputs=combinations["period.detector"],
+                )
+
+                Difference.replicate(
+                    outputs("summary.total.rate_ibd_candidates"),
+                    outputs("summary.total.background_rate"),
+                    name="summary.total.rate_ibd",
+                    replicate_outputs=combinations["detector"],
+                )
+
+                Difference.replicate(
+                    outputs("summary.periods.rate_ibd_candidates"),
+                    outputs("summary.periods.background_rate"),
+                    name="summary.periods.rate_ibd",
+                    replicate_outputs=combinations["period.detector"],
+                )
+
+            case "cholesky.stat.variable":
+                Cholesky.replicate(name="cholesky.stat.variable")
+                outputs.get_value(
+                    "eventscount.final.concatenated.selected"
+                ) >> inputs.get_value("cholesky.stat.variable")
+
+            case "cholesky.stat.fixed":
+                Cholesky.replicate(name="cholesky.stat.fixed")
+                outputs.get_value("covariance.data.fixed") >> inputs.get_value(
+                    "cholesky.stat.fixed"
+                )
+
+            case "cholesky.stat.data.fixed":
+                Cholesky.replicate(name="cholesky.stat.data.fixed")
+                outputs.get_value("data.proxy") >> inputs.get_value(
+                    "cholesky.stat.data.fixed"
+                )
+
+            case "covariance.covmat_full_p.fixed_stat":
+                SumMatOrDiag.replicate(name="covariance.covmat_full_p.fixed_stat")
+                outputs.get_value("covariance.data.fixed") >> nodes.get_value(
+                    "covariance.covmat_full_p.fixed_stat"
+                )
+                outputs.get_value("covariance.covmat_syst.sum") >> nodes.get_value(
+                    "covariance.covmat_full_p.fixed_stat"
+                )
+
+            case "cholesky.covmat_full_p.fixed_stat":
+                Cholesky.replicate(name="cholesky.covmat_full_p.fixed_stat")
+                outputs.get_value(
+                    "covariance.covmat_full_p.fixed_stat"
+                ) >> inputs.get_value("cholesky.covmat_full_p.fixed_stat")
+
+            case "covariance.covmat_full_p.variable_stat":
+                SumMatOrDiag.replicate(name="covariance.covmat_full_p.variable_stat")
+                outputs.get_value(
+                    "eventscount.final.concatenated.selected"
+                ) >> nodes.get_value("covariance.covmat_full_p.variable_stat")
+                outputs.get_value("covariance.covmat_syst.sum") >> nodes.get_value(
+                    "covariance.covmat_full_p.variable_stat"
+                )
+
+            case "cholesky.covmat_full_p.variable_stat":
+                Cholesky.replicate(name="cholesky.covmat_full_p.variable_stat")
+                outputs.get_value(
+                    "covariance.covmat_full_p.variable_stat"
+                ) >> inputs.get_value("cholesky.covmat_full_p.variable_stat")
+
+            case "covariance.covmat_full_n":
+                SumMatOrDiag.replicate(name="covariance.covmat_full_n")
+                outputs.get_value("data.proxy") >> nodes.get_value(
+                    "covariance.covmat_full_n"
+                )
+                outputs.get_value("covariance.covmat_syst.sum") >> nodes.get_value(
+                    "covariance.covmat_full_n"
+                )
+
+            case "cholesky.covmat_full_n":
+                Cholesky.replicate(name="cholesky.covmat_full_n")
+                outputs.get_value("covariance.covmat_full_n") >> inputs.get_value(
+                    "cholesky.covmat_full_n"
+                )
+
+            case "statistic.stat.chi2p_iterative":
+                # Chi-squared Pearson, stat (fixed stat errors)
+                Chi2.replicate(name="statistic.stat.chi2p_iterative")
+                outputs.get_value(
+                    "eventscount.final.concatenated.selected"
+                ) >> inputs.get_value("statistic.stat.chi2p_iterative.theory")
+                outputs.get_value("cholesky.stat.fixed") >> inputs.get_value(
+                    "statistic.stat.chi2p_iterative.errors"
+                )
+                outputs.get_value("data.proxy") >> inputs.get_value(
+                    "statistic.stat.chi2p_iterative.data"
+                )
+
+            case "statistic.stat.chi2n":
+                # Chi-squared Neyman, stat
+                Chi2.replicate(name="statistic.stat.chi2n")
+                outputs.get_value(
+                    "eventscount.final.concatenated.selected"
+                ) >> inputs.get_value("statistic.stat.chi2n.theory")
+                outputs.get_value("cholesky.stat.data.fixed") >> inputs.get_value(
+                    "statistic.stat.chi2n.errors"
+                )
+                outputs.get_value("data.proxy") >> inputs.get_value(
+                    "statistic.stat.chi2n.data"
+                )
+
+            case "statistic.stat.chi2p":
+                # Chi-squared Pearson, stat (variable stat errors)
+                Chi2.replicate(name="statistic.stat.chi2p")
+                outputs.get_value(
+                    "eventscount.final.concatenated.selected"
+                ) >> inputs.get_value("statistic.stat.chi2p.theory")
+                outputs.get_value("cholesky.stat.variable") >> inputs.get_value(
+                    "statistic.stat.chi2p.errors"
+                )
+                outputs.get_value("data.proxy") >> inputs.get_value(
+                    "statistic.stat.chi2p.data"
+                )
+
+            case "statistic.full.covmat.chi2p_iterative":
+                # Chi-squared Pearson, stat+syst, cov. matrix (fixed stat errors)
+                Chi2.replicate(name="statistic.full.covmat.chi2p_iterative")
+                outputs.get_value("data.proxy") >> inputs.get_value(
+                    "statistic.full.covmat.chi2p_iterative.data"
+                )
+                outputs.get_value(
+                    "eventscount.final.concatenated.selected"
+                ) >> inputs.get_value("statistic.full.covmat.chi2p_iterative.theory")
+                outputs.get_value("cholesky.covmat_full_p.fixed_stat") >> inputs.get_value(
+                    "statistic.full.covmat.chi2p_iterative.errors"
+                )
+
+            case "statistic.full.covmat.chi2n":
+                # Chi-squared Neyman, stat+syst, cov. matrix
+                Chi2.replicate(name="statistic.full.covmat.chi2n")
+                outputs.get_value("data.proxy") >> inputs.get_value(
+                    "statistic.full.covmat.chi2n.data"
+                )
+                outputs.get_value(
+                    "eventscount.final.concatenated.selected"
+                ) >> inputs.get_value("statistic.full.covmat.chi2n.theory")
+                outputs.get_value("cholesky.covmat_full_n") >> inputs.get_value(
+                    "statistic.full.covmat.chi2n.errors"
+                )
+
+            case "statistic.full.covmat.chi2p":
+                # Chi-squared Pearson, stat+syst, cov. matrix (variable stat errors)
+                Chi2.replicate(name="statistic.full.covmat.chi2p")
+                outputs.get_value("data.proxy") >> inputs.get_value(
+                    "statistic.full.covmat.chi2p.data"
+                )
+                outputs.get_value(
+                    "eventscount.final.concatenated.selected"
+                ) >> inputs.get_value("statistic.full.covmat.chi2p.theory")
+                outputs.get_value(
+                    "cholesky.covmat_full_p.variable_stat"
+                ) >> inputs.get_value("statistic.full.covmat.chi2p.errors")
+
+            case "statistic.log_prod_diag.full":
+                LogProdDiag.replicate(name="statistic.log_prod_diag.full")
+                outputs.get_value(
+                    "cholesky.covmat_full_p.variable_stat"
+                ) >> inputs.get_value("statistic.log_prod_diag.full")
+
+            case "statistic.full.covmat.chi2p_unbiased":
+                # Chi-squared Pearson, stat+syst, cov. matrix (variable stat errors)
+                Sum.replicate(
+                    outputs.get_value("statistic.full.covmat.chi2p"),
+                    outputs.get_value("statistic.log_prod_diag.full"),
+                    name="statistic.full.covmat.chi2p_unbiased",
+                )
+
+            case "statistic.staterr.cnp":
+                # CNP stat error
+                CNPStat.replicate(name="statistic.staterr.cnp")
+                outputs.get_value("data.proxy") >> inputs.get_value(
+                    "statistic.staterr.cnp.data"
+                )
+                outputs.get_value(
+                    "eventscount.final.concatenated.selected"
+                ) >> inputs.get_value("statistic.staterr.cnp.theory")
+
+            case "statistic.stat.chi2cnp":
+                # Chi-squared CNP, stat
+                Chi2.replicate(name="statistic.stat.chi2cnp")
+                outputs.get_value("data.proxy") >> inputs.get_value(
+                    "statistic.stat.chi2cnp.data"
+                )
+                outputs.get_value(
+                    "eventscount.final.concatenated.selected"
+                ) >> inputs.get_value("statistic.stat.chi2cnp.theory")
+                outputs.get_value("statistic.staterr.cnp") >> inputs.get_value(
+                    "statistic.stat.chi2cnp.errors"
+                )
+
+            case "statistic.stat.chi2poisson":
+                # Log Poisson Ratio
+                LogPoissonRatio.replicate(name="statistic.stat.chi2poisson")
+                outputs.get_value("data.proxy") >> inputs.get_value(
+                    "statistic.stat.chi2poisson.data"
+                )
+                outputs.get_value(
+                    "eventscount.final.concatenated.selected"
+                ) >> inputs.get_value("statistic.stat.chi2poisson.theory")
+
+            case "statistic.full.pull.chi2p_iterative":
+                # Chi-squared Pearson, stat+syst, pull (fixed stat errors)
+                Sum.replicate(
+                    outputs.get_value("statistic.stat.chi2p_iterative"),
+                    outputs.get_value("statistic.nuisance.all"),
+                    name="statistic.full.pull.chi2p_iterative",
+                )
+
+            case "statistic.full.pull.chi2p":
+                # Chi-squared Pearson, stat+syst, pull (variable stat errors)
+                Sum.replicate(
+                    outputs.get_value("statistic.stat.chi2p"),
+                    outputs.get_value("statistic.nuisance.all"),
+                    name="statistic.full.pull.chi2p",
+                )
+
+            case "statistic.full.pull.chi2cnp":
+                # Chi-squared CNP, stat+syst, pull
+                Sum.replicate(
+                    outputs.get_value("statistic.stat.chi2cnp"),
+                    outputs.get_value("statistic.nuisance.all"),
+                    name="statistic.full.pull.chi2cnp",
+                )
+
+            case "statistic.log_prod_diag.stat":
+                LogProdDiag.replicate(name="statistic.log_prod_diag.stat")
+                outputs.get_value(
+                    "cholesky.stat.variable"
+                ) >> inputs.get_value("statistic.log_prod_diag.stat")
+
+            case "statistic.stat.chi2p_unbiased":
+                # Chi-squared Pearson, stat, +log|Vstat| (variable stat errors)
+                Sum.replicate(
+                    outputs.get_value("statistic.stat.chi2p"),
+                    outputs.get_value("statistic.log_prod_diag.stat"),
+                    name="statistic.stat.chi2p_unbiased",
+                )
+
+            case "statistic.full.pull.chi2p_unbiased":
+                # Chi-squared Pearson, stat+syst, pull, +log|V| (variable stat errors)
+                Sum.replicate(
+                    outputs.get_value("statistic.stat.chi2p_unbiased"),
+                    outputs.get_value("statistic.nuisance.all"),
+                    name="statistic.full.pull.chi2p_unbiased",
+                )
+
+            case "statistic.staterr.cnp_variance":
+                # CNP stat variance
+                CNPStat.replicate(name="statistic.staterr.cnp_variance", mode="variance")
+                outputs.get_value("data.proxy") >> inputs.get_value(
+                    "statistic.staterr.cnp_variance.data"
+                )
+                outputs.get_value(
+                    "eventscount.final.concatenated.selected"
+                ) >> inputs.get_value("statistic.staterr.cnp_variance.theory")
+
+            case "covariance.covmat_full_cnp":
+                # CNP, stat+syst, cov. matrix (linear cobination)
+                SumMatOrDiag.replicate(
+                        outputs.get_value("statistic.staterr.cnp_variance"),
+                        outputs.get_value("covariance.covmat_syst.sum"),
+                        name = "covariance.covmat_full_cnp"
+                        )
+
+            case "cholesky.covmat_full_cnp":
+                # CNP Cholesky
+                Cholesky.replicate(name="cholesky.covmat_full_cnp")
+                outputs.get_value(
+                    "covariance.covmat_full_cnp"
+                ) >> inputs.get_value("cholesky.covmat_full_cnp")
+
+            case "statistic.full.covmat.chi2cnp":
+                # CNP, stat+syst, cov. matrix (as in the paper)
+                Chi2.replicate(name="statistic.full.covmat.chi2cnp")
+                outputs.get_value("data.proxy") >> inputs.get_value(
+                    "statistic.full.covmat.chi2cnp.data"
+                )
+                outputs.get_value(
+                    "eventscount.final.concatenated.selected"
+                ) >> inputs.get_value("statistic.full.covmat.chi2cnp.theory")
+                outputs.get_value(
+                    "cholesky.covmat_full_cnp"
+                ) >> inputs.get_value("statistic.full.covmat.chi2cnp.errors")
+
+            case "statistic.full.pull.chi2poisson":
+                # Log Poisson Ratio, stat+syst, pull
+                Sum.replicate(
+                    outputs.get_value("statistic.stat.chi2poisson"),
+                    outputs.get_value("statistic.nuisance.all"),
+                    name="statistic.full.pull.chi2poisson",
+                )
+            case _:
+                raise RuntimeError(f"Unknown deferred item: {name}")
+    # fmt: on
 
     @staticmethod
     def _create_random_generator(seed: int) -> Generator:
-        from numpy.random import MT19937, SeedSequence
+        from numpy.random import MT19937, Generator, SeedSequence
 
         (sequence,) = SeedSequence(seed).spawn(1)
         algo = MT19937(seed=sequence.spawn(1)[0])
         return Generator(algo)
 
+    def set_random_seed(self, seed: int | SeedSequence) -> None:
+        """Reset the state of the random generator, shared by all the Monte-Carlo nodes.
+
+        Parameters
+        ----------
+        seed : int | SeedSequence
+            An integer seed is treated the same way as the `seed` argument of the model.
+            A `SeedSequence` (e.g. a child, obtained via `SeedSequence.spawn`) is used to
+            initialize the generator directly.
+        """
+        from numpy.random import MT19937, SeedSequence
+
+        if isinstance(seed, SeedSequence):
+            state = MT19937(seed).state
+        else:
+            state = self._create_random_generator(seed).bit_generator.state
+        self._random_generator.bit_generator.state = state
+
+    def _start_parallel_branches(self) -> None:
+        outputs = self.storage("outputs")
+        stages = [
+            tuple(outputs.get_dict(path).walkvalues())
+            for path in _PARALLEL_STAGES
+            if path in outputs
+        ]
+        self._parallel_branches.start(stages)
+        logger.log(
+            INFO,
+            f"Parallel branches: {self._parallel_branches.nbranches}"
+            f" in {self._parallel_branches.nthreads} threads",
+        )
+
     def _touch(self):
         for output in self.storage["outputs"].get_dict("eventscount.final.detector").walkvalues():
             output.touch()
@@ -3649,8 +4627,23 @@ class model_dayabay:
                 node.unfreeze()
                 node.touch()
 
-    def update_covariance_matrix(self):
-        self._covariance_matrix.update_matrices()
+    def update_covariance_matrix(self, *, force: bool = False) -> list[str]:
+        """Recompute the Jacobians and the systematic covariance matrices.
+
+        Only the groups, which Jacobians are affected by the changes of the parameters since
+        the previous update, are recomputed. The first call recomputes all the groups.
+
+        Parameters
+        ----------
+        force : bool
+            Recompute all the groups.
+
+        Returns
+        -------
+        list[str]
+            Names of the recomputed groups.
+        """
+        return self._covariance_update.update(force=force)
 
     def set_parameters(
         self,
@@ -3685,6 +4678,64 @@ class model_dayabay:
             par = parameters_storage[parname]
             setter(par, value)
 
+    def evaluate_batch(
+        self,
+        parameter_grid: Mapping[str, Sequence[float] | NDArray],
+        outputs: Sequence[str] = ("statistic.stat.chi2cnp",),
+        *,
+        mode: Literal["auto", "batch", "loop"] = "auto",
+    ) -> dict[str, NDArray]:
+        """Evaluate the outputs for a set of parameter points.
+
+        In the batch mode the survival probability is computed for all the points at once
+        and the rest of the prediction is evaluated as a linear transformation: integration,
+        detector response and rebinning, see `oscillation_kernel`. The statistics are then
+        computed by the graph from the prediction of each point. Only the oscillation
+        parameters (`survival_probability.*`) may be varied in the batch mode, all the other
+        parameters are kept fixed. The first point is cross checked with the graph.
+
+        In the loop mode the parameters are set for each point and the outputs are read from
+        the graph.
+
+        The values of the parameters are restored after the evaluation.
+
+        Parameters
+        ----------
+        parameter_grid : Mapping[str, Sequence[float] | NDArray]
+            Values of the parameters: name (relative to `parameters.all`) → 1d array. All the
+            arrays should have the same length.
+        outputs : Sequence[str]
+            Names of the outputs (relative to `outputs`) to evaluate.
+        mode : Literal["auto", "batch", "loop"]
+            Evaluation mode. "auto" selects the batch mode if it supports the parameters and
+            the outputs.
+
+        Returns
+        -------
+        dict[str, NDArray]
+            Values of the outputs with leading axis for the points.
+        """
+        from .tools.batch_evaluation import evaluate_batch
+
+        self.build_outputs(outputs)
+
+        return evaluate_batch(self, parameter_grid, outputs, mode=mode)
+
+    @property
+    def oscillation_kernel(self) -> OscillationKernel:
+        """Oscillation independent part of the prediction, used by `evaluate_batch`.
+
+        The kernel is built on first use and rebuilt when the values of the parameters, other
+        than the oscillation ones, are changed.
+        """
+        kernel = self._oscillation_kernel
+        if kernel is None or not kernel.valid:
+            from .tools.batch_evaluation import OscillationKernel
+
+            kernel = self._oscillation_kernel = OscillationKernel(self)
+
+        return kernel
+
     def switch_data(self, key: Literal["asimov", "real"]) -> None:
         """Switch data.proxy output.
 
@@ -3725,21 +4776,100 @@ class model_dayabay:
         else:
             return {group: parname for group, parname in _SYSTEMATIC_UNCERTAINTIES_GROUPS.items()}
 
-    def _setup_labels(self):
-        from dag_modelling.tools.schema import LoadYaml
+    def _get_keys_not_built(self) -> list[str]:
+        """Return the keys of the items, which are not built with the current options.
+
+        The keys include the deferred items, which are not built yet, and the items, which are
+        built only in the other modes.
+        """
+        keys = [item for item in _DEFERRED_ITEMS if item not in self._deferred_built]
+
+        if self._integration_mode == "parts":
+            keys.append("kinematics.kernel")
+        else:
+            keys += [
+                "kinematics.ibd.crosssection_jacobian_oscillations",
+                "kinematics.neutrino_cm2_per_MeV_per_fission_per_proton",
+                "kinematics.integral",
+                "eventscount.parts",
+            ]
+
+        if self._daily_data_mode == "arrays":
+            keys.append("reactor_detector.antineutrinos_eff_livetime")
+        else:
+            keys.append("daily_data")
+
+        if self._rebin_mode == "matrix":
+            keys.append("detector.rebin.segments")
+        else:
+            keys += [
+                "detector.rebin.matrix_background",
+                "detector.rebin.matrix_background_by_source",
+                "detector.rebin.matrix_data",
+            ]
+            if self._detector_response_mode != "fused":
+                keys.append("detector.rebin.matrix_ibd")
+
+        if self._detector_response_mode != "fused":
+            keys += [
+                "detector.response",
+                "eventscount.final.ibd_stages",
+                "eventscount.final.ibd_unnormalized",
+            ]
+            if self._detector_matrix_mode != "dense":
+                keys.append("detector.lsnl.matrix")
+
+        if self._detector_matrix_mode == "dense":
+            keys += ["detector.iav.matrix_banded", "detector.eres.matrix_banded"]
+
+        if self._precision == "double":
+            keys += [
+                "eventscount.stages.raw_single",
+                "eventscount.fine.ibd_normalized_double",
+                "eventscount.final.ibd_double",
+                "detector.normalization_single",
+            ]
+        elif not self._final_ibd_single:
+            keys.append("eventscount.final.ibd_double")
+
+        return keys
+
+    def _setup_labels(self, storage: NodeStorage | None = None):
+        """Set up the labels and the paths of the nodes and outputs.
+
+        Parameters
+        ----------
+        storage : NodeStorage | None
+            Storage with the nodes and outputs to process. If None, all the items of the model
+            are processed and the usage of the labels is checked in strict mode.
+        """
+        from nested_mapping import NestedMapping
+
+        from .tools.label_index import LabelIndex
+
+        check_unused = storage is None
+        if storage is None:
+            storage = self.storage
 
         processed_keys_set = set()
         if self._process_labels:
             logger.log(INFO, "Processing labels")
-            labels = LoadYaml(relpath(__file__.replace(".py", ".yaml")))
-            self.storage("nodes").read_labels(labels, processed_keys_set=processed_keys_set)
-            self.storage("outputs").read_labels(labels, processed_keys_set=processed_keys_set)
+            # The index of the labels is stored next to the build cache
+            path_cache = self._build_cache.path
+            label_index = LabelIndex.load(
+                relpath(__file__.replace(".py", ".yaml")),
+                storage,
+                path=path_cache.parent if path_cache is not None else None,
+            )
+            label_index.apply(storage)
+            labels = label_index.source
+            processed_keys_set = label_index.processed_keys
 
         self.storage("inputs").remove_connected_inputs()
-        self.storage.read_paths(index=self.index)
+        storage.read_paths(index=self.index)
         self.graph.build_index_dict(self.index)
 
-        if not self._process_labels:
+        if not self._process_labels or not check_unused:
             return
 
         labels_mk = NestedMapping(
@@ -3749,7 +4879,13 @@ class model_dayabay:
             return
 
         for key in processed_keys_set:
-            labels_mk.delete_with_parents(key)
+            if key in labels_mk:
+                labels_mk.delete_with_parents(key)
+
+        # The labels of the items, which are not built with the current options, are not used
+        for key in self._get_keys_not_built():
+            if key in labels_mk:
+                labels_mk.delete_with_parents(key)
 
         if not labels_mk:
             return
@@ -3777,9 +4913,87 @@ class model_dayabay:
 
         raise RuntimeError(f"The following label groups were not used: {', '.join(unused_keys)}")
 
+    def make_profiling_table(
+        self, group_by: str = "path", *, depth: int = 2, reset: bool = False
+    ) -> DataFrame:
+        """Make a table with the number of evaluations, wall time and memory of the nodes.
+
+        Requires the model to be created with `profiling=True`.
+
+        Parameters
+        ----------
+        group_by : str
+            Aggregation of the counters: "node", "path" (by the first `depth` elements of
+            the key in the storage) or the name of an index, e.g. "detector" or "period".
+        depth : int
+            Length of the key prefix for `group_by="path"`.
+        reset : bool
+            Reset the counters after the table is made.
+
+        Returns
+        -------
+        DataFrame
+            Table, sorted by the total time.
+        """
+        if self._node_counters is None:
+            raise RuntimeError("Profiling is disabled, use `profiling=True`")
+
+        df = self._node_counters.make_table(group_by, depth=depth, index=self.index)
+        if reset:
+            self._node_counters.reset()
+        return df
+
+    def make_precision_report(
+        self, reference: model_dayabay, names: Sequence[str] | None = None
+    ) -> DataFrame:
+        """Make a table with the accuracy of the outputs with respect to a reference model.
+
+        Used to check the mixed precision mode (`precision="mixed"`) against the double
+        precision model, built with the same arguments. The values of the parameters of the
+        reference model are set to the values of the parameters of this model first. The
+        deferred outputs are built for both models if needed.
+
+        Parameters
+        ----------
+        reference : model_dayabay
+            Reference model, e.g. with `precision="double"`.
+        names : Sequence[str] | None
+            Names of the outputs or their groups (relative to `outputs`). If None, the IBD
+            spectra in the fine and final binning, the final observation and the built
+            statistics are compared.
+
+        Returns
+        -------
+        DataFrame
+            Table with a row for each name: the number of outputs, their dtypes and sizes in
+            bytes for both models, the maximal absolute value of the reference and the
+            maximal absolute and relative differences.
+        """
+        if names is None:
+            names = [
+                "eventscount.fine.ibd_normalized",
+                "eventscount.final.ibd",
+                "eventscount.final.concatenated.selected",
+            ]
+            if self._statistics is not None:
+                names.extend(self._statistics)
+            else:
+                names.extend(
+                    f"statistic.{key}" for key in self.storage("outputs.statistic").walkjoinedkeys()
+                )
+
+        for model in (self, reference):
+            model.build_outputs(names)
+
+        from .tools.precision_report import make_precision_report
+
+        return make_precision_report(self, reference, names)
+
     def make_summary_table(
         self, period: Literal["total", "6AD", "8AD", "7AD"] = "total"
     ) -> DataFrame:
+        self.build_outputs(("summary",))
+
         match period:
             case "total":
                 source_fmt = f"summary.{period}.{{name}}"
@@ -3802,6 +5016,8 @@ class model_dayabay:
             "rate_ibd": source_fmt.format(name="rate_ibd"),
         }
 
+        from pandas import DataFrame
+
         rows = list(self.index["detector"])
         columns = list(column_sources)
         df = DataFrame(index=rows, columns=columns, dtype="f8")
@@ -3835,3 +5051,8 @@ class model_dayabay:
     def print_summary_table(self):
         df = self.make_summary_table()
         print(df.to_string())
+
+
+def _is_within(path: str, group: str) -> bool:
+    """Check if the `path` is equal to the `group` or located within it."""
+    return path == group or path.startswith(f"{group}.")
@@ -0,0 +1,649 @@
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from typing import TYPE_CHECKING
+
+from dag_modelling.tools.logger import INFO, logger
+from numpy import (
+    add,
+    allclose,
+    array,
+    asarray,
+    concatenate,
+    cumsum,
+    einsum,
+    empty,
+    eye,
+    multiply,
+    ones,
+    sin,
+    sqrt,
+    square,
+    where,
+    zeros,
+)
+
+from ..lib import BandedVectorMatrixProduct
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from typing import Literal
+
+    from dag_modelling.core.node import Node
+    from dag_modelling.core.output import Output
+    from numpy.typing import NDArray
+
+    from ..model_dayabay import model_dayabay
+
+# Parameters, which affect only the survival probability nodes and thus may be evaluated in
+# a vectorized way
+_BATCH_PARAMETERS_PREFIX = "survival_probability."
+
+# The prediction, computed in a vectorized way. The statistics are computed from it by the
+# nodes of the graph.
+_OUTPUT_PREDICTION = "eventscount.final.concatenated.selected"
+_OUTPUTS_STATISTICS_PREFIX = "statistic."
+
+# Inputs of the survival probability nodes, which depend on the oscillation parameters
+_OSCILLATION_INPUTS = ("SinSq2Theta12", "SinSq2Theta13", "DeltaMSq21", "DeltaMSq3l", "nmo")
+
+# Maximal number of elements of the intermediate arrays, processed at once
+_CHUNK_SIZE_ELEMENTS = 2**22
+
+# Relative tolerance of the cross check against the graph for each precision of the model
+_RTOL_CROSS_CHECK = {"double": 1e-8, "mixed": 1e-5}
+
+
+def evaluate_batch(
+    model: model_dayabay,
+    parameter_grid: Mapping[str, Sequence[float] | NDArray],
+    outputs: Sequence[str],
+    *,
+    mode: Literal["auto", "batch", "loop"] = "auto",
+) -> dict[str, NDArray]:
+    """Evaluate the model outputs for a set of parameter points.
+
+    See `model_dayabay.evaluate_batch` for the description.
+    """
+    if mode not in {"auto", "batch", "loop"}:
+        raise ValueError(f"Unsupported evaluation mode: {mode}")
+
+    parameters, values = _read_parameter_grid(model, parameter_grid)
+    outputs = tuple(outputs)
+
+    if mode == "loop" or (mode == "auto" and not is_batch_supported(parameter_grid, outputs)):
+        return _evaluate_loop(model, parameters, values, outputs)
+
+    if not is_batch_supported(parameter_grid, outputs):
+        raise RuntimeError(
+            "Batch evaluation is supported only for the survival probability parameters, the"
+            f" prediction `{_OUTPUT_PREDICTION}` and the statistics"
+        )
+
+    try:
+        kernel = model.oscillation_kernel
+        result = kernel.evaluate(parameters, values, outputs)
+
+        # Cross check the first point against the graph. The kernels are computed in double
+        # precision, therefore the tolerance is wider for the mixed precision graph.
+        reference = _evaluate_loop(model, parameters, values[:1], outputs)
+        rtol = _RTOL_CROSS_CHECK[model.precision]
+        for name, data in reference.items():
+            if not allclose(data[0], result[name][0], rtol=rtol, atol=0):
+                raise RuntimeError(f"Batch evaluation of {name} is inconsistent with the graph")
+    except RuntimeError as e:
+        if mode == "batch":
+            raise
+        logger.warning(f"{e!s}, switch to the loop mode")
+        return _evaluate_loop(model, parameters, values, outputs)
+
+    logger.log(INFO, f"Evaluate {values.shape[0]} points in batch mode")
+
+    return result
+
+
+def is_batch_supported(
+    parameter_grid: Mapping[str, Sequence[float] | NDArray], outputs: Sequence[str]
+) -> bool:
+    """Check if the vectorized evaluation may be used for the parameters and outputs."""
+    return all(name.startswith(_BATCH_PARAMETERS_PREFIX) for name in parameter_grid) and all(
+        name == _OUTPUT_PREDICTION or name.startswith(_OUTPUTS_STATISTICS_PREFIX)
+        for name in outputs
+    )
+
+
+class OscillationKernel:
+    """Oscillation independent part of the model prediction.
+
+    The expected spectrum is linear in the survival probability of each reactor-detector
+    pair. For fixed values of all the parameters, except oscillation ones, the final
+    prediction is represented as
+
+        y = B + Σₖ Jₖ·Σᵣ R(Kᵣₖ⊙Pᵣₖ),
+
+    where k is for detector/period pair, r is for reactor, Pᵣₖ is survival probability on
+    the integration mesh, Kᵣₖ is the integration kernel: product of the integration weights,
+    IBD cross section, antineutrino spectra and normalization, R is the summation of the
+    mesh points within each bin, Jₖ is a product of the detector response matrices (IAV,
+    LSNL, energy resolution, normalization and rebinning) and B is for backgrounds.
+
+    The kernels are extracted from the graph by walking from the final observation to the
+    survival probability nodes. Only the nodes, which are linear in their dependent input,
+    are supported: `Sum`, `Product`, `VectorMatrixProduct` (including the banded one),
+    `AxisDistortionPointwiseProduct`, `RebinSegmentSum`, `Concatenation`, `Cast` and
+    `IntegratorCore`. The kernels are computed in double precision.
+
+    The survival probabilities are computed for all the points and reactor-detector pairs
+    at once with a leading axis for the points, following `NueSurvivalProbability`. The
+    statistics are computed from the prediction by the nodes of the graph.
+
+    The kernels are valid while the values of the parameters, other than the oscillation
+    ones, are not changed.
+    """
+
+    __slots__ = (
+        "_model",
+        "_survival_probability_outputs",
+        "_kernels",
+        "_response",
+        "_background",
+        "_orders_x",
+        "_orders_y",
+        "_mesh_shape",
+        "_l4e",
+        "_is_dm32_leading",
+        "_parameters",
+        "_parameter_values",
+    )
+
+    _model: model_dayabay
+    _survival_probability_outputs: list[Output]
+    _kernels: list[tuple[NDArray, NDArray]]
+    _response: NDArray
+    _background: NDArray
+    _orders_x: NDArray
+    _orders_y: NDArray
+    _mesh_shape: tuple[int, ...]
+    _l4e: NDArray
+    _is_dm32_leading: NDArray
+    _parameters: list
+    _parameter_values: list[float]
+
+    def __init__(self, model: model_dayabay):
+        self._model = model
+        self._survival_probability_outputs = list(
+            model.storage["outputs"].get_dict("survival_probability").walkvalues()
+        )
+        self._parameters = [
+            parameter
+            for key, parameter in model.storage("parameters.all").walkitems()
+            if not ".".join(key).startswith(_BATCH_PARAMETERS_PREFIX)
+        ]
+        self._parameter_values = [parameter.value for parameter in self._parameters]
+        self._kernels = []
+        self._build()
+        self._build_survival_probability()
+
+    @property
+    def kernels(self) -> list[tuple[NDArray, NDArray]]:
+        """Integration kernels: a pair (indices of survival probabilities, kernels) for each
+        detector/period."""
+        return self._kernels
+
+    @property
+    def response(self) -> NDArray:
+        """Detector response matrices: one for each detector/period."""
+        return self._response
+
+    @property
+    def background(self) -> NDArray:
+        """Oscillation independent part of the prediction."""
+        return self._background
+
+    @property
+    def valid(self) -> bool:
+        """Check that the parameters, other than the oscillation ones, are not changed."""
+        return all(
+            parameter.value == value
+            for parameter, value in zip(self._parameters, self._parameter_values)
+        )
+
+    def _build(self) -> None:
+        storage = self._model.storage
+        output_final = storage["outputs.eventscount.final.concatenated.selected"]
+
+        survival_probability_nodes = {
+            output.node: i for i, output in enumerate(self._survival_probability_outputs)
+        }
+        dependence: dict[Node, bool] = {}
+
+        def depends(node: Node) -> bool:
+            try:
+                return dependence[node]
+            except KeyError:
+                pass
+            dependence[node] = False
+            ret = node in survival_probability_nodes or any(
+                depends(input.parent_node) for input in node.inputs if input.connected()
+            )
+            dependence[node] = ret
+            return ret
+
+        # Find the linear response of the final observation to each IBD spectrum, which
+        # depends on the survival probability and is integrated
+        response: dict[Output, NDArray] = {}
+        integrals: dict[Output, list[tuple[int, NDArray]]] = {}
+
+        def walk_response(output: Output, matrix: NDArray) -> None:
+            node = output.node
+            if not depends(node):
+                return
+
+            if self._walk_integrals(output, depends, survival_probability_nodes, integrals):
+                response[output] = response[output] + matrix if output in response else matrix
+                return
+
+            match type(node).__name__:
+                case "Sum":
+                    for input in node.inputs:
+                        walk_response(input.parent_output, matrix)
+                case "Product":
+                    (input_dependent,) = _dependent_inputs(node, depends)
+                    factor = ones(output.dd.shape)
+                    for input in node.inputs:
+                        if input is not input_dependent:
+                            factor = factor * input.data
+                    walk_response(input_dependent.parent_output, matrix * factor[None, :])
+                case "VectorMatrixProduct" | "BandedVectorMatrixProduct":
+                    input_vector = node.inputs["vector"]
+                    (input_dependent,) = _dependent_inputs(node, depends)
+                    if input_dependent is not input_vector:
+                        raise RuntimeError(f"Matrix of {node.name} depends on oscillations")
+                    if isinstance(node, BandedVectorMatrixProduct):
+                        matrix_node = node.dense_matrix()
+                    else:
+                        matrix_node = node.inputs["matrix"].data
+                    if matrix_node.ndim == 1:
+                        walk_response(input_vector.parent_output, matrix * matrix_node[None, :])
+                    else:
+                        walk_response(input_vector.parent_output, matrix @ matrix_node)
+                case "AxisDistortionPointwiseProduct" | "RebinSegmentSum":
+                    if any(depends(input.parent_node) for input in node.inputs.iter_nonpos()):
+                        raise RuntimeError(f"Matrix of {node.name} depends on oscillations")
+                    index = node.outputs.index(output)
+                    walk_response(node.inputs[index].parent_output, matrix @ node.dense_matrix())
+                case "Proxy" | "View":
+                    index = getattr(node, "_idx", 0)
+                    walk_response(node.inputs[index].parent_output, matrix)
+                case "Cast":
+                    index = node.outputs.index(output)
+                    walk_response(node.inputs[index].parent_output, matrix)
+                case "Concatenation":
+                    offset = 0
+                    for input in node.inputs:
+                        size = input.parent_output.dd.size
+                        walk_response(input.parent_output, matrix[:, offset : offset + size])
+                        offset += size
+                case _:
+                    raise RuntimeError(f"Unable to process node {node.name} in a batch mode")
+
+        size_final = output_final.dd.size
+        walk_response(output_final, eye(size_final))
+
+        spectra = list(response)
+        self._response = array([response[output] for output in spectra])
+        self._kernels = []
+        for output in spectra:
+            # The kernels of the isotopes and antineutrino sources are summed for each
+            # survival probability
+            kernels_merged: dict[int, NDArray] = {}
+            for index, kernel in integrals[output]:
+                try:
+                    kernels_merged[index] = kernels_merged[index] + kernel
+                except KeyError:
+                    kernels_merged[index] = kernel
+            self._kernels.append(
+                (array(list(kernels_merged)), array(list(kernels_merged.values())))
+            )
+
+        # Compute the part of the prediction, which does not depend on oscillations
+        self._background = output_final.data.copy()
+        probabilities = array(
+            [output.data.ravel() for output in self._survival_probability_outputs]
+        )
+        self._background -= self._predict(probabilities[None, ...])[0]
+
+    def _walk_integrals(
+        self,
+        output: Output,
+        depends: Callable[[Node], bool],
+        survival_probability_nodes: dict[Node, int],
+        integrals: dict[Output, list[tuple[int, NDArray]]],
+    ) -> bool:
+        """Decompose the output as a sum of integrals of survival probabilities.
+
+        Returns False if the output is not integrated, i.e. is located after the integration.
+        """
+        node = output.node
+        if type(node).__name__ != "Sum":
+            return False
+
+        parts = []
+        for input in node.inputs:
+            if not depends(input.parent_node):
+                continue
+            part = self._walk_integral(input.parent_output, depends, survival_probability_nodes)
+            if part is None:
+                return False
+            parts.extend(part)
+
+        integrals[output] = parts
+        return True
+
+    def _walk_integral(
+        self,
+        output: Output,
+        depends: Callable[[Node], bool],
+        survival_probability_nodes: dict[Node, int],
+    ) -> list[tuple[int, NDArray]] | None:
+        node = output.node
+        match type(node).__name__:
+            case "Product":
+                (input_dependent,) = _dependent_inputs(node, depends)
+                factor = 1.0
+                for input in node.inputs:
+                    if input is input_dependent:
+                        continue
+                    if input.dd.size != 1:
+                        return None
+                    factor *= input.data[0]
+                parts = self._walk_integral(
+                    input_dependent.parent_output, depends, survival_probability_nodes
+                )
+                if parts is None:
+                    return None
+                return [(index, factor * kernel) for index, kernel in parts]
+            case "IntegratorCore":
+                if len(node.outputs) != 1:
+                    return None
+                input = node.inputs[0]
+                orders_x = node.inputs["orders_x"].data
+                orders_y = node.inputs["orders_y"].data
+                weights = node.inputs["weights"].data
+                self._orders_x, self._orders_y = orders_x.copy(), orders_y.copy()
+                self._mesh_shape = weights.shape
+                parts = _walk_mesh(input.parent_output, depends, survival_probability_nodes)
+                return [(index, (weights * kernel).ravel()) for index, kernel in parts]
+
+        return None
+
+    def _integrate(self, data: NDArray) -> NDArray:
+        """Sum the mesh points within bins, the last axis is the flattened mesh."""
+        data = data.reshape(data.shape[:-1] + self._mesh_shape)
+        offsets_x = concatenate(([0], cumsum(self._orders_x)[:-1]))
+        offsets_y = concatenate(([0], cumsum(self._orders_y)[:-1]))
+        data = add.reduceat(data, offsets_y, axis=-1)
+        data = add.reduceat(data, offsets_x, axis=-2)
+        return data.reshape(data.shape[:-2] + (-1,))
+
+    def _predict(self, probabilities: NDArray) -> NDArray:
+        """Compute the oscillation dependent part of the prediction.
+
+        Parameters
+        ----------
+        probabilities : NDArray
+            Survival probabilities on the mesh of shape [point, reactor-detector, mesh].
+        """
+        npoints = probabilities.shape[0]
+        spectra = empty((npoints, len(self._kernels), self._response.shape[2]))
+        for i, (indices, kernels) in enumerate(self._kernels):
+            spectra[:, i] = self._integrate(
+                einsum("nrm,rm->nm", probabilities[:, indices], kernels)
+            )
+
+        return einsum("kib,nkb->ni", self._response, spectra)
+
+    def _build_survival_probability(self) -> None:
+        """Read the energies and baselines of the survival probability nodes."""
+        l4e, is_dm32_leading = [], []
+        for output in self._survival_probability_outputs:
+            node = output.node
+            is_dm32_leading.append(node.inputs.get("DeltaMSq32") is not None)
+            # See `NueSurvivalProbability`: conversion·L/4 in the units of the baseline
+            factor = (
+                node.inputs["surprobArgConversion"].data[0]
+                * node.inputs["L"].data[0]
+                * 0.25
+                * node._baseline_scale
+            )
+            l4e.append(factor / node.inputs["E"].data.ravel())
+        self._l4e = array(l4e)
+        self._is_dm32_leading = array(is_dm32_leading)[:, None]
+
+    def _read_oscillation_parameters(self, parameters: list, values: NDArray) -> dict[str, NDArray]:
+        """Return the values of the oscillation inputs of each survival probability node for
+        each point: name → array [point, node, 1]."""
+        columns = {id(parameter.output): values[:, i] for i, parameter in enumerate(parameters)}
+        used = set()
+        ret = {}
+        for name in _OSCILLATION_INPUTS:
+            argument = empty((values.shape[0], len(self._survival_probability_outputs), 1))
+            for j, output in enumerate(self._survival_probability_outputs):
+                inputs = output.node.inputs
+                if name == "DeltaMSq3l":
+                    input = inputs.get("DeltaMSq32")
+                    if input is None:
+                        input = inputs["DeltaMSq31"]
+                else:
+                    input = inputs[name]
+                key = id(input.parent_output)
+                if key in columns:
+                    argument[:, j, 0] = columns[key]
+                    used.add(key)
+                else:
+                    argument[:, j, 0] = input.data[0]
+            ret[name] = argument
+
+        if len(used) != len(columns):
+            raise RuntimeError(
+                "Batch evaluation is supported only for the parameters, connected directly to"
+                " the survival probability"
+            )
+
+        return ret
+
+    def _survival_probability(self, arguments: Mapping[str, NDArray]) -> NDArray:
+        """Compute the survival probabilities, see `NueSurvivalProbability`.
+
+        Parameters
+        ----------
+        arguments : Mapping[str, NDArray]
+            Values of the oscillation inputs: name → array [point, node, 1].
+
+        Returns
+        -------
+        NDArray
+            Survival probabilities on the mesh of shape [point, reactor-detector, mesh].
+        """
+        sinsq2theta12, sinsq2theta13, deltamsq21, deltamsq3l, nmo = (
+            arguments[name] for name in _OSCILLATION_INPUTS
+        )
+        deltamsq3l = nmo * deltamsq3l
+        deltamsq32 = where(self._is_dm32_leading, deltamsq3l, deltamsq3l - deltamsq21)
+        deltamsq31 = where(self._is_dm32_leading, deltamsq3l + deltamsq21, deltamsq3l)
+
+        sinsqtheta12 = 0.5 * (1 - sqrt(1 - sinsq2theta12))
+        cossqtheta12 = 1.0 - sinsqtheta12
+        cossqtheta13 = 1 - 0.5 * (1 - sqrt(1 - sinsq2theta13))
+        cosqutheta13 = cossqtheta13 * cossqtheta13
+
+        # The operations are done in place in order to avoid large temporary arrays
+        shape = deltamsq32.shape[:1] + self._l4e.shape
+        ret = empty(shape)
+        buffer = empty(shape)
+
+        def sinsq(deltamsq: NDArray, out: NDArray) -> NDArray:
+            multiply(deltamsq, self._l4e, out=out)
+            sin(out, out=out)
+            return square(out, out=out)
+
+        multiply(sinsqtheta12, sinsq(deltamsq32, ret), out=ret)
+        ret += multiply(cossqtheta12, sinsq(deltamsq31, buffer), out=buffer)
+        ret *= -sinsq2theta13
+        ret -= multiply(sinsq2theta12 * cosqutheta13, sinsq(deltamsq21, buffer), out=buffer)
+        ret += 1.0
+
+        return ret
+
+    def evaluate(
+        self, parameters: list, values: NDArray, outputs: Sequence[str]
+    ) -> dict[str, NDArray]:
+        """Evaluate the outputs for each set of parameter values."""
+        npoints = values.shape[0]
+        arguments = self._read_oscillation_parameters(parameters, values)
+
+        prediction = empty((npoints, self._background.size))
+        nchunk = max(1, _CHUNK_SIZE_ELEMENTS // self._l4e.size)
+        for start in range(0, npoints, nchunk):
+            chunk = slice(start, start + nchunk)
+            probabilities = self._survival_probability(
+                {name: argument[chunk] for name, argument in arguments.items()}
+            )
+            prediction[chunk] = self._background + self._predict(probabilities)
+
+        result = {}
+        statistics = []
+        for name in outputs:
+            if name == _OUTPUT_PREDICTION:
+                result[name] = prediction
+            else:
+                statistics.append(name)
+        if statistics:
+            result.update(self._evaluate_statistics(parameters, values, prediction, statistics))
+
+        return result
+
+    def _evaluate_statistics(
+        self, parameters: list, values: NDArray, prediction: NDArray, outputs: Sequence[str]
+    ) -> dict[str, NDArray]:
+        """Evaluate the statistics by the graph for each prediction.
+
+        The node of the prediction is frozen and its data is replaced by the prediction of
+        each point, so only the statistics and the nuisance terms are evaluated.
+        """
+        storage_outputs = self._model.storage["outputs"]
+        output_prediction = storage_outputs[_OUTPUT_PREDICTION]
+        model_outputs = [storage_outputs[name] for name in outputs]
+        npoints = values.shape[0]
+        result = {
+            name: empty((npoints,) + output.dd.shape)
+            for name, output in zip(outputs, model_outputs)
+        }
+
+        node = output_prediction.node
+        data_initial = output_prediction.data.copy()
+        values_initial = [parameter.value for parameter in parameters]
+        node.freeze()
+        try:
+            for i, point in enumerate(values):
+                for parameter, value in zip(parameters, point):
+                    parameter.value = value
+                output_prediction._data[:] = prediction[i]
+                output_prediction.taint_children()
+                for name, output in zip(outputs, model_outputs):
+                    result[name][i] = output.data
+        finally:
+            for parameter, value in zip(parameters, values_initial):
+                parameter.value = value
+            output_prediction._data[:] = data_initial
+            output_prediction.taint_children()
+            node.unfreeze()
+
+        return result
+
+
+def _dependent_inputs(node: Node, depends: Callable[[Node], bool]) -> list:
+    return [input for input in node.inputs if depends(input.parent_node)]
+
+
+def _walk_mesh(
+    output: Output,
+    depends: Callable[[Node], bool],
+    survival_probability_nodes: dict[Node, int],
+) -> list[tuple[int, NDArray]]:
+    """Decompose the integrand as a sum of products of kernels and survival probabilities."""
+    node = output.node
+    try:
+        return [(survival_probability_nodes[node], ones(output.dd.shape))]
+    except KeyError:
+        pass
+
+    match type(node).__name__:
+        case "Product":
+            (input_dependent,) = _dependent_inputs(node, depends)
+            parts = _walk_mesh(input_dependent.parent_output, depends, survival_probability_nodes)
+            factor = ones(output.dd.shape)
+            for input in node.inputs:
+                if input is not input_dependent:
+                    factor = factor * input.data
+            return [(index, kernel * factor) for index, kernel in parts]
+        case "Sum":
+            parts = []
+            for input in node.inputs:
+                if not depends(input.parent_node):
+                    raise RuntimeError(
+                        f"Unable to process node {node.name} in a batch mode: the integrand "
+                        "has an oscillation independent term"
+                    )
+                parts.extend(_walk_mesh(input.parent_output, depends, survival_probability_nodes))
+            return parts
+
+    raise RuntimeError(f"Unable to process node {node.name} in a batch mode")
+
+
+def _read_parameter_grid(
+    model: model_dayabay, parameter_grid: Mapping[str, Sequence[float] | NDArray]
+) -> tuple[list, NDArray]:
+    if not parameter_grid:
+        raise ValueError("Parameter grid is empty")
+
+    parameters_storage = model.storage("parameters.all")
+    parameters = [parameters_storage[name] for name in parameter_grid]
+    columns = [asarray(values, dtype="d") for values in parameter_grid.values()]
+    npoints = columns[0].shape
+    for name, column in zip(parameter_grid, columns):
+        if column.ndim != 1 or column.shape != npoints:
+            raise ValueError(
+                f"Parameter grid for {name} should be 1d and has {npoints[0]} elements"
+            )
+
+    values = zeros((npoints[0], len(columns)))
+    for i, column in enumerate(columns):
+        values[:, i] = column
+
+    return parameters, values
+
+
+def _evaluate_loop(
+    model: model_dayabay, parameters: list, values: NDArray, outputs: Sequence[str]
+) -> dict[str, NDArray]:
+    """Evaluate the outputs point by point by setting the parameters."""
+    storage_outputs = model.storage["outputs"]
+    model_outputs = [storage_outputs[name] for name in outputs]
+    npoints = values.shape[0]
+    result = {
+        name: empty((npoints,) + output.dd.shape) for name, output in zip(outputs, model_outputs)
+    }
+
+    values_initial = [parameter.value for parameter in parameters]
+    try:
+        for i, point in enumerate(values):
+            for parameter, value in zip(parameters, point):
+                parameter.value = value
+            for name, output in zip(outputs, model_outputs):
+                result[name][i] = output.data
+    finally:
+        for parameter, value in zip(parameters, values_initial):
+            parameter.value = value
+
+    return result
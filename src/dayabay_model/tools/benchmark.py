@@ -0,0 +1,376 @@
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version
+from json import dump, load
+from pathlib import Path
+from platform import platform, python_version
+from resource import RUSAGE_SELF, getrusage
+from statistics import median
+from subprocess import run
+from sys import executable
+from sys import platform as sys_platform
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from dag_modelling.tools.logger import INFO, logger
+
+from .build_cache import _PACKAGES
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from typing import Any
+
+    from ..model_dayabay import model_dayabay
+
+# Version of the format of the benchmark results
+BENCHMARK_FORMAT_VERSION = 1
+
+# Maximal time of `import dayabay_model` in a new interpreter, seconds
+IMPORT_TIME_BUDGET = 0.25
+
+# Maximal time of the benchmarks, which have a budget, seconds
+BENCHMARK_BUDGETS = {"import.dayabay_model": IMPORT_TIME_BUDGET}
+
+# Heavy modules, which should not be imported by `import dayabay_model`
+IMPORT_DEFERRED_MODULES = (
+    "pandas",
+    "matplotlib",
+    "numba",
+    "dag_modelling.core",
+    "dgm_reactor_neutrino",
+)
+
+
+def run_benchmarks(
+    *,
+    source_types: Sequence[str] = ("hdf5",),
+    path_data: str | Path = "dayabay-data-official",
+    repeat: int = 5,
+    ntoys: int = 20,
+    statistic: str = "statistic.full.pull.chi2cnp",
+    model_options: Mapping[str, Any] = {},
+) -> dict[str, Any]:
+    """Measure the performance of the model.
+
+    The following benchmarks are done:
+        - `import.dayabay_model`: `import dayabay_model` in a new interpreter, the time should
+          be within `IMPORT_TIME_BUDGET`;
+        - `build.{source_type}`: construction of the model for each source type, the data is
+          read from `{path_data}/{source_type}`;
+        - `evaluate.oscillation`: evaluation of the statistic after a change of an oscillation
+          parameter;
+        - `evaluate.nuisance`: evaluation of the statistic after a change of a nuisance
+          parameter of the detector response;
+        - `covariance.update`: `update_covariance_matrix()` for all the covariance groups;
+        - `toymc.next_sample`: generation of a pseudo-experiment with `next_sample()` and the
+          evaluation of the statistic.
+
+    The evaluations and the ToyMC are done with the model of the first source type. The
+    peak resident memory of the process is measured after each benchmark. As the peak never
+    decreases, the increase of the peak during each benchmark is reported as well.
+
+    Parameters
+    ----------
+    source_types : Sequence[str]
+        Source types of the data to build the model for.
+    path_data : str | Path
+        Directory with the data of each source type.
+    repeat : int
+        Number of repetitions of each benchmark, except the build.
+    ntoys : int
+        Number of pseudo-experiments for the ToyMC benchmark.
+    statistic : str
+        Statistic (relative to `outputs`) to evaluate.
+    model_options : Mapping[str, Any]
+        Extra arguments of `model_dayabay`.
+
+    Returns
+    -------
+    dict[str, Any]
+        Results: metadata and the measured times (in seconds) of each benchmark.
+    """
+    from ..model_dayabay import model_dayabay
+
+    assert source_types, "At least one source type is required"
+    assert repeat > 0 and ntoys > 0
+
+    benchmarks: dict[str, dict[str, Any]] = {}
+    peak_rss_mib = _get_peak_rss_mib()
+
+    def add(name: str, times: list[float], *, count: int = 1) -> None:
+        nonlocal peak_rss_mib
+        peak_rss_mib_previous, peak_rss_mib = peak_rss_mib, _get_peak_rss_mib()
+        benchmarks[name] = _summarize(times, count=count)
+        benchmarks[name]["peak_rss_mib"] = peak_rss_mib
+        benchmarks[name]["peak_rss_increase_mib"] = peak_rss_mib - peak_rss_mib_previous
+        logger.log(
+            INFO,
+            f"Benchmark {name}: {benchmarks[name]['median']:.6g} s"
+            f" (peak RSS +{benchmarks[name]['peak_rss_increase_mib']:.1f} MiB)",
+        )
+
+    add("import.dayabay_model", measure_import_time("dayabay_model", repeat))
+    if benchmarks["import.dayabay_model"]["median"] > IMPORT_TIME_BUDGET:
+        logger.warning(
+            f"Import of dayabay_model exceeds the budget of {IMPORT_TIME_BUDGET} s, imported:"
+            f" {', '.join(find_imported_modules('dayabay_model')) or 'none'}"
+        )
+
+    model = None
+    for source_type in source_types:
+        time_start = perf_counter()
+        model_current = model_dayabay(path_data=Path(path_data) / source_type, **model_options)
+        add(f"build.{source_type}", [perf_counter() - time_start])
+        if model is None:
+            model = model_current
+    assert model is not None
+
+    storage = model.storage
+    output = storage["outputs"].get_value(statistic)
+    parameter_oscillation = storage["parameters.all.survival_probability.SinSq2Theta13"]
+    parameters_nuisance = storage["parameters.normalized"][
+        model.systematic_uncertainties_groups["eres"]
+    ]
+    parameter_nuisance = next(parameters_nuisance.walkvalues())
+
+    output.data
+    add(
+        "evaluate.oscillation",
+        _time_parameter_change(output, parameter_oscillation, repeat, relative_step=1.0e-3),
+    )
+    add(
+        "evaluate.nuisance",
+        _time_parameter_change(output, parameter_nuisance, repeat, absolute_step=0.1),
+    )
+    add(
+        "covariance.update",
+        _time_repeat(lambda: model.update_covariance_matrix(force=True), repeat),
+    )
+
+    def toymc() -> None:
+        for _ in range(ntoys):
+            model.next_sample()
+            output.data
+
+    add("toymc.next_sample", _time_repeat(toymc, repeat), count=ntoys)
+
+    return {
+        "format_version": BENCHMARK_FORMAT_VERSION,
+        "meta": _make_meta(source_types, repeat, ntoys, statistic, model_options),
+        "benchmarks": benchmarks,
+    }
+
+
+def compare_benchmarks(
+    reference: Mapping[str, Any],
+    current: Mapping[str, Any],
+    *,
+    threshold: float = 0.1,
+    key: str = "median",
+) -> list[dict[str, Any]]:
+    """Compare the benchmark results.
+
+    Parameters
+    ----------
+    reference : Mapping[str, Any]
+        Reference results, see `run_benchmarks()`.
+    current : Mapping[str, Any]
+        Results to check.
+    threshold : float
+        Maximal allowed relative increase of the time.
+    key : str
+        Value to compare: "min" or "median" time per iteration.
+
+    Returns
+    -------
+    list[dict[str, Any]]
+        A row for each benchmark with the values, their ratio and status: "ok",
+        "regression", "improvement", "new", "missing" or "over budget". The last one is set
+        if the current value exceeds the budget from `BENCHMARK_BUDGETS`.
+    """
+    benchmarks_reference = reference["benchmarks"]
+    benchmarks_current = current["benchmarks"]
+
+    rows = []
+    for name in {**benchmarks_reference, **benchmarks_current}:
+        value_reference = benchmarks_reference.get(name, {}).get(key)
+        value_current = benchmarks_current.get(name, {}).get(key)
+        ratio = None
+        if value_reference is None:
+            status = "new"
+        elif value_current is None:
+            status = "missing"
+        else:
+            ratio = value_current / value_reference
+            if ratio > 1.0 + threshold:
+                status = "regression"
+            elif ratio < 1.0 / (1.0 + threshold):
+                status = "improvement"
+            else:
+                status = "ok"
+        budget = BENCHMARK_BUDGETS.get(name)
+        if budget is not None and value_current is not None and value_current > budget:
+            status = "over budget"
+        rows.append(
+            {
+                "name": name,
+                "reference": value_reference,
+                "current": value_current,
+                "ratio": ratio,
+                "status": status,
+            }
+        )
+
+    return rows
+
+
+def check_budgets(results: Mapping[str, Any], *, key: str = "median") -> list[str]:
+    """Return the names of the benchmarks, which exceed their budgets.
+
+    Parameters
+    ----------
+    results : Mapping[str, Any]
+        Results, see `run_benchmarks()`.
+    key : str
+        Value to check: "min" or "median" time per iteration.
+
+    Returns
+    -------
+    list[str]
+        Names of the benchmarks from `BENCHMARK_BUDGETS` with the time above the budget.
+    """
+    benchmarks = results["benchmarks"]
+    return [
+        name
+        for name, budget in BENCHMARK_BUDGETS.items()
+        if name in benchmarks and benchmarks[name][key] > budget
+    ]
+
+
+def measure_import_time(module: str = "dayabay_model", repeat: int = 5) -> list[float]:
+    """Measure the time of the import of the module, each time in a new interpreter.
+
+    Parameters
+    ----------
+    module : str
+        Name of the module to import.
+    repeat : int
+        Number of measurements.
+
+    Returns
+    -------
+    list[float]
+        Times of the import in seconds, the start of the interpreter is not included.
+    """
+    code = (
+        "from time import perf_counter; time_start = perf_counter(); "
+        f"import {module}; print(perf_counter() - time_start)"
+    )
+    return [float(_run_python(code)) for _ in range(repeat)]
+
+
+def find_imported_modules(
+    module: str = "dayabay_model", modules: Sequence[str] = IMPORT_DEFERRED_MODULES
+) -> list[str]:
+    """Find, which of the `modules` are imported by the import of the module.
+
+    The import is done in a new interpreter.
+    """
+    code = f"import sys, {module}; print(*(name for name in {tuple(modules)!r} if name in sys.modules))"
+    return _run_python(code).split()
+
+
+def _run_python(code: str) -> str:
+    result = run([executable, "-c", code], capture_output=True, text=True, check=True)
+    return result.stdout
+
+
+def save_benchmarks(results: Mapping[str, Any], path: str | Path) -> None:
+    with Path(path).open("w") as file:
+        dump(results, file, indent=2)
+    logger.log(INFO, f"Write: {path!s}")
+
+
+def load_benchmarks(path: str | Path) -> dict[str, Any]:
+    with Path(path).open() as file:
+        results = load(file)
+    if results.get("format_version") != BENCHMARK_FORMAT_VERSION:
+        raise RuntimeError(f"Unsupported format of the benchmark results in {path!s}")
+    return results
+
+
+def _time_repeat(function: Callable[[], Any], repeat: int) -> list[float]:
+    times = []
+    for _ in range(repeat):
+        time_start = perf_counter()
+        function()
+        times.append(perf_counter() - time_start)
+    return times
+
+
+def _time_parameter_change(
+    output: Any,
+    parameter: Any,
+    repeat: int,
+    *,
+    relative_step: float = 0.0,
+    absolute_step: float = 0.0,
+) -> list[float]:
+    """Time the evaluation of the output after the parameter is changed back and forth."""
+    value = parameter.value
+    step = relative_step * value + absolute_step
+    times = []
+    try:
+        for i in range(repeat):
+            parameter.value = value + step * (i % 2 * 2 - 1)
+            time_start = perf_counter()
+            output.data
+            times.append(perf_counter() - time_start)
+    finally:
+        parameter.value = value
+    return times
+
+
+def _summarize(times: list[float], *, count: int) -> dict[str, Any]:
+    times_per_iteration = [time / count for time in times]
+    return {
+        "times": times,
+        "count": count,
+        "min": min(times_per_iteration),
+        "median": median(times_per_iteration),
+    }
+
+
+def _get_peak_rss_mib() -> float:
+    maxrss = getrusage(RUSAGE_SELF).ru_maxrss
+    # The value is in bytes on macOS and in kilobytes on Linux
+    return maxrss / 2**20 if sys_platform == "darwin" else maxrss / 2**10
+
+
+def _make_meta(
+    source_types: Sequence[str],
+    repeat: int,
+    ntoys: int,
+    statistic: str,
+    model_options: Mapping[str, Any],
+) -> dict[str, Any]:
+    versions = {}
+    for package in _PACKAGES:
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = None
+
+    return {
+        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "platform": platform(),
+        "python": python_version(),
+        "versions": versions,
+        "source_types": list(source_types),
+        "repeat": repeat,
+        "ntoys": ntoys,
+        "statistic": statistic,
+        "model_options": {name: str(value) for name, value in model_options.items()},
+    }
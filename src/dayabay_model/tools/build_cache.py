@@ -0,0 +1,423 @@
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence, Set
+from copy import deepcopy
+from glob import glob
+from hashlib import sha256
+from importlib.metadata import PackageNotFoundError, version
+from os import replace
+from pathlib import Path
+from pickle import HIGHEST_PROTOCOL, dump, load
+from typing import TYPE_CHECKING
+
+from dag_modelling.bundles.file_reader import FileReader, file_readers
+from dag_modelling.tools.logger import INFO, logger
+from numpy import array, ndarray
+
+from .validate_dataset import load_manifest
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+    from typing import Any
+
+    from nested_mapping import NestedMapping
+
+# Increment, when the layout of the cache file or the content of the cached items is changed
+_CACHE_FORMAT_VERSION = 1
+
+_PACKAGES = ("dayabay-model", "dag-modelling", "dgm-reactor-neutrino", "nested-mapping", "numpy")
+
+
+class BuildCache:
+    """Persistent on-disk cache of the data, read and preprocessed during the model build.
+
+    The cache contains:
+        - the objects, read by `FileReader` (graphs, histograms, arrays, records),
+        - the parsed configuration files of the parameters,
+        - the storages with preprocessed data, e.g. refined daily data and LSNL curves.
+
+    The cache file is identified by a key, computed from the dataset version, the model
+    arguments and the versions of the packages. The modification times and sizes of all the
+    files, read during the build, are saved within the cache and checked on load: the cache
+    is ignored if any of the files was modified.
+
+    The instance is used as a context manager around the model build. The cached readers are
+    registered by `register_readers()` within the `FileReader` context, so `FileReader` returns
+    the cached objects instead of reading the files. On exit the cache is saved if any new
+    items were added.
+
+    When `path` is None the cache is disabled and all the methods do nothing.
+    """
+
+    __slots__ = (
+        "_path",
+        "_key",
+        "_files",
+        "_readers",
+        "_items",
+        "_modified",
+    )
+
+    _path: Path | None
+    _key: str
+    _files: dict[str, tuple[int, int]]
+    _readers: dict[str, dict[tuple[str, str | None], Any]]
+    _items: dict[str, Any]
+    _modified: bool
+
+    def __init__(
+        self,
+        path: str | Path | None,
+        *,
+        path_data: Path | None = None,
+        meta_name: str = "dataset_info.yaml",
+        arguments: Mapping[str, Any] = {},
+    ):
+        """Initialize the cache and read it from the disk if it is valid.
+
+        Parameters
+        ----------
+        path : str | Path | None
+            Directory to store cache files. Disable the cache if None.
+        path_data : Path | None
+            Path to the dataset. The version of the dataset is read from the `meta_name` file.
+        meta_name : str
+            Name of the dataset manifest file.
+        arguments : Mapping[str, Any]
+            Arguments of the model, affecting the build.
+        """
+        self._files = {}
+        self._readers = {}
+        self._items = {}
+        self._modified = False
+        self._key = ""
+
+        if path is None:
+            self._path = None
+            return
+
+        self._key = _make_key(path_data, meta_name, arguments)
+        self._path = Path(path) / f"build_cache_{self._key[:32]}.pickle"
+        self._read()
+
+    @property
+    def enabled(self) -> bool:
+        return self._path is not None
+
+    @property
+    def path(self) -> Path | None:
+        return self._path
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._items
+
+    def __enter__(self) -> BuildCache:
+        return self
+
+    def __exit__(self, exc_type, *args) -> None:
+        if self._path is not None and exc_type is None and self._modified:
+            self._write()
+
+    def register_readers(self, file_names: Iterable[str | Path]) -> None:
+        """Register the cached readers of the files within the `FileReader` context.
+
+        `FileReader[file_name]` returns a registered reader instead of opening the file, so
+        the loaders get the cached objects. A reader opens the file only when an object is
+        missing in the cache. The readers of the files, read during the previous build, are
+        registered as well. The readers are released on exit from the `FileReader` context.
+
+        Parameters
+        ----------
+        file_names : Iterable[str | Path]
+            Names of the data files. A file name may contain `{}`, which matches any string,
+            e.g. the name of the period. The files of unknown types are ignored.
+        """
+        if self._path is None:
+            return
+
+        names = dict.fromkeys(self._readers)
+        for file_name in file_names:
+            file_name = str(file_name)
+            if Path(file_name).suffix not in file_readers:
+                continue
+            if "{}" in file_name:
+                names.update(dict.fromkeys(sorted(glob(file_name.replace("{}", "*")))))
+            else:
+                names[file_name] = None
+
+        registry = FileReader._opened_files
+        for file_name in names:
+            if file_name not in registry:
+                registry[file_name] = _CachedFileReader(file_name, self)
+
+    def get(self, name: str, function: Callable[[], Any], *, files: Sequence[str | Path] = ()):
+        """Return a cached item or compute and store it.
+
+        Parameters
+        ----------
+        name : str
+            Name of the item.
+        function : Callable[[], Any]
+            Function to compute the item if it is not cached.
+        files : Sequence[str | Path]
+            Files, the item depends on.
+        """
+        if self._path is None:
+            return function()
+
+        try:
+            return deepcopy(self._items[name])
+        except KeyError:
+            pass
+
+        ret = function()
+        self._items[name] = deepcopy(ret)
+        for file_name in files:
+            self._add_file(file_name)
+        self._modified = True
+
+        return ret
+
+    def restore_storage(self, storage: NestedMapping, path: str) -> bool:
+        """Restore the cached items of the `storage` under the `path`.
+
+        Returns False if the items are not cached.
+        """
+        try:
+            items = self._items[f"storage:{path}"]
+        except KeyError:
+            return False
+
+        for key, value in items:
+            storage[key] = deepcopy(value)
+        logger.log(INFO, f"Restore {path} from the build cache")
+
+        return True
+
+    def store_storage(self, storage: NestedMapping, path: str) -> None:
+        """Store the items of the `storage` under the `path`."""
+        if self._path is None:
+            return
+
+        prefix = tuple(path.split("."))
+        self._items[f"storage:{path}"] = [
+            (prefix + key, deepcopy(value)) for key, value in storage.get_dict(path).walkitems()
+        ]
+        self._modified = True
+
+    def wrap_load_parameters(self, load_parameters: Callable) -> Callable:
+        """Wrap `load_parameters` to use the cached parsed configuration files."""
+        if self._path is None:
+            return load_parameters
+
+        from dag_modelling.tools.schema import LoadFileWithExt, LoadYaml, MakeLoaderPy
+
+        load_file = LoadFileWithExt(yaml=LoadYaml, py=MakeLoaderPy("configuration"))
+
+        def wrapper(acfg: Mapping | None = None, **kwargs):
+            cfg = dict(acfg or {}, **kwargs)
+            try:
+                file_name = str(cfg.pop("load"))
+            except KeyError:
+                return load_parameters(cfg)
+
+            parameters_cfg = self.get(
+                f"parameters:{file_name}", lambda: load_file(file_name), files=(file_name,)
+            )
+            parameters_cfg.update(cfg)
+            return load_parameters(parameters_cfg)
+
+        return wrapper
+
+    def _open_reader(self, file_name: str | Path) -> FileReader:
+        self._add_file(file_name)
+        self._modified = True
+        return FileReader.open(file_name)
+
+    def _add_file(self, file_name: str | Path) -> None:
+        path = Path(file_name)
+        if path.suffix == ".compiled":
+            # The objects of the compiled dataset are read from the single container
+            from .compiled_dataset import find_container
+
+            paths = tuple(filter(None, (find_container(path),)))
+        elif path.is_dir():
+            paths = sorted(path.rglob("*"))
+        else:
+            # TSV objects may be stored in separate (compressed) files with the common prefix
+            paths = (path, path.with_name(f"{path.name}.bz2"), *path.parent.glob(f"{path.stem}_*"))
+        for subpath in paths:
+            if subpath.is_file():
+                self._files[str(subpath.resolve())] = _file_stat(subpath)
+
+    def _read(self) -> None:
+        assert self._path is not None
+        try:
+            with self._path.open("rb") as file:
+                content = load(file)
+        except FileNotFoundError:
+            logger.log(INFO, f"Build cache {self._path!s} does not exist")
+            return
+        except Exception as e:
+            logger.warning(f"Unable to read build cache {self._path!s}: {e!s}")
+            return
+
+        if content.get("format") != _CACHE_FORMAT_VERSION or content.get("key") != self._key:
+            logger.log(INFO, f"Build cache {self._path!s} is outdated")
+            return
+
+        for file_name, stat in content["files"].items():
+            try:
+                if _file_stat(Path(file_name)) == stat:
+                    continue
+            except FileNotFoundError:
+                pass
+            logger.log(INFO, f"Build cache {self._path!s} is outdated: {file_name} is modified")
+            return
+
+        self._files = content["files"]
+        self._readers = content["readers"]
+        self._items = content["items"]
+        logger.log(INFO, f"Use build cache {self._path!s}")
+
+    def _write(self) -> None:
+        assert self._path is not None
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        content = {
+            "format": _CACHE_FORMAT_VERSION,
+            "key": self._key,
+            "files": self._files,
+            "readers": self._readers,
+            "items": self._items,
+        }
+        # Write to a temporary file first in order to avoid partially written caches, when
+        # several processes are building the model simultaneously
+        path_temporary = self._path.with_name(f"{self._path.name}.{id(self):x}.tmp")
+        with path_temporary.open("wb") as file:
+            dump(content, file, protocol=HIGHEST_PROTOCOL)
+        replace(path_temporary, self._path)
+        self._modified = False
+        logger.log(INFO, f"Write build cache {self._path!s}")
+
+
+class _CachedFileReader:
+    """A replacement for `FileReader`, which returns cached objects.
+
+    The file is opened only when an object is missing in the cache.
+    """
+
+    __slots__ = ("_file_name", "_cache", "_reader")
+
+    _file_name: str
+    _cache: BuildCache
+    _reader: FileReader | None
+
+    def __init__(self, file_name: str, cache: BuildCache):
+        self._file_name = file_name
+        self._cache = cache
+        self._reader = None
+
+    def get_graph(self, object_name: str | None) -> Any:
+        return self._get("graph", object_name)
+
+    def get_hist(self, object_name: str | None) -> Any:
+        return self._get("hist", object_name)
+
+    def get_array(self, object_name: str | None) -> Any:
+        return self._get("array", object_name)
+
+    def get_record(self, object_name: str | None) -> Any:
+        return self._get("record", object_name)
+
+    def keys(self) -> tuple[str, ...]:
+        return self._get_reader().keys()
+
+    def _get(self, kind: str, object_name: str | None) -> Any:
+        key = (kind, object_name)
+        objects = self._cache._readers.get(self._file_name, {})
+        try:
+            return deepcopy(objects[key])
+        except KeyError:
+            pass
+
+        ret = _make_storable(getattr(self._get_reader(), f"get_{kind}")(object_name))
+        self._cache._readers.setdefault(self._file_name, {})[key] = deepcopy(ret)
+
+        return ret
+
+    def _get_reader(self) -> FileReader:
+        if self._reader is None:
+            self._reader = self._cache._open_reader(self._file_name)
+        return self._reader
+
+    def _close(self) -> None:
+        if self._reader is not None:
+            self._reader._close()
+            self._reader = None
+
+
+def _make_storable(obj: Any) -> Any:
+    """Convert lazy objects, e.g. `h5py.Dataset`, to numpy arrays."""
+    match obj:
+        case ndarray():
+            return obj
+        case tuple():
+            return tuple(_make_storable(item) for item in obj)
+        case dict():
+            return {key: _make_storable(item) for key, item in obj.items()}
+        case _ if hasattr(obj, "dtype") and hasattr(obj, "shape"):
+            return array(obj[()])
+    return obj
+
+
+def _file_stat(path: Path) -> tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _make_key(path_data: Path | None, meta_name: str, arguments: Mapping[str, Any]) -> str:
+    hash = sha256()
+    hash.update(f"format={_CACHE_FORMAT_VERSION}".encode())
+
+    for package in _PACKAGES:
+        try:
+            package_version = version(package)
+        except PackageNotFoundError:
+            package_version = None
+        hash.update(f"{package}={package_version}".encode())
+
+    if path_data is not None:
+        _, dataset_version = load_manifest(path_data, meta_name)
+        hash.update(f"path_data={path_data.resolve()!s}".encode())
+        hash.update(f"dataset_version={dataset_version!s}".encode())
+
+    _update_hash(hash, arguments)
+
+    return hash.hexdigest()
+
+
+def _update_hash(hash, obj: Any) -> None:
+    match obj:
+        case ndarray():
+            hash.update(f"ndarray{obj.dtype.str}{obj.shape}".encode())
+            hash.update(obj.tobytes())
+        case Mapping():
+            hash.update(f"{type(obj).__name__}{{".encode())
+            for key in sorted(obj, key=str):
+                _update_hash(hash, key)
+                _update_hash(hash, obj[key])
+            hash.update(b"}")
+        case Set():
+            hash.update(b"set{")
+            for item in sorted(obj, key=str):
+                _update_hash(hash, item)
+            hash.update(b"}")
+        case Sequence() if not isinstance(obj, str):
+            hash.update(b"[")
+            for item in obj:
+                _update_hash(hash, item)
+            hash.update(b"]")
+        case Path():
+            hash.update(f"Path({obj.resolve()!s})".encode())
+        case _:
+            hash.update(repr(obj).encode())
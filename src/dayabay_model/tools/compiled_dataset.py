@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+from json import dumps, loads
+from os import replace
+from pathlib import Path
+from shutil import copy2, copytree
+from typing import TYPE_CHECKING
+
+from dag_modelling.bundles.file_reader import FileReader
+from dag_modelling.tools.logger import DEBUG, INFO, logger
+from numpy import ascontiguousarray, dtype, memmap
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+    from typing import Any
+
+    from numpy.typing import NDArray
+
+# Name of the single file with all the data of the compiled dataset
+COMPILED_DATASET_NAME = "dataset.compiled"
+
+# Signature and version of the file layout
+_MAGIC = b"DGMCDS01"
+
+# Alignment of the header and of each array [bytes]
+_ALIGNMENT = 64
+
+# Opened containers: {resolved path: container}
+_containers: dict[str, CompiledDataset] = {}
+
+
+class CompiledDataset:
+    """Single uncompressed file with all the arrays of the dataset.
+
+    The layout of the file:
+        - 8 bytes signature;
+        - 8 bytes little endian length of the header;
+        - header: JSON offset table `{file: {kind:object: entry}}`;
+        - the arrays, each is contiguous and aligned to 64 bytes. The offsets are counted
+          from the first array, which follows the header at the aligned position.
+
+    The `file` is the path of the original file, relative to the dataset, without extension.
+    The `kind` is `array`, `hist`, `graph` or `record` as requested from `FileReader`. The
+    entry is a list of arrays (the edges and the heights of a histogram, x and y of a graph,
+    a single array) or a mapping of the columns of a record. Each array is described by
+    offset, dtype and shape.
+
+    The file is mapped into memory once, all the objects are views of the mapping: the data is
+    not copied nor parsed. The mapping is copy-on-write since the loaders may modify the
+    arrays in place, e.g. normalize the histograms: only the modified pages are copied and
+    the file is never written.
+    """
+
+    __slots__ = ("_path", "_buffer", "_objects", "_data_start", "_nreaders")
+
+    _path: Path
+    _buffer: memmap
+    _objects: dict[str, dict[str, Any]]
+    _data_start: int
+    _nreaders: int
+
+    def __init__(self, path: str | Path):
+        self._path = Path(path)
+        self._buffer = memmap(self._path, dtype="u1", mode="c")
+
+        if bytes(self._buffer[:8]) != _MAGIC:
+            raise RuntimeError(f"{self._path!s} is not a compiled dataset")
+        header_size = int(self._buffer[8:16].view("<u8")[0])
+        self._objects = loads(bytes(self._buffer[16 : 16 + header_size]))
+        self._data_start = _data_start(header_size)
+        self._nreaders = 0
+
+    @classmethod
+    def open(cls, path: str | Path) -> CompiledDataset:
+        """Return the opened container.
+
+        The file is mapped once for all the readers, opened at the same time, i.e. during
+        the build of the model. The next build maps the file again, so the arrays, modified
+        by the previous model, are not shared.
+        """
+        key = str(Path(path).resolve())
+        try:
+            container = _containers[key]
+        except KeyError:
+            container = _containers[key] = cls(path)
+            logger.log(INFO, f"Map: {path!s}")
+
+        container._nreaders += 1
+
+        return container
+
+    def release(self) -> None:
+        """Release the container by a reader, forget it when it is not used anymore."""
+        self._nreaders -= 1
+        if self._nreaders == 0:
+            del _containers[str(self._path.resolve())]
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def keys(self, file_key: str | None = None) -> tuple[str, ...]:
+        """Return the names of the files or the objects of the file `file_key`."""
+        if file_key is None:
+            return tuple(self._objects)
+        return tuple(self._objects[file_key])
+
+    def get(self, file_key: str, kind: str, object_name: str | None) -> Any:
+        """Return the object as the views of the mapped file.
+
+        Parameters
+        ----------
+        file_key : str
+            Path of the original file, relative to the dataset, without extension.
+        kind : str
+            `array`, `hist`, `graph` or `record`.
+        object_name : str | None
+            Name of the object within the file.
+        """
+        try:
+            entry = self._objects[file_key][_object_key(kind, object_name)]
+        except KeyError as e:
+            raise KeyError(
+                f"Can not read {kind} {object_name} of {file_key} from {self._path!s}"
+            ) from e
+
+        match entry:
+            case dict():
+                return {name: self._view(spec) for name, spec in entry.items()}
+            case [spec]:
+                return self._view(spec)
+            case _:
+                return tuple(self._view(spec) for spec in entry)
+
+    def _view(self, spec: Mapping[str, Any]) -> NDArray:
+        array_dtype = dtype(spec["dtype"])
+        shape = tuple(spec["shape"])
+        size = array_dtype.itemsize
+        for n in shape:
+            size *= n
+        offset = self._data_start + spec["offset"]
+        return self._buffer[offset : offset + size].view(array_dtype).reshape(shape)
+
+
+class FileReaderCompiled(FileReader):
+    """Reader of the files of the compiled dataset.
+
+    The file `{path_data}/{name}.compiled` does not exist: the objects are read from the
+    container `{path_data}/dataset.compiled`, found in the parent directories of the file. The
+    reader is registered for the `.compiled` extension, when the module is imported.
+    """
+
+    _extension: str = ".compiled"
+
+    _container: CompiledDataset
+    _file_key: str
+
+    def __init__(self, file_name: str | Path) -> None:
+        super().__init__(file_name)
+        path_container = find_container(self._file_name)
+        if path_container is None:
+            raise FileNotFoundError(f"{COMPILED_DATASET_NAME} not found for {file_name!s}")
+
+        self._container = CompiledDataset.open(path_container)
+        self._file_key = _file_key(path_container.parent, self._file_name)
+
+    def _close(self) -> None:
+        super()._close()
+        self._container.release()
+
+    def keys(self) -> tuple[str, ...]:
+        """Return the names of the objects of the file."""
+        names = (key.partition(":")[2] for key in self._container.keys(self._file_key))
+        return tuple(dict.fromkeys(name for name in names if name))
+
+    def _get_graph(self, object_name: str | None) -> tuple[NDArray, NDArray]:
+        return self._container.get(self._file_key, "graph", object_name)
+
+    def _get_hist(self, object_name: str | None) -> tuple[NDArray, NDArray]:
+        return self._container.get(self._file_key, "hist", object_name)
+
+    def _get_array(self, object_name: str | None) -> NDArray:
+        return self._container.get(self._file_key, "array", object_name)
+
+    def _get_record(self, object_name: str | None) -> dict[str, NDArray]:
+        return self._container.get(self._file_key, "record", object_name)
+
+
+def find_container(file_name: str | Path) -> Path | None:
+    """Find the container of the compiled dataset in the parent directories of the file."""
+    for parent in Path(file_name).absolute().parents:
+        path = parent / COMPILED_DATASET_NAME
+        if path.is_file():
+            return path
+    return None
+
+
+def write_compiled_dataset(
+    path: str | Path, objects: Mapping[tuple[str, str, str | None], Any]
+) -> None:
+    """Write the objects to the container.
+
+    Parameters
+    ----------
+    path : str | Path
+        Path to the container.
+    objects : Mapping[tuple[str, str, str | None], Any]
+        Objects by (file, kind, object name): arrays, tuples of arrays or mappings of the
+        columns.
+    """
+    path = Path(path)
+    table = {}
+    arrays = []
+    offset = 0
+
+    def add(array) -> dict[str, Any]:
+        nonlocal offset
+        array = ascontiguousarray(array)
+        spec = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        arrays.append(array)
+        offset += _aligned(array.nbytes)
+        return spec
+
+    for (file_key, kind, object_name), obj in objects.items():
+        match obj:
+            case dict():
+                entry = {name: add(column) for name, column in obj.items()}
+            case tuple() | list():
+                entry = [add(array) for array in obj]
+            case _:
+                entry = [add(obj)]
+        table.setdefault(file_key, {})[_object_key(kind, object_name)] = entry
+
+    header = dumps(table, separators=(",", ":")).encode()
+    data_start = _data_start(len(header))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path_temporary = path.with_name(f"{path.name}.tmp")
+    with path_temporary.open("wb") as file:
+        file.write(_MAGIC)
+        file.write(len(header).to_bytes(8, "little"))
+        file.write(header.ljust(data_start - 16, b" "))
+        for array in arrays:
+            file.write(array.tobytes())
+            file.write(bytes(_aligned(array.nbytes) - array.nbytes))
+    replace(path_temporary, path)
+    logger.log(INFO, f"Write: {path!s}")
+
+
+def read_dataset_objects(
+    path_data: Path, source_type: str, files: Iterable[tuple[str, str]]
+) -> dict[tuple[str, str, str | None], Any]:
+    """Read all the objects of the data files of the dataset.
+
+    Parameters
+    ----------
+    path_data : Path
+        Path to the dataset.
+    source_type : str
+        Extension of the files without the dot.
+    files : Iterable[tuple[str, str]]
+        Files: path relative to the dataset without extension and kind of the objects
+        (`array`, `hist`, `graph` or `record`). `{}` in the path matches any string, e.g.
+        the name of the period.
+
+    Returns
+    -------
+    dict[tuple[str, str, str | None], Any]
+        Objects by (file, kind, object name). An object, which can not be read as `kind`,
+        is skipped.
+    """
+    from glob import glob
+
+    from .prefetch import get_object_names
+
+    objects = {}
+    for path, kind in files:
+        pattern = str(path_data / f"{path}.{source_type}")
+        for file_name in sorted(glob(pattern.replace("{}", "*"))):
+            reader = FileReader.open(file_name)
+            file_key = _file_key(path_data, Path(file_name))
+            read = getattr(reader, f"get_{kind}")
+            try:
+                for object_name in get_object_names(reader, Path(file_name)):
+                    try:
+                        obj = read(object_name)
+                    except Exception as e:
+                        logger.log(DEBUG, f"Compile: skip {kind} {object_name}: {e!s}")
+                        continue
+                    objects[file_key, kind, object_name] = _make_arrays(kind, obj)
+            finally:
+                reader._close()
+
+    return objects
+
+
+def compile_dataset(
+    path_data: str | Path,
+    path_output: str | Path,
+    *,
+    override_cfg_files: Mapping[str, str | Path] = {},
+) -> Path:
+    """Convert the dataset of any source type to the compiled dataset.
+
+    All the objects of the data files of the dataset (see `_DATASET_FILES` of
+    `model_dayabay`) are read and written to `{path_output}/dataset.compiled`, so the
+    compiled dataset may be used with any options of the model. The `parameters` directory is
+    copied, the manifest `dataset_info.yaml` is copied with the format set to `compiled`.
+
+    Parameters
+    ----------
+    path_data : str | Path
+        Path to the source dataset.
+    path_output : str | Path
+        Path to the compiled dataset.
+    override_cfg_files : Mapping[str, str | Path]
+        Additional data files of the dataset to convert, as for `override_cfg_files` of
+        `model_dayabay`. The paths are relative to the dataset, without extension.
+
+    Returns
+    -------
+    Path
+        Path to the container.
+    """
+    from dag_modelling.tools.schema import LoadYaml
+    from yaml import safe_dump
+
+    from ..model_dayabay import _DATASET_FILES
+    from .validate_dataset import validate_dataset_get_source_type
+
+    path_data = Path(path_data)
+    path_output = Path(path_output)
+    source_type = validate_dataset_get_source_type(
+        path_data, "dataset_info.yaml", version_min="1.0.0", version_max="2.0.0"
+    )
+    if source_type == "compiled":
+        raise RuntimeError(f"Dataset {path_data!s} is already compiled")
+
+    files = list(_DATASET_FILES.values())
+    files.extend((str(path), _DATASET_FILES[name][1]) for name, path in override_cfg_files.items())
+    objects = read_dataset_objects(path_data, source_type, files)
+
+    path_container = path_output / COMPILED_DATASET_NAME
+    write_compiled_dataset(path_container, objects)
+
+    copytree(path_data / "parameters", path_output / "parameters", dirs_exist_ok=True)
+    path_manifest = path_data / "dataset_info.yaml"
+    if path_manifest.is_file():
+        manifest = LoadYaml(path_manifest)
+        manifest["metadata"]["format"] = "compiled"
+        with (path_output / "dataset_info.yaml").open("w") as file:
+            safe_dump(manifest, file, sort_keys=False, allow_unicode=True)
+    if (path_readme := path_data / "README.md").is_file():
+        copy2(path_readme, path_output / "README.md")
+
+    return path_container
+
+
+def _make_arrays(kind: str, obj: Any) -> Any:
+    """Copy the object, returned by `FileReader`, to the arrays for the container.
+
+    The arrays are copied since the objects of some readers are valid only while the file is
+    opened.
+    """
+    from numpy import array
+
+    match kind, obj:
+        case "record", dict():
+            return {name: array(column) for name, column in obj.items()}
+        case "record", _:
+            return {name: array(obj[name]) for name in obj.dtype.names}
+        case ("hist" | "graph"), (x, y):
+            return (array(x), array(y))
+        case _:
+            return array(obj)
+
+
+def _object_key(kind: str, object_name: str | None) -> str:
+    # The dots are replaced as in `FileReader._get_object()`
+    return f"{kind}:{'' if object_name is None else object_name.replace('.', '_')}"
+
+
+def _file_key(path_data: Path, path: Path) -> str:
+    return path.absolute().relative_to(path_data.absolute()).with_suffix("").as_posix()
+
+
+def _data_start(header_size: int) -> int:
+    return _aligned(16 + header_size)
+
+
+def _aligned(size: int) -> int:
+    return -(-size // _ALIGNMENT) * _ALIGNMENT
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import TYPE_CHECKING
+
+from dag_modelling.tools.logger import INFO, logger
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    from dag_modelling.core.node import Node
+    from dag_modelling.core.output import Output
+    from dag_modelling.parameters import Parameter
+    from nested_mapping import NestedMapping
+
+# Nodes, which are linear in each of the inputs and do not mix them
+_NODES_LINEAR = {
+    "Sum",
+    "ArraySum",
+    "Concatenation",
+    "View",
+    "Proxy",
+    "Cast",
+    "BandedMatrix",
+    "IntegratorCore",
+    "NormalizeCorrelatedVarsTwoWays",
+}
+
+# Nodes, which are linear in each of the inputs, but mix them (multilinear)
+_NODES_MULTILINEAR = {
+    "Product",
+    "VectorMatrixProduct",
+    "BandedVectorMatrixProduct",
+    "MatrixProductAB",
+}
+
+# Nodes, which are linear in the positional inputs and non-linear in the keyword inputs
+_NODES_LINEAR_POSITIONAL = {"AxisDistortionPointwiseProduct", "RebinSegmentSum"}
+
+
+class CovarianceUpdate:
+    """Incremental update of the covariance matrices of the systematic groups.
+
+    The Jacobian of the model output with respect to the parameters of a group depends on
+    the values of the other parameters only if their contributions are mixed by a
+    non-additive node. E.g. the Jacobian for the background rates does not depend on the
+    oscillation parameters since the background is added to the IBD spectrum.
+
+    The values of all the parameters are saved on each update. On the next update the changed
+    parameters are found, and only the groups, which Jacobians may be affected by the
+    change, are recomputed. The analysis is done on the graph level: the Jacobian of a group
+    is considered affected, if there is a node, which mixes the group parameters with the
+    changed parameters in a non-linear way (see `_NODES_LINEAR`, `_NODES_MULTILINEAR` and
+    `_NODES_LINEAR_POSITIONAL`). Nodes of other types are treated as non-linear.
+    """
+
+    __slots__ = (
+        "_output",
+        "_jacobians",
+        "_covariance_groups",
+        "_covariance_sum",
+        "_group_sources",
+        "_parameters",
+        "_values",
+    )
+
+    _output: Output
+    _jacobians: dict[str, list[Node]]
+    _covariance_groups: dict[str, Node]
+    _covariance_sum: Node
+    _group_sources: dict[str, set[Node]]
+    _parameters: dict[Parameter, set[Node]]
+    _values: dict[Parameter, float] | None
+
+    def __init__(
+        self,
+        storage: NestedMapping,
+        groups: Mapping[str, Iterable[Parameter]],
+        *,
+        output: Output,
+        parameters: Iterable[Parameter],
+        store_to: str = "covariance",
+    ):
+        """Initialize the tracker.
+
+        Parameters
+        ----------
+        storage : NestedMapping
+            Model storage with the nodes of `CovarianceMatrixGroup` under `nodes.{store_to}`.
+        groups : Mapping[str, Iterable[Parameter]]
+            Parameters of each covariance group.
+        output : Output
+            Model output, the Jacobians are computed for.
+        parameters : Iterable[Parameter]
+            All the parameters to track.
+        store_to : str
+            Location of the `CovarianceMatrixGroup` nodes.
+        """
+        self._output = output
+
+        nodes = storage.get_dict(f"nodes.{store_to}")
+        self._jacobians = {}
+        self._covariance_groups = {}
+        for group in groups:
+            jacobians = nodes.get_any(("jacobians", group))
+            self._jacobians[group] = (
+                list(jacobians.walkvalues()) if hasattr(jacobians, "walkvalues") else [jacobians]
+            )
+            self._covariance_groups[group] = nodes.get_value(("covmat_syst", group))
+        self._covariance_sum = nodes.get_value("covmat_syst.sum")
+
+        self._group_sources = {
+            group: set().union(*(_find_sources(parameter) for parameter in parameters_group))
+            for group, parameters_group in groups.items()
+        }
+        self._parameters = {parameter: _find_sources(parameter) for parameter in parameters}
+        self._values = None
+
+    def dirty_groups(self) -> list[str]:
+        """Return the groups, which Jacobians are affected by the changes of the parameters
+        since the last update."""
+        if self._values is None:
+            return list(self._jacobians)
+
+        changed = set()
+        for parameter, value in self._values.items():
+            if parameter.value != value:
+                changed.update(self._parameters[parameter])
+        if not changed:
+            return []
+
+        depends_changed = _make_dependency_check(changed)
+        return [
+            group
+            for group, sources in self._group_sources.items()
+            if _is_coupled(self._output.node, _make_dependency_check(sources), depends_changed)
+        ]
+
+    def update(self, *, force: bool = False) -> list[str]:
+        """Recompute the Jacobians of the affected groups and the covariance matrices.
+
+        Parameters
+        ----------
+        force : bool
+            Recompute all the groups.
+
+        Returns
+        -------
+        list[str]
+            Names of the recomputed groups.
+        """
+        groups = list(self._jacobians) if force else self.dirty_groups()
+        logger.log(INFO, f"Update covariance matrices for: {', '.join(groups) or 'none'}")
+
+        for group in groups:
+            for jacobian in self._jacobians[group]:
+                jacobian.compute()  # pyright: ignore [reportAttributeAccessIssue]
+            self._covariance_groups[group].touch()
+
+        if groups:
+            self._covariance_sum.touch()
+
+        self._values = {parameter: parameter.value for parameter in self._parameters}
+
+        return groups
+
+
+def _find_sources(parameter: Parameter) -> set[Node]:
+    """Find the nodes without inputs, which hold the value of the parameter."""
+    ret = set()
+    stack = [parameter.output.node]
+    while stack:
+        node = stack.pop()
+        parents = [input.parent_node for input in node.inputs.iter_all() if input.connected()]
+        if parents:
+            stack.extend(parents)
+        else:
+            ret.add(node)
+    return ret
+
+
+def _make_dependency_check(sources: set[Node]) -> Callable[[Node], bool]:
+    cache: dict[Node, bool] = {}
+
+    def depends(node: Node) -> bool:
+        try:
+            return cache[node]
+        except KeyError:
+            pass
+
+        cache[node] = ret = node in sources or any(
+            depends(input.parent_node) for input in node.inputs.iter_all() if input.connected()
+        )
+        return ret
+
+    return depends
+
+
+def _is_coupled(
+    node: Node, depends_group: Callable[[Node], bool], depends_changed: Callable[[Node], bool]
+) -> bool:
+    """Check if the derivative of the node output with respect to the group parameters
+    depends on the changed parameters."""
+    cache: dict[Node, bool] = {}
+
+    def coupled(node: Node) -> bool:
+        try:
+            return cache[node]
+        except KeyError:
+            pass
+
+        cache[node] = False
+        if not depends_group(node) or not depends_changed(node):
+            return False
+
+        parents = [input.parent_node for input in node.inputs.iter_all() if input.connected()]
+        if not parents:
+            return False
+        if any(coupled(parent) for parent in parents):
+            cache[node] = True
+            return True
+
+        match type(node).__name__:
+            case name if name in _NODES_LINEAR:
+                ret = False
+            case name if name in _NODES_MULTILINEAR:
+                ret = _is_mixed(parents, depends_group, depends_changed)
+            case name if name in _NODES_LINEAR_POSITIONAL:
+                ret = _is_mixed(parents, depends_group, depends_changed) or any(
+                    depends_group(input.parent_node) and depends_changed(input.parent_node)
+                    for input in node.inputs.iter_nonpos()
+                    if input.connected()
+                )
+            case _:
+                ret = True
+
+        cache[node] = ret
+        return ret
+
+    return coupled(node)
+
+
+def _is_mixed(
+    parents: list[Node],
+    depends_group: Callable[[Node], bool],
+    depends_changed: Callable[[Node], bool],
+) -> bool:
+    """Check if the group parameters and the changed parameters affect different inputs."""
+    return any(
+        depends_group(parent_group) and depends_changed(parent_changed)
+        for i, parent_group in enumerate(parents)
+        for j, parent_changed in enumerate(parents)
+        if i != j
+    )
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from dag_modelling.core import NodeStorage
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from typing import Any
+
+    from nested_mapping.nested_mapping import KeyLike
+
+
+class DeferredNodeStorage(NodeStorage):
+    """Storage, which builds the missing items on first access.
+
+    When an item is not found by `[]`, `get_value()` or `()`, the absolute key of the item is
+    passed to the `build_missing` function. If the function returns True, the items are
+    considered to be built and the access is repeated. Otherwise `KeyError` is raised as
+    usual. The `in` operator and `get()` do not build the items.
+
+    The nested storages share the `build_missing` function of the root storage.
+    """
+
+    __slots__ = ("_build_missing",)
+    _build_missing: Callable[[tuple[str, ...]], bool] | None
+
+    def __init__(
+        self,
+        *args,
+        build_missing: Callable[[tuple[str, ...]], bool] | None = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        parent = kwargs.get("parent")
+        self._build_missing = (
+            parent._build_missing if isinstance(parent, DeferredNodeStorage) else build_missing
+        )
+
+    @property
+    def build_missing(self) -> Callable[[tuple[str, ...]], bool] | None:
+        """Function to build the missing items by their absolute key."""
+        return self._build_missing
+
+    @build_missing.setter
+    def build_missing(self, build_missing: Callable[[tuple[str, ...]], bool] | None):
+        self._build_missing = build_missing
+
+    def _absolute_key(self, key: KeyLike) -> tuple[str, ...]:
+        keys = []
+        storage = self
+        while storage._parent is not None:
+            keys.append(storage.parent_key)
+            storage = storage._parent
+        return (*reversed(keys), *self.iterkey(key))
+
+    def _try_build(self, key: KeyLike) -> bool:
+        if self._build_missing is None:
+            return False
+        return self._build_missing(self._absolute_key(key))
+
+    def get_any(self, key: KeyLike, *, unwrap: bool = False) -> Any:
+        try:
+            return super().get_any(key, unwrap=unwrap)
+        except KeyError:
+            if not self._try_build(key):
+                raise
+        return super().get_any(key, unwrap=unwrap)
+
+    __getitem__ = get_any
+
+    def get_value(self, key: KeyLike) -> Any:
+        try:
+            return super().get_value(key)
+        except KeyError:
+            if not self._try_build(key):
+                raise
+        return super().get_value(key)
+
+    def get_dict(self, key: KeyLike, *, unwrap: bool = False) -> Any:
+        try:
+            return super().get_dict(key, unwrap=unwrap)
+        except KeyError:
+            if not self._try_build(key):
+                raise
+        return super().get_dict(key, unwrap=unwrap)
+
+    __call__ = get_dict
@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
+
+from numpy import add, concatenate, cumsum, multiply, zeros
+
+from ..lib import BandedVectorMatrixProduct
+from .covariance_update import _find_sources, _make_dependency_check
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from dag_modelling.core.node import Node
+    from dag_modelling.core.output import Output
+    from dag_modelling.parameters import Parameter
+    from numpy.typing import NDArray
+
+# Nodes, for which the derivatives are propagated analytically
+_NODES_FORWARD = {
+    "Sum",
+    "Product",
+    "VectorMatrixProduct",
+    "BandedVectorMatrixProduct",
+    "AxisDistortionPointwiseProduct",
+    "RebinSegmentSum",
+    "Concatenation",
+    "Cast",
+    "IntegratorCore",
+}
+
+# Finite differences scheme: (step, coefficient) in the units of the step size
+_FINITE_DIFFERENCES = ((0.5, 4.0 / 3.0), (-0.5, -4.0 / 3.0), (1.0, -1.0 / 6.0), (-1.0, 1.0 / 6.0))
+
+
+class ForwardJacobian:
+    """Jacobian of the model output with respect to the parameters, computed in forward mode.
+
+    The graph between the parameters and the output is split into two parts:
+        - the linear part (near the output), which consists of the nodes from
+          `_NODES_FORWARD`: Sum, Product, VectorMatrixProduct (including rebinning),
+          BandedVectorMatrixProduct, AxisDistortionPointwiseProduct (if the curve does not
+          depend on the parameters), RebinSegmentSum, Concatenation, Cast and IntegratorCore;
+        - the boundary outputs: the outputs of all the other nodes, which are inputs of
+          the linear part.
+
+    For each parameter the derivatives of the affected boundary outputs are computed via
+    finite differences with the same scheme as in `Jacobian`. Only the nodes upstream of the
+    boundary are evaluated. The derivatives are then propagated to the output analytically
+    through the linear part. Therefore, the computation costs a single pass over the linear
+    part for each parameter instead of four evaluations of the whole chain.
+
+    The split is done on the first call. Then it is reused, so the graph structure should
+    not be changed after that.
+    """
+
+    __slots__ = (
+        "_output",
+        "_parameters",
+        "_scale",
+        "_nodes",
+        "_parents",
+        "_boundaries",
+        "_integration_offsets",
+    )
+
+    _output: Output
+    _parameters: list[Parameter]
+    _scale: float
+    _nodes: list[list[Node]] | None
+    _parents: dict[Node, list[Output]]
+    _boundaries: list[list[Output]]
+    _integration_offsets: dict[Node, tuple[NDArray, NDArray | None]]
+
+    def __init__(self, output: Output, parameters: Sequence[Parameter], *, scale: float = 0.1):
+        """Initialize the Jacobian.
+
+        Parameters
+        ----------
+        output : Output
+            Model output. Should be 1d.
+        parameters : Sequence[Parameter]
+            Parameters (GaussianParameter or NormalizedGaussianParameter).
+        scale : float
+            Step of the finite differences in the units of parameter uncertainty.
+        """
+        self._output = output
+        self._parameters = list(parameters)
+        self._scale = scale
+        self._nodes = None
+        self._parents = {}
+        self._boundaries = []
+        self._integration_offsets = {}
+
+    def make_function(self, jacobian: Node) -> Callable[[], None]:
+        """Make a function to replace the function of the `Jacobian` node."""
+
+        def function():
+            (outdata,) = jacobian.outputs.iter_data_unsafe()
+            self.compute(out=outdata)
+            jacobian.fd.frozen = True
+
+        return function
+
+    def compute(self, *, out: NDArray | None = None) -> NDArray:
+        """Compute the Jacobian at the current values of the parameters.
+
+        Returns
+        -------
+        NDArray
+            Matrix [output size × number of parameters].
+        """
+        if self._nodes is None:
+            self._split()
+        assert self._nodes is not None
+
+        if out is None:
+            out = zeros((self._output.dd.size, len(self._parameters)), dtype="d")
+        else:
+            out[:] = 0.0
+
+        inputs_data = self._read_inputs_data()
+
+        for i, (parameter, boundaries, nodes) in enumerate(
+            zip(self._parameters, self._boundaries, self._nodes)
+        ):
+            if not boundaries:
+                continue
+
+            tangents: dict[Output, NDArray] = {
+                boundary: zeros(boundary.dd.shape, dtype="d") for boundary in boundaries
+            }
+            step = parameter.sigma * self._scale
+            value = parameter.value
+            try:
+                for shift, coefficient in _FINITE_DIFFERENCES:
+                    parameter.value = value + shift * step
+                    for boundary in boundaries:
+                        tangents[boundary] += (coefficient / step) * boundary.data
+            finally:
+                parameter.value = value
+
+            for node in nodes:
+                self._propagate(node, tangents, inputs_data)
+
+            try:
+                out[:, i] = tangents[self._output].ravel()
+            except KeyError:
+                pass
+
+        return out
+
+    def _split(self) -> None:
+        """Find the linear part of the graph, the boundary outputs and their dependence on
+        the parameters."""
+        parameters_sources = [_find_sources(parameter) for parameter in self._parameters]
+        depends = _make_dependency_check(set().union(*parameters_sources))
+
+        nodes: list[Node] = []
+        boundaries: list[Output] = []
+        visited: set[Node | Output] = set()
+
+        def visit(output: Output) -> None:
+            node = output.node
+            if node in visited or output in visited:
+                return
+
+            if not self._is_forward_node(node, depends):
+                visited.add(output)
+                boundaries.append(output)
+                return
+
+            visited.add(node)
+
+            for input in node.inputs.iter_all():
+                if input.connected() and depends(input.parent_node):
+                    visit(input.parent_output)
+            nodes.append(node)
+
+        visit(self._output)
+
+        self._parents = {node: [input.parent_output for input in node.inputs] for node in nodes}
+        parents_all = {
+            node: [input.parent_output for input in node.inputs.iter_all() if input.connected()]
+            for node in nodes
+        }
+
+        # For each parameter find the affected boundary outputs and the nodes of the linear
+        # part in the topological order
+        self._nodes = []
+        for sources in parameters_sources:
+            depends_parameter = _make_dependency_check(sources)
+            boundaries_parameter = [
+                output for output in boundaries if depends_parameter(output.node)
+            ]
+            self._boundaries.append(boundaries_parameter)
+
+            affected = set(boundaries_parameter)
+            nodes_parameter = []
+            for node in nodes:
+                if any(parent in affected for parent in parents_all[node]):
+                    nodes_parameter.append(node)
+                    affected.update(node.outputs)
+            self._nodes.append(nodes_parameter)
+
+    def _is_forward_node(self, node: Node, depends: Callable[[Node], bool]) -> bool:
+        if type(node).__name__ not in _NODES_FORWARD:
+            return False
+
+        match type(node).__name__:
+            case "Sum" | "Product" | "Concatenation":
+                return len(node.outputs) == 1
+            case "Cast":
+                return True
+            case "VectorMatrixProduct":
+                return node._matrix_column  # pyright: ignore [reportAttributeAccessIssue]
+            case "BandedVectorMatrixProduct":
+                return True
+            case "AxisDistortionPointwiseProduct" | "RebinSegmentSum":
+                # The product is not linear in the distortion curve
+                return not any(
+                    input.connected() and depends(input.parent_node)
+                    for input in node.inputs.iter_nonpos()
+                )
+            case "IntegratorCore":
+                # Integration orders and weights should not depend on the parameters
+                for input in node.inputs.iter_nonpos():
+                    if input.connected() and depends(input.parent_node):
+                        return False
+                self._integration_offsets[node] = _get_integration_offsets(node)
+                return True
+
+        return False
+
+    def _read_inputs_data(self) -> dict[Output, NDArray]:
+        """Read the data of the inputs of the linear part at the current point."""
+        ret = {}
+        for node in self._parents:
+            for input in node.inputs.iter_all():
+                if input.connected():
+                    ret[input.parent_output] = input.data.copy()
+        return ret
+
+    def _propagate(
+        self, node: Node, tangents: dict[Output, NDArray], inputs_data: dict[Output, NDArray]
+    ) -> None:
+        """Compute the derivatives of the node outputs from the derivatives of the inputs."""
+        parents = self._parents[node]
+        match type(node).__name__:
+            case "Sum":
+                (output,) = node.outputs
+                derivatives = [tangents[parent] for parent in parents if parent in tangents]
+                if not derivatives:
+                    return
+                tangent = zeros(output.dd.shape, dtype="d")
+                for derivative in derivatives:
+                    tangent += derivative
+                tangents[output] = tangent
+            case "Product":
+                (output,) = node.outputs
+                if not any(parent in tangents for parent in parents):
+                    return
+                tangent = zeros(output.dd.shape, dtype="d")
+                for i, parent in enumerate(parents):
+                    try:
+                        term = tangents[parent]
+                    except KeyError:
+                        continue
+                    for j, other in enumerate(parents):
+                        if j != i:
+                            term = term * inputs_data[other]
+                    tangent += term
+                tangents[output] = tangent
+            case "Concatenation":
+                (output,) = node.outputs
+                if not any(parent in tangents for parent in parents):
+                    return
+                tangents[output] = concatenate(
+                    [
+                        (
+                            tangents[parent].ravel()
+                            if parent in tangents
+                            else zeros(parent.dd.size, dtype="d")
+                        )
+                        for parent in parents
+                    ]
+                ).reshape(output.dd.shape)
+            case "VectorMatrixProduct" | "BandedVectorMatrixProduct":
+                if isinstance(node, BandedVectorMatrixProduct):
+                    # The band is given as a flat array, the derivatives are propagated with
+                    # the dense matrices
+                    parent_matrix = node.inputs["band"].parent_output
+                    banded_matrix = node.banded_matrix
+                    matrix = banded_matrix.expand(inputs_data[parent_matrix])
+                    tangent_matrix = tangents.get(parent_matrix)
+                    if tangent_matrix is not None:
+                        tangent_matrix = banded_matrix.expand(tangent_matrix)
+                else:
+                    parent_matrix = node.inputs["matrix"].parent_output
+                    matrix = inputs_data[parent_matrix]
+                    tangent_matrix = tangents.get(parent_matrix)
+                for parent, output in zip(parents, node.outputs):
+                    tangent_vector = tangents.get(parent)
+                    if tangent_vector is None and tangent_matrix is None:
+                        continue
+                    tangent = zeros(output.dd.shape, dtype="d")
+                    if tangent_vector is not None:
+                        tangent += _matmul_column(matrix, tangent_vector)
+                    if tangent_matrix is not None:
+                        tangent += _matmul_column(tangent_matrix, inputs_data[parent])
+                    tangents[output] = tangent
+            case "Cast":
+                # The derivatives are propagated in double precision
+                for parent, output in zip(parents, node.outputs):
+                    try:
+                        tangents[output] = tangents[parent]
+                    except KeyError:
+                        continue
+            case "AxisDistortionPointwiseProduct" | "RebinSegmentSum":
+                matrix = node.dense_matrix()  # pyright: ignore [reportAttributeAccessIssue]
+                for parent, output in zip(parents, node.outputs):
+                    try:
+                        tangent = tangents[parent]
+                    except KeyError:
+                        continue
+                    tangents[output] = matrix @ tangent
+            case "IntegratorCore":
+                weights = inputs_data[node.inputs["weights"].parent_output]
+                offsets_x, offsets_y = self._integration_offsets[node]
+                for parent, output in zip(parents, node.outputs):
+                    try:
+                        tangent = tangents[parent]
+                    except KeyError:
+                        continue
+                    tangent = multiply(tangent, weights)
+                    if offsets_y is not None:
+                        tangent = add.reduceat(tangent, offsets_y, axis=1)
+                    tangent = add.reduceat(tangent, offsets_x, axis=0)
+                    tangents[output] = tangent.reshape(output.dd.shape)
+
+
+def _matmul_column(matrix: NDArray, column: NDArray) -> NDArray:
+    if matrix.ndim == 1:
+        return matrix * column
+    return matrix @ column
+
+
+def _get_integration_offsets(node: Node) -> tuple[NDArray, NDArray | None]:
+    orders_x = node.inputs["orders_x"].data
+    offsets_x = concatenate(([0], cumsum(orders_x)[:-1]))
+    input_orders_y = node.inputs.get("orders_y", None)
+    if input_orders_y is None:
+        return offsets_x, None
+    return offsets_x, concatenate(([0], cumsum(input_orders_y.data)[:-1]))
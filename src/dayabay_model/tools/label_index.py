@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+from copy import deepcopy
+from hashlib import sha256
+from importlib.metadata import PackageNotFoundError, version
+from os import replace
+from pathlib import Path
+from pickle import HIGHEST_PROTOCOL, dump, load
+from typing import TYPE_CHECKING
+
+from dag_modelling.tools.logger import INFO, logger
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+    from typing import Any
+
+    from dag_modelling.core import NodeStorage
+
+# Increment, when the layout of the index file or the resolution of the labels is changed
+_LABEL_INDEX_FORMAT_VERSION = 2
+
+# Fields of `Labels`, formatted with the index of the item
+_FORMATTED_FIELDS = (
+    "text",
+    "graph",
+    "latex",
+    "axis",
+    "xaxis",
+    "yaxis",
+    "plot_title",
+    "root_title",
+    "rootaxis",
+    "unit",
+    "latex_unit",
+    "xunit",
+    "yunit",
+)
+
+Key = tuple[str, ...]
+
+
+class LabelIndex:
+    """Labels of the nodes and outputs of a storage, resolved and formatted in advance.
+
+    `NodeStorage.read_labels()` looks up the labels of each item in the nested configuration:
+    `{key}.node`, `{key}` and then `{parent}.group` for each parent of the key. Each look up
+    goes through `NestedMapping`, and the labels of the groups are formatted with the index of
+    the item. For the whole model this takes a significant fraction of the build time.
+
+    The index contains, for each node and output, only the fields of the labels it should
+    receive, already formatted. The index is compiled from the configuration with the same
+    rules as `read_labels()` and may be saved to a file. The file is identified by the hash of
+    the configuration file, the keys of the storage and the version of `dag-modelling`, so it
+    is reused only for the same configuration and the same set of nodes and outputs. The index
+    is then applied within a single pass over the storage without any look ups.
+    """
+
+    __slots__ = ("_source", "_items", "_processed_keys")
+
+    _source: dict[str, Any]
+    _items: dict[str, dict[Key, dict[str, Any]]]
+    _processed_keys: set[Key]
+
+    def __init__(
+        self,
+        source: dict[str, Any],
+        items: dict[str, dict[Key, dict[str, Any]]],
+        processed_keys: set[Key],
+    ):
+        self._source = source
+        self._items = items
+        self._processed_keys = processed_keys
+
+    @property
+    def source(self) -> dict[str, Any]:
+        """The configuration of the labels, the index was compiled from."""
+        return self._source
+
+    @property
+    def processed_keys(self) -> set[Key]:
+        """Keys of the configuration, which were used for the labels of the items."""
+        return self._processed_keys
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self._items.values())
+
+    @classmethod
+    def compile(cls, source: dict[str, Any], storage: NodeStorage) -> LabelIndex:
+        """Resolve and format the labels for the nodes and outputs of the `storage`.
+
+        Parameters
+        ----------
+        source : dict[str, Any]
+            Nested configuration of the labels.
+        storage : NodeStorage
+            Storage with `nodes` and `outputs`.
+        """
+        from dag_modelling.core.node import Node
+        from dag_modelling.core.output import Output
+
+        processed_keys = set()
+        items = {}
+        for name in ("nodes", "outputs"):
+            items[name] = items_group = {}
+            for key, object in storage(name).walkitems():
+                if not isinstance(object, (Node, Output)):
+                    continue
+                labels, subkey = _resolve_labels(source, key, processed_keys)
+                if labels is not None:
+                    items_group[key] = _format_labels(labels, subkey)
+
+        return cls(source, items, processed_keys)
+
+    @classmethod
+    def load(
+        cls, filename: str | Path, storage: NodeStorage, *, path: str | Path | None = None
+    ) -> LabelIndex:
+        """Read the index from the directory `path` or compile it and save to the `path`.
+
+        Parameters
+        ----------
+        filename : str | Path
+            YAML file with the labels.
+        storage : NodeStorage
+            Storage with `nodes` and `outputs`.
+        path : str | Path | None
+            Directory to store the index files. If None, the index is always compiled.
+        """
+        from dag_modelling.tools.schema import LoadYaml
+
+        if path is None:
+            return cls.compile(LoadYaml(filename), storage)
+
+        key = _make_key(Path(filename).read_bytes(), storage)
+        path_index = Path(path) / f"label_index_{key[:32]}.pickle"
+        try:
+            with path_index.open("rb") as file:
+                content = load(file)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Unable to read label index {path_index!s}: {e!s}")
+        else:
+            if content.get("format") == _LABEL_INDEX_FORMAT_VERSION and content.get("key") == key:
+                logger.log(INFO, f"Use label index {path_index!s}")
+                return cls(content["source"], content["items"], content["processed_keys"])
+
+        index = cls.compile(LoadYaml(filename), storage)
+        index.save(path_index, key)
+
+        return index
+
+    def save(self, path: Path, key: str) -> None:
+        """Save the index to the file `path`, identified by the `key`."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        content = {
+            "format": _LABEL_INDEX_FORMAT_VERSION,
+            "key": key,
+            "source": self._source,
+            "items": self._items,
+            "processed_keys": self._processed_keys,
+        }
+        # Write to a temporary file first in order to avoid partially written files, when
+        # several processes are building the model simultaneously
+        path_temporary = path.with_name(f"{path.name}.{id(self):x}.tmp")
+        with path_temporary.open("wb") as file:
+            dump(content, file, protocol=HIGHEST_PROTOCOL)
+        replace(path_temporary, path)
+        logger.log(INFO, f"Write label index {path!s}")
+
+    def apply(self, storage: NodeStorage) -> None:
+        """Update the labels of the nodes and outputs of the `storage`.
+
+        The result is the same as of `NodeStorage.read_labels()` for the nodes and then for
+        the outputs.
+        """
+        from dag_modelling.core.node import Node
+        from dag_modelling.core.output import Output
+
+        for key, node in storage("nodes").walkitems():
+            if isinstance(node, Node) and (labels := self._items["nodes"].get(key)) is not None:
+                node.labels.update(labels)
+
+        for key, output in storage("outputs").walkitems():
+            if not isinstance(output, Output):
+                continue
+            if (labels := self._items["outputs"].get(key)) is None:
+                continue
+            if output.labels is output.node.labels and len(output.node.outputs) != 1:
+                output.labels = output.node.labels.copy()
+            output.labels.update(labels)
+
+
+def _get_dict(source: dict[str, Any], key: Key | list[str]) -> dict[str, Any] | None:
+    """Return the nested dictionary for the `key` or None, see `NestedMapping.get_dict()`."""
+    for subkey in key:
+        try:
+            source = source[subkey]
+        except (KeyError, TypeError):
+            return None
+    return source if isinstance(source, dict) else None
+
+
+def _resolve_labels(
+    source: dict[str, Any], key: Key, processed_keys: set[Key]
+) -> tuple[dict[str, Any] | None, list[str] | None]:
+    """Find the labels for the `key` by the rules of `NodeStorage.read_labels()`."""
+    nkey = key + ("node",)
+    if (labels := _get_dict(source, nkey)) is not None:
+        processed_keys.add(nkey)
+        return labels, None
+
+    if (labels := _get_dict(source, key)) is not None:
+        processed_keys.add(key)
+        return labels, None
+
+    keyleft = list(key[:-1])
+    keyright = [key[-1]]
+    while keyleft:
+        groupkey = keyleft + ["group"]
+        if (labels := _get_dict(source, groupkey)) is not None:
+            processed_keys.add(tuple(groupkey))
+            return labels, keyright
+        keyright.insert(0, keyleft.pop())
+
+    return None, None
+
+
+def _format_labels(labels: Mapping[str, Any], subkey: list[str] | None) -> dict[str, Any]:
+    """Return the fields of the labels, formatted for the item with index `subkey`.
+
+    `Labels` is used to format the fields, so the result is the same as of `Labels.update()`
+    followed by `Labels.format()`.
+    """
+    from dag_modelling.core.labels import Labels
+
+    fields = Labels()
+    labels = deepcopy(labels)
+    fields.update(labels)
+    if subkey:
+        skey = ".".join(subkey)
+        fields.format(index=subkey, key=skey, space_key=f" {skey}", key_space=f"{skey} ")
+
+    if tuple(labels) == ("group",):
+        labels = labels["group"]
+    return {
+        name: getattr(fields, f"_{name}") if name in _FORMATTED_FIELDS else value
+        for name, value in labels.items()
+    }
+
+
+def _make_key(content: bytes, storage: NodeStorage) -> str:
+    hash = sha256()
+    hash.update(f"format={_LABEL_INDEX_FORMAT_VERSION}".encode())
+    try:
+        package_version = version("dag-modelling")
+    except PackageNotFoundError:
+        package_version = None
+    hash.update(f"dag-modelling={package_version}".encode())
+    hash.update(content)
+    for name in ("nodes", "outputs"):
+        hash.update(f"{name}:".encode())
+        for key in sorted(storage(name).walkjoinedkeys()):
+            hash.update(f"{key}\n".encode())
+
+    return hash.hexdigest()
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping, Sequence
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from pandas import DataFrame
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from dag_modelling.core.node import Node
+    from nested_mapping import NestedMapping
+
+_COLUMNS = ("calls", "time", "time_per_call", "time_fraction", "nbytes", "nodes")
+
+
+class NodeCounters:
+    """Counters of the evaluations of the nodes.
+
+    The function of each node is replaced by a wrapper, which counts the calls and
+    accumulates the wall time. The time of a node does not include the time of its parents,
+    even if they are evaluated from within the function of the node. The memory, allocated
+    for the outputs, is counted for each node as well.
+
+    The nodes are identified by their keys in the storage or by their names. The counters
+    may be aggregated by the prefix of the key or by the values of an index, e.g. detector or
+    period.
+    """
+
+    __slots__ = ("_nodes", "_functions", "_keys", "_calls", "_times", "_stack")
+
+    _nodes: Iterable[Node]
+    _functions: dict[Node, tuple[Callable, Callable]]
+    _keys: dict[Node, tuple[str, ...]]
+    _calls: dict[Node, int]
+    _times: dict[Node, float]
+    _stack: list[float]
+
+    def __init__(self, nodes: Iterable[Node], storage: NestedMapping | None = None):
+        """Initialize the counters.
+
+        Parameters
+        ----------
+        nodes : Iterable[Node]
+            Nodes to profile, e.g. the graph. Iterated on each `start()`.
+        storage : NestedMapping | None
+            Storage with the nodes to define their keys.
+        """
+        self._nodes = nodes
+        self._functions = {}
+        self._keys = {}
+        if storage is not None:
+            for key, node in storage.walkitems():
+                self._keys.setdefault(node, key)
+        self._calls = {}
+        self._times = {}
+        self._stack = []
+
+    @property
+    def active(self) -> bool:
+        return bool(self._functions)
+
+    def start(self, storage: NestedMapping | None = None) -> None:
+        """Install the wrappers to all the nodes, which are not profiled yet.
+
+        Parameters
+        ----------
+        storage : NestedMapping | None
+            Storage with the new nodes to define their keys.
+        """
+        if storage is not None:
+            for key, node in storage.walkitems():
+                self._keys.setdefault(node, key)
+
+        for node in self._nodes:
+            try:
+                _, wrapper = self._functions[node]
+            except KeyError:
+                pass
+            else:
+                if node.function is wrapper:
+                    continue
+            function = node.function
+            wrapper = self._make_wrapper(node, function)
+            self._functions[node] = function, wrapper
+            self._calls.setdefault(node, 0)
+            self._times.setdefault(node, 0.0)
+            node.function = wrapper
+
+    def stop(self) -> None:
+        """Restore the original functions of the nodes. The counters are kept."""
+        for node, (function, wrapper) in self._functions.items():
+            if node.function is wrapper:
+                node.function = function
+        self._functions = {}
+
+    def reset(self) -> None:
+        """Reset the counters."""
+        for node in self._calls:
+            self._calls[node] = 0
+            self._times[node] = 0.0
+
+    def _make_wrapper(self, node: Node, function: Callable) -> Callable:
+        stack = self._stack
+        calls = self._calls
+        times = self._times
+
+        def wrapper(*args, **kwargs):
+            stack.append(0.0)
+            time_start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - time_start
+                elapsed_parents = stack.pop()
+                calls[node] += 1
+                times[node] += elapsed - elapsed_parents
+                if stack:
+                    stack[-1] += elapsed
+
+        return wrapper
+
+    def make_table(
+        self,
+        group_by: str = "path",
+        *,
+        depth: int = 2,
+        index: Mapping[str, Sequence[str]] = {},
+    ) -> DataFrame:
+        """Make a table with the counters, sorted by the time.
+
+        Parameters
+        ----------
+        group_by : str
+            Aggregation of the counters:
+                - "node": a row for each node;
+                - "path": a row for each prefix of the key of length `depth`;
+                - a name of an index (from `index`), e.g. "detector": a row for each value
+                  of the index. Nodes without the index are combined into a row "-".
+        depth : int
+            Length of the key prefix for `group_by="path"`.
+        index : Mapping[str, Sequence[str]]
+            Values of the indices.
+
+        Returns
+        -------
+        DataFrame
+            Table with the columns: number of calls, total time, time per call, fraction of
+            the total time, bytes of the outputs and the number of nodes.
+        """
+        match group_by:
+            case "node":
+                group = self._key_joined
+            case "path":
+                group = lambda node: ".".join(self._key(node)[:depth])
+            case _:
+                try:
+                    values = set(index[group_by])
+                except KeyError as exc:
+                    raise ValueError(f"Unknown grouping: {group_by}") from exc
+
+                def group(node: Node) -> str:
+                    for part in self._key(node):
+                        if part in values:
+                            return part
+                    return "-"
+
+        rows: dict[str, dict[str, int | float]] = {}
+        for node, calls in self._calls.items():
+            name = group(node)
+            try:
+                row = rows[name]
+            except KeyError:
+                row = rows[name] = dict.fromkeys(_COLUMNS, 0)
+            row["calls"] += calls
+            row["time"] += self._times[node]
+            row["nbytes"] += _get_nbytes(node)
+            row["nodes"] += 1
+
+        time_total = sum(self._times.values()) or 1.0
+        for row in rows.values():
+            row["time_per_call"] = row["time"] / row["calls"] if row["calls"] else 0.0
+            row["time_fraction"] = row["time"] / time_total
+
+        df = DataFrame.from_dict(rows, orient="index", columns=_COLUMNS)
+        df = df.astype(
+            {
+                "calls": "i8",
+                "time": "f8",
+                "time_per_call": "f8",
+                "time_fraction": "f8",
+                "nbytes": "i8",
+                "nodes": "i8",
+            }
+        )
+        df.index.name = group_by
+        return df.sort_values("time", ascending=False)
+
+    def _key(self, node: Node) -> tuple[str, ...]:
+        try:
+            return self._keys[node]
+        except KeyError:
+            return tuple(node.name.split("."))
+
+    def _key_joined(self, node: Node) -> str:
+        return ".".join(self._key(node))
+
+
+def _get_nbytes(node: Node) -> int:
+    ret = 0
+    for output in node.outputs.iter_all():
+        if output.owns_buffer and (data := output._data) is not None:
+            ret += data.nbytes
+    return ret
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Sequence
+
+    from dag_modelling.core.node import Node
+    from dag_modelling.core.output import Output
+
+
+class ParallelBranches:
+    """Concurrent evaluation of the independent replicated branches of the graph.
+
+    The branches are defined by their final outputs (roots), e.g. the spectrum of each detector
+    during each period. The roots are grouped into stages, evaluated one after another: each
+    stage uses the roots of the previous stages, e.g. the integrals are used by the spectra of
+    several periods of a detector.
+
+    For each stage the nodes, needed for a single root only, are private to the branch of the
+    root. The other nodes, shared by several branches, are evaluated first sequentially. Then
+    the private nodes of the branches are evaluated concurrently in a thread pool: each thread
+    touches the roots of an equal share of the branches. The branches do not share any tainted
+    nodes, therefore each node is evaluated by a single thread. The numerical functions of
+    numpy and BLAS release the GIL, so the branches are computed in parallel.
+
+    The function of each node, consuming the roots of the last stage, is replaced by a
+    wrapper, which evaluates the stages before calling the function. The graph is evaluated
+    sequentially, when other outputs are requested.
+    """
+
+    __slots__ = ("_nthreads", "_executor", "_stages", "_functions", "_running")
+
+    _nthreads: int
+    _executor: ThreadPoolExecutor | None
+    _stages: list[tuple[tuple[Node, ...], tuple[Node, ...]]]
+    _functions: dict[Node, tuple[Callable, Callable]]
+    _running: bool
+
+    def __init__(self, nthreads: int):
+        """Initialize the evaluation.
+
+        Parameters
+        ----------
+        nthreads : int
+            Number of threads.
+        """
+        assert nthreads > 0
+        self._nthreads = nthreads
+        self._executor = None
+        self._stages = []
+        self._functions = {}
+        self._running = False
+
+    @property
+    def nthreads(self) -> int:
+        return self._nthreads
+
+    @property
+    def active(self) -> bool:
+        return bool(self._functions)
+
+    @property
+    def nbranches(self) -> tuple[int, ...]:
+        """Number of the branches of each stage."""
+        return tuple(len(roots) for roots, _ in self._stages)
+
+    def start(self, stages: Sequence[Iterable[Output]]) -> None:
+        """Find the branches and install the wrappers to the consumers of the last stage.
+
+        Should be called after the graph is closed. The functions of the nodes may be reset,
+        when the graph is reopened, therefore it should be called again after the graph is
+        closed again.
+
+        Parameters
+        ----------
+        stages : Sequence[Iterable[Output]]
+            Outputs of the roots of each stage in the order of evaluation. The roots of the
+            other stages, which are not used by the last stage, are ignored.
+        """
+        self.stop()
+
+        stages_roots = [_unique(output.node for output in outputs) for outputs in stages]
+        stages_roots = [roots for roots in stages_roots if roots]
+        if not stages_roots:
+            return
+
+        roots_last = stages_roots[-1]
+        used = set()
+        for root in roots_last:
+            used.update(_get_upstream(root))
+        self._stages = []
+        for roots in stages_roots:
+            roots = tuple(root for root in roots if root in used)
+            if len(roots) > 1:
+                self._stages.append(_make_stage(roots))
+
+        consumers = _unique(
+            input.node
+            for root in roots_last
+            for output in root.outputs
+            for input in output.child_inputs
+        )
+        for node in consumers:
+            function = node.function
+            wrapper = self._make_wrapper(function)
+            self._functions[node] = function, wrapper
+            node.function = wrapper
+
+    def stop(self) -> None:
+        """Restore the original functions of the nodes."""
+        for node, (function, wrapper) in self._functions.items():
+            if node.function is wrapper:
+                node.function = function
+        self._functions = {}
+
+    def shutdown(self) -> None:
+        """Restore the functions and stop the threads."""
+        self.stop()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def evaluate(self) -> None:
+        """Evaluate the tainted branches of all the stages."""
+        if self._running:
+            return
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._nthreads, thread_name_prefix="ParallelBranches"
+            )
+
+        self._running = True
+        try:
+            for roots, shared in self._stages:
+                roots = [root for root in roots if root.tainted]
+                if not roots:
+                    continue
+
+                for node in shared:
+                    node.touch()
+
+                # Each thread evaluates an equal share of the branches within a single task
+                nchunks = min(self._nthreads, len(roots))
+                if nchunks > 1:
+                    chunks = [roots[i::nchunks] for i in range(nchunks)]
+                    for _ in self._executor.map(_touch, chunks):
+                        pass
+                elif roots:
+                    _touch(roots)
+        finally:
+            self._running = False
+
+    def _make_wrapper(self, function: Callable) -> Callable:
+        evaluate = self.evaluate
+
+        def wrapper(*args, **kwargs):
+            evaluate()
+            return function(*args, **kwargs)
+
+        return wrapper
+
+
+def _touch(nodes: Sequence[Node]) -> None:
+    for node in nodes:
+        node.touch()
+
+
+def _unique(nodes: Iterable[Node]) -> tuple[Node, ...]:
+    return tuple(dict.fromkeys(nodes))
+
+
+def _get_upstream(root: Node) -> set[Node]:
+    """Return the root and all the nodes, it depends on."""
+    upstream = {root}
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        for input in node.inputs.iter_all():
+            parent = input.parent_node
+            if parent is not None and parent not in upstream:
+                upstream.add(parent)
+                stack.append(parent)
+    return upstream
+
+
+def _make_stage(roots: Sequence[Node]) -> tuple[tuple[Node, ...], tuple[Node, ...]]:
+    """Return the roots together with the shared nodes, the private nodes depend on.
+
+    A node is private to the branch, if it is used only by a single root of the stage.
+    Touching the shared nodes makes sure, the private nodes of the branch may be evaluated
+    without evaluating any node of the other branches.
+    """
+    upstreams = [_get_upstream(root) for root in roots]
+    counts = Counter(node for upstream in upstreams for node in upstream)
+
+    shared = {}
+    for upstream in upstreams:
+        for node in upstream:
+            if counts[node] != 1:
+                continue
+            for input in node.inputs.iter_all():
+                parent = input.parent_node
+                if parent is not None and counts[parent] != 1:
+                    shared[parent] = None
+
+    return tuple(roots), tuple(shared)
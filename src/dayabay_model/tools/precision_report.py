@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from nested_mapping import NestedMapping
+from numpy import abs as numpy_abs
+from numpy import divide, zeros_like
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from dag_modelling.core.output import Output
+    from pandas import DataFrame
+
+    from ..model_dayabay import model_dayabay
+
+
+def make_precision_report(
+    model: model_dayabay, reference: model_dayabay, names: Sequence[str]
+) -> DataFrame:
+    """Compare the outputs of the model with the outputs of the reference model.
+
+    See `model_dayabay.make_precision_report` for the description.
+    """
+    _copy_parameter_values(model, reference)
+
+    from pandas import DataFrame
+
+    rows = []
+    for name in names:
+        outputs = _get_outputs(model, name)
+        outputs_reference = _get_outputs(reference, name)
+        if outputs.keys() != outputs_reference.keys():
+            raise RuntimeError(f"Inconsistent outputs `{name}` of the model and the reference")
+
+        nbytes = nbytes_reference = 0
+        dtypes, dtypes_reference = set(), set()
+        max_value = max_abs_diff = max_rel_diff = 0.0
+        for key, output in outputs.items():
+            output_reference = outputs_reference[key]
+            data = output.data
+            data_reference = output_reference.data
+
+            nbytes += data.nbytes
+            nbytes_reference += data_reference.nbytes
+            dtypes.add(data.dtype.name)
+            dtypes_reference.add(data_reference.dtype.name)
+
+            if data.size == 0:
+                continue
+            abs_diff = numpy_abs(data - data_reference)
+            abs_reference = numpy_abs(data_reference)
+            rel_diff = divide(
+                abs_diff,
+                abs_reference,
+                out=zeros_like(abs_diff, dtype="d"),
+                where=abs_reference > 0,
+            )
+            max_value = max(max_value, float(abs_reference.max()))
+            max_abs_diff = max(max_abs_diff, float(abs_diff.max()))
+            max_rel_diff = max(max_rel_diff, float(rel_diff.max()))
+
+        rows.append(
+            {
+                "name": name,
+                "count": len(outputs),
+                "dtype": ", ".join(sorted(dtypes)),
+                "dtype_reference": ", ".join(sorted(dtypes_reference)),
+                "nbytes": nbytes,
+                "nbytes_reference": nbytes_reference,
+                "max_value": max_value,
+                "max_abs_diff": max_abs_diff,
+                "max_rel_diff": max_rel_diff,
+            }
+        )
+
+    return DataFrame(rows).set_index("name")
+
+
+def _copy_parameter_values(model: model_dayabay, reference: model_dayabay) -> None:
+    """Set the values of the parameters of the reference model to the values of the model."""
+    parameters_reference = reference.storage("parameters.all")
+    for key, parameter in model.storage("parameters.all").walkitems():
+        parameter_reference = parameters_reference[key]
+        if parameter_reference.value != parameter.value:
+            parameter_reference.value = parameter.value
+
+
+def _get_outputs(model: model_dayabay, name: str) -> dict[tuple[str, ...], Output]:
+    outputs = model.storage["outputs"][name]
+    if isinstance(outputs, NestedMapping):
+        return dict(outputs.walkitems())
+    return {(): outputs}
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from dag_modelling.bundles.file_reader import FileReader, FileReaderTSV
+from dag_modelling.tools.logger import DEBUG, INFO, logger
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from typing import Any
+
+
+def prefetch_files(items: Iterable[tuple[str | Path, str]], nthreads: int) -> int:
+    """Read all the objects of the files concurrently in a thread pool.
+
+    The function should be called within the `FileReader` context. Each file is opened via
+    `FileReader[file_name]`, so the readers are registered and used by the loaders later. All
+    the objects of the file are then read in the thread pool by `get_{kind}()`. The readers
+    keep the objects in memory (the build cache keeps them as well), so the loaders get them
+    without reading the files again.
+
+    The objects of a file are read sequentially by a single task, except for the TSV files,
+    where each object is a separate (compressed) file and is read by a separate task. The
+    decompression and reading release the GIL, so the files are read in parallel.
+
+    An object, which can not be read as `kind`, is skipped: the error is raised by the loader
+    if the object is actually needed.
+
+    Parameters
+    ----------
+    items : Iterable[tuple[str | Path, str]]
+        File names and kinds of their objects (`array`, `hist`, `graph` or `record`). A file
+        name may contain `{}`, which matches any string, e.g. the name of the period.
+    nthreads : int
+        Number of threads.
+
+    Returns
+    -------
+    int
+        Number of the objects read.
+    """
+    tasks = []
+    for file_pattern, kind in items:
+        file_pattern = str(file_pattern)
+        if "{}" in file_pattern:
+            file_names = sorted(glob(file_pattern.replace("{}", "*")))
+        else:
+            file_names = [file_pattern]
+
+        for file_name in file_names:
+            try:
+                reader = FileReader[file_name]
+            except (FileNotFoundError, ValueError):
+                continue
+
+            object_names = get_object_names(reader, Path(file_name))
+            # The readers of the build cache open the original reader on demand, therefore
+            # their objects are read by a single task
+            if isinstance(reader, FileReaderTSV):
+                tasks.extend((reader, kind, (object_name,)) for object_name in object_names)
+            else:
+                tasks.append((reader, kind, object_names))
+
+    with ThreadPoolExecutor(max_workers=nthreads) as executor:
+        nobjects = sum(executor.map(lambda task: _read_objects(*task), tasks))
+    logger.log(INFO, f"Prefetch {nobjects} objects in {nthreads} threads")
+
+    return nobjects
+
+
+def _read_objects(reader: Any, kind: str, object_names: Iterable[str]) -> int:
+    read = getattr(reader, f"get_{kind}")
+    nobjects = 0
+    for object_name in object_names:
+        try:
+            read(object_name)
+        except Exception as e:
+            logger.log(DEBUG, f"Prefetch: skip {kind} {object_name}: {e!s}")
+        else:
+            nobjects += 1
+    return nobjects
+
+
+def get_object_names(reader: Any, path: Path) -> tuple[str, ...]:
+    """Return the names of the objects of the file.
+
+    `FileReaderTSV.keys()` does not list the compressed files and the files, stored next to
+    the directory, so the names are derived from the file names, see
+    `FileReaderTSV._get_filenames()`. The cycles of the ROOT objects (`;1`) are removed.
+    """
+    if path.suffix != ".tsv":
+        return tuple(name.partition(";")[0] for name in reader.keys())
+
+    stem = path.stem
+    if path.is_dir():
+        file_names = [child.name for child in path.iterdir()]
+    else:
+        file_names = [child.name for child in path.parent.glob(f"{stem}_*")]
+
+    names = []
+    for file_name in sorted(file_names):
+        name = file_name.removesuffix(".bz2")
+        if not name.endswith(".tsv"):
+            continue
+        names.append(name.removesuffix(".tsv").removeprefix(f"{stem}_"))
+
+    return tuple(names)
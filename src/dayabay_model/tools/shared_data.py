@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from hashlib import sha256
+from os import getpid, replace
+from pathlib import Path
+from re import sub
+from typing import TYPE_CHECKING
+
+from dag_modelling.lib.common import Array
+from dag_modelling.parameters import Parameter
+from dag_modelling.tools.logger import INFO, logger
+from numpy import load, save
+
+from .build_cache import _make_key, _update_hash
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from dag_modelling.core.node import Node
+    from dag_modelling.core.output import Output
+    from nested_mapping import NestedMapping
+    from numpy.typing import NDArray
+
+# Outputs of the parameters, which values may be modified
+_PARAMETER_OUTPUTS = ("_common_output", "_value_output", "_central_output", "_sigma_output")
+
+
+class SharedData:
+    """Constant arrays of the model, shared between processes via memory-mapped files.
+
+    The data of the `Array` nodes (daily data, IAV matrix, antineutrino spectra, LSNL curves,
+    etc.) is not modified after the model is built. When several instances of the model are
+    built in different processes, e.g. by the ToyMC workers, each of them keeps its own copy of
+    the data. With `SharedData` the data is saved to the `.npy` files on the first build and
+    all the models map the files into memory in read-only mode instead. The memory pages are
+    then shared between the processes by the operating system. A directory on a memory-based
+    file system, e.g. `/dev/shm`, should be used to avoid disk access.
+
+    The files are stored in a subdirectory, identified by the same key as the build cache:
+    the dataset version, the model arguments and the versions of the packages. Each file is
+    named by the storage key of the node and the SHA-256 hash of the data, so a file is reused
+    only if its content is the same as the data of the model, e.g. it is not reused after the
+    data files are modified.
+
+    The buffers are replaced before the graph is closed, therefore the nodes, which use the
+    arrays, are allocated with the shared buffers. Parameters and small arrays are not shared.
+
+    When `path` is None the sharing is disabled and all the methods do nothing.
+    """
+
+    __slots__ = ("_path", "_min_nbytes")
+
+    _path: Path | None
+    _min_nbytes: int
+
+    def __init__(
+        self,
+        path: str | Path | None,
+        *,
+        path_data: Path | None = None,
+        meta_name: str = "dataset_info.yaml",
+        arguments: Mapping = {},
+        min_nbytes: int = 4096,
+    ):
+        """Initialize the shared data storage.
+
+        Parameters
+        ----------
+        path : str | Path | None
+            Directory to store the data files. Disable the sharing if None.
+        path_data : Path | None
+            Path to the dataset. The version of the dataset is read from the `meta_name` file.
+        meta_name : str
+            Name of the dataset manifest file.
+        arguments : Mapping
+            Arguments of the model, affecting the build.
+        min_nbytes : int
+            Minimal size of an array to be shared.
+        """
+        self._min_nbytes = min_nbytes
+
+        if path is None:
+            self._path = None
+            return
+
+        key = _make_key(path_data, meta_name, arguments)
+        self._path = Path(path) / f"shared_data_{key[:32]}"
+
+    @property
+    def enabled(self) -> bool:
+        return self._path is not None
+
+    @property
+    def path(self) -> Path | None:
+        return self._path
+
+    def share(self, nodes: Iterable[Node], storage: NestedMapping) -> int:
+        """Replace the data of the `Array` nodes by the memory-mapped shared arrays.
+
+        Should be called before the graph is closed.
+
+        Parameters
+        ----------
+        nodes : Iterable[Node]
+            Nodes of the graph.
+        storage : NestedMapping
+            Storage of the model. The keys of the nodes within `nodes` are used as the names
+            of the files. The arrays, holding the parameters (`parameters`), are not shared.
+
+        Returns
+        -------
+        int
+            Number of bytes shared.
+        """
+        if self._path is None:
+            return 0
+
+        excluded = _get_parameters_outputs(storage("parameters"))
+        names = {node: key for key, node in storage("nodes").walkjoineditems()}
+        self._path.mkdir(parents=True, exist_ok=True)
+
+        nbytes = 0
+        nwritten = 0
+        for node in nodes:
+            if not isinstance(node, Array) or node._mode != "store":
+                continue
+            if node.outputs[0] in excluded or node._data.nbytes < self._min_nbytes:
+                continue
+
+            data, written = self._map(names.get(node, node.name), node._data)
+            _set_node_data(node, data)
+            nbytes += data.nbytes
+            nwritten += written
+
+        logger.log(
+            INFO,
+            f"Share {nbytes / 2**20:.1f} MiB of model data via {self._path!s}"
+            f" ({nwritten} arrays written)",
+        )
+
+        return nbytes
+
+    def _map(self, name: str, data: NDArray) -> tuple[NDArray, bool]:
+        """Map the file with the data into memory. Write the file if needed."""
+        assert self._path is not None
+        hash = sha256()
+        _update_hash(hash, data)
+        file_name = sub(r"[^\w.-]", "_", name)
+        path = self._path / f"{file_name}_{hash.hexdigest()[:32]}.npy"
+        try:
+            shared = load(path, mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            pass
+        else:
+            if shared.shape == data.shape and shared.dtype == data.dtype:
+                return shared, False
+            logger.warning(f"Shared data file {path!s} is inconsistent, overwrite")
+
+        # Write to a temporary file first in order to avoid partially written files, when
+        # several processes are building the model simultaneously
+        path_temporary = path.with_name(f"{path.name}.{getpid()}.tmp")
+        with path_temporary.open("wb") as file:
+            save(file, data)
+        replace(path_temporary, path)
+
+        return load(path, mmap_mode="r"), True
+
+
+def _get_parameters_outputs(parameters: NestedMapping) -> set[Output]:
+    ret = set()
+    for parameter in parameters.walkvalues():
+        if not isinstance(parameter, Parameter):
+            continue
+        for name in _PARAMETER_OUTPUTS:
+            if (output := getattr(parameter, name, None)) is not None:
+                ret.add(output)
+    return ret
+
+
+def _set_node_data(node: Array, data: NDArray) -> None:
+    """Replace the buffer of the closed `Array` node, which children are not allocated yet."""
+    output = node.outputs[0]
+    node.fd.closed = False
+    output._set_data(data, owns_buffer=True)
+    node.fd.closed = True
+    node._data = data
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
+
+from dag_modelling.tools.logger import INFO, logger
+from numpy import concatenate, empty
+from numpy.random import SeedSequence
+
+if TYPE_CHECKING:
+    from typing import Any
+
+    from numpy.typing import NDArray
+
+    from ..model_dayabay import model_dayabay
+
+# Model instance of the worker process
+_worker_model: model_dayabay | None = None
+
+
+def generate_toys(
+    model: model_dayabay,
+    seeds: Sequence[SeedSequence],
+    outputs: Sequence[str],
+    *,
+    mc_parameters: bool = True,
+    mc_statistics: bool = True,
+) -> dict[str, NDArray]:
+    """Generate pseudo-experiments and read the outputs for each of them.
+
+    The random generator of the model is reset with a dedicated seed for each
+    pseudo-experiment. Therefore, the result for a given seed does not depend on the
+    pseudo-experiments, generated before.
+
+    Parameters
+    ----------
+    model : model_dayabay
+        The model to generate pseudo-experiments.
+    seeds : Sequence[SeedSequence]
+        Seeds of the pseudo-experiments, one for each.
+    outputs : Sequence[str]
+        Names of the outputs (relative to `outputs`) to read.
+    mc_parameters : bool
+        Fluctuate the nuisance parameters.
+    mc_statistics : bool
+        Fluctuate the pseudo-data.
+
+    Returns
+    -------
+    dict[str, NDArray]
+        Values of the outputs with leading axis for the pseudo-experiments.
+    """
+    model.build_outputs(outputs)
+    storage_outputs = model.storage["outputs"]
+    model_outputs = [storage_outputs[name] for name in outputs]
+    result = {
+        name: empty((len(seeds),) + output.dd.shape) for name, output in zip(outputs, model_outputs)
+    }
+
+    for i, seed in enumerate(seeds):
+        model.set_random_seed(seed)
+        model.next_sample(mc_parameters=mc_parameters, mc_statistics=mc_statistics)
+        for name, output in zip(outputs, model_outputs):
+            result[name][i] = output.data
+
+    return result
+
+
+def run_toymc(
+    ntoys: int,
+    outputs: Sequence[str] = ("statistic.stat.chi2cnp",),
+    *,
+    seed: int = 0,
+    nworkers: int = 1,
+    chunk_size: int = 100,
+    model_options: Mapping[str, Any] = {},
+    mc_parameters: bool = True,
+    mc_statistics: bool = True,
+) -> dict[str, NDArray]:
+    """Generate pseudo-experiments in parallel within a pool of processes.
+
+    Each worker builds its own instance of the model. The seed of each pseudo-experiment is
+    spawned from `SeedSequence(seed)` based on its index, therefore the result is
+    reproducible and does not depend on the number of workers or the chunk size.
+
+    Parameters
+    ----------
+    ntoys : int
+        Number of pseudo-experiments.
+    outputs : Sequence[str]
+        Names of the outputs (relative to `outputs`) to read.
+    seed : int
+        Master seed.
+    nworkers : int
+        Number of worker processes. If 1, the model is built and sampled within the
+        current process.
+    chunk_size : int
+        Number of pseudo-experiments, processed by a worker within a single task.
+    model_options : Mapping[str, Any]
+        Arguments for `model_dayabay`, e.g. `monte_carlo_mode`.
+    mc_parameters : bool
+        Fluctuate the nuisance parameters.
+    mc_statistics : bool
+        Fluctuate the pseudo-data.
+
+    Returns
+    -------
+    dict[str, NDArray]
+        Values of the outputs with leading axis for the pseudo-experiments.
+    """
+    if ntoys < 1:
+        raise ValueError(f"Number of pseudo-experiments should be positive, got {ntoys}")
+    if nworkers < 1:
+        raise ValueError(f"Number of workers should be positive, got {nworkers}")
+
+    seeds = SeedSequence(seed).spawn(ntoys)
+    chunks = [seeds[start : start + chunk_size] for start in range(0, ntoys, chunk_size)]
+    outputs = tuple(outputs)
+    generate_options = {"mc_parameters": mc_parameters, "mc_statistics": mc_statistics}
+
+    logger.log(INFO, f"Generate {ntoys} pseudo-experiments with {nworkers} worker(s)")
+    if nworkers == 1:
+        _initialize_worker(model_options)
+        results = [_generate_chunk(chunk, outputs, generate_options) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=nworkers, initializer=_initialize_worker, initargs=(model_options,)
+        ) as executor:
+            futures = [
+                executor.submit(_generate_chunk, chunk, outputs, generate_options)
+                for chunk in chunks
+            ]
+            results = [future.result() for future in futures]
+
+    return {name: concatenate([result[name] for result in results]) for name in outputs}
+
+
+def _initialize_worker(model_options: Mapping[str, Any]) -> None:
+    global _worker_model
+
+    from ..model_dayabay import model_dayabay
+
+    _worker_model = model_dayabay(**model_options)
+
+
+def _generate_chunk(
+    seeds: Sequence[SeedSequence], outputs: Sequence[str], generate_options: Mapping[str, bool]
+) -> dict[str, NDArray]:
+    assert _worker_model is not None
+    return generate_toys(_worker_model, seeds, outputs, **generate_options)
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+from importlib import import_module
+from json import dump
+from os import getpid
+from pathlib import Path
+from threading import get_ident
+from time import perf_counter_ns
+from typing import TYPE_CHECKING
+
+from dag_modelling.tools.logger import INFO, logger
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator, Sequence
+    from typing import Any
+
+    from ..model_dayabay import model_dayabay
+
+# Functions, traced during the build of the model: (module, attribute, category)
+_TRACED_BUILD_FUNCTIONS = (
+    ("dag_modelling.bundles.load_parameters", "load_parameters", "load"),
+    ("dag_modelling.bundles.load_graph", "load_graph", "load"),
+    ("dag_modelling.bundles.load_graph", "load_graph_data", "load"),
+    ("dag_modelling.bundles.load_record", "load_record_data", "load"),
+    ("dag_modelling.bundles.load_hist", "load_hist", "load"),
+    ("dag_modelling.bundles.load_array", "load_array", "load"),
+    ("dayabay_model.tools.prefetch", "prefetch_files", "load"),
+    ("dayabay_model.bundles.refine_daily_data", "refine_daily_data", "refine"),
+    ("dayabay_model.bundles.refine_lsnl_data", "refine_lsnl_data", "refine"),
+    ("dag_modelling.core.graph", "Graph.close", "graph"),
+    ("dayabay_model.model_dayabay", "model_dayabay._setup_labels", "labels"),
+)
+
+# Keyword arguments of the traced functions, which are saved to the event arguments
+_TRACED_ARGUMENTS = ("name", "filenames", "filename", "path")
+
+
+class TraceRecorder:
+    """Recorder of the timeline in the Chrome trace event format.
+
+    The recorded events may be viewed by `chrome://tracing` or Perfetto (ui.perfetto.dev,
+    works locally). Each event is a complete event ("X") with the start time and duration in
+    microseconds. The nested calls are shown as nested slices of the same thread.
+
+    The functions are traced by replacing the module or class attributes within the
+    `patch()` context. The evaluations of the nodes are traced by patching `Node._touch`,
+    therefore all the graphs are traced while the context is active.
+    """
+
+    __slots__ = ("_events", "_pid", "_time_origin")
+
+    _events: list[dict[str, Any]]
+    _pid: int
+    _time_origin: int
+
+    def __init__(self):
+        self._events = []
+        self._pid = getpid()
+        self._time_origin = perf_counter_ns()
+
+    @property
+    def events(self) -> list[dict[str, Any]]:
+        return self._events
+
+    def _add_event(
+        self, name: str, category: str, start: int, stop: int, args: Mapping[str, Any] = {}
+    ) -> None:
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start - self._time_origin) / 1000.0,
+            "dur": (stop - start) / 1000.0,
+            "pid": self._pid,
+            "tid": get_ident(),
+        }
+        if args:
+            event["args"] = dict(args)
+        self._events.append(event)
+
+    @contextmanager
+    def span(
+        self, name: str, category: str = "model", args: Mapping[str, Any] = {}
+    ) -> Generator[None, None, None]:
+        """Record the execution of the block as an event."""
+        start = perf_counter_ns()
+        try:
+            yield
+        finally:
+            self._add_event(name, category, start, perf_counter_ns(), args)
+
+    def wrap(self, function: Callable, name: str, category: str) -> Callable:
+        """Wrap the function to record each call as an event."""
+        add_event = self._add_event
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                event_args = {key: str(kwargs[key]) for key in _TRACED_ARGUMENTS if key in kwargs}
+                add_event(name, category, start, perf_counter_ns(), event_args)
+
+        return wrapper
+
+    @contextmanager
+    def patch(
+        self, functions: Sequence[tuple[str, str, str]] = _TRACED_BUILD_FUNCTIONS
+    ) -> Generator[None, None, None]:
+        """Trace the functions within the context.
+
+        Parameters
+        ----------
+        functions : Sequence[tuple[str, str, str]]
+            Functions to trace: module name, attribute (may be a method `Class.method`) and
+            category of the event.
+        """
+        with ExitStack() as stack:
+            for module_name, attribute, category in functions:
+                owner = import_module(module_name)
+                *path, name = attribute.split(".")
+                for part in path:
+                    owner = getattr(owner, part)
+                if not hasattr(owner, name):
+                    continue
+                function = getattr(owner, name)
+                setattr(owner, name, self.wrap(function, attribute, category))
+                stack.callback(setattr, owner, name, function)
+            yield
+
+    @contextmanager
+    def trace_nodes(self) -> Generator[None, None, None]:
+        """Trace the evaluation of each node within the context."""
+        from dag_modelling.core.node import Node
+
+        touch = Node._touch
+        add_event = self._add_event
+
+        def _touch(node):
+            start = perf_counter_ns()
+            try:
+                touch(node)
+            finally:
+                add_event(
+                    node.name, "node", start, perf_counter_ns(), {"type": type(node).__name__}
+                )
+
+        Node._touch = _touch
+        try:
+            yield
+        finally:
+            Node._touch = touch
+
+    def save(self, path: str | Path) -> None:
+        """Save the events to a JSON file in the Chrome trace event format."""
+        events = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": self._pid,
+                "args": {"name": "dayabay_model"},
+            }
+        ]
+        events.extend(sorted(self._events, key=lambda event: event["ts"]))
+        with Path(path).open("w") as file:
+            dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+        logger.log(INFO, f"Write: {path!s}")
+
+
+def trace_model(
+    path: str | Path | None = None,
+    *,
+    parameter_values: Mapping[str, float] = {"survival_probability.SinSq2Theta13": 0.09},
+    outputs: Sequence[str] = ("statistic.full.pull.chi2cnp",),
+    model_options: Mapping[str, Any] = {},
+) -> tuple[model_dayabay, TraceRecorder]:
+    """Record the timeline of the construction of the model and of a single evaluation.
+
+    The construction is recorded with the loaders, refine bundles, the closing of the
+    graph, setting up the labels and the evaluations of the nodes. Then the parameters are
+    set and the outputs are evaluated, all the invocations of the nodes are recorded.
+
+    Parameters
+    ----------
+    path : str | Path | None
+        JSON file to save the trace to.
+    parameter_values : Mapping[str, float]
+        Values of the parameters (relative to `parameters.all`) to set before the evaluation.
+    outputs : Sequence[str]
+        Outputs (relative to `outputs`) to evaluate.
+    model_options : Mapping[str, Any]
+        Arguments of `model_dayabay`.
+
+    Returns
+    -------
+    tuple[model_dayabay, TraceRecorder]
+        The model and the recorder with the events.
+    """
+    from ..model_dayabay import model_dayabay
+
+    recorder = TraceRecorder()
+    with recorder.patch(), recorder.trace_nodes():
+        with recorder.span("model_dayabay", "build"):
+            model = model_dayabay(**model_options)
+        with recorder.span("build_outputs", "build"):
+            model.build_outputs(outputs)
+        storage_outputs = model.storage["outputs"]
+        model_outputs = [storage_outputs.get_value(name) for name in outputs]
+        with recorder.span("evaluation.initial", "evaluation"):
+            for output in model_outputs:
+                output.data
+
+        with recorder.span("evaluation", "evaluation", {"parameters": dict(parameter_values)}):
+            with recorder.span("set_parameters", "evaluation"):
+                model.set_parameters(parameter_values)
+            for name, output in zip(outputs, model_outputs):
+                with recorder.span(name, "evaluation"):
+                    output.data
+
+    if path is not None:
+        recorder.save(path)
+
+    return model, recorder
@@ -1,15 +1,25 @@
+from collections.abc import Iterable
+from hashlib import sha256
+from os import replace
 from pathlib import Path
-from typing import Literal
+from typing import Any, Literal
 
 from colorama import Fore
 from dag_modelling.tools.logger import logger
 from dag_modelling.tools.schema import LoadYaml
 from semver import Version
 
+DATASET_INDEX_NAME = "dataset_index.yaml"
+
 
 def validate_dataset_get_source_type(
-    path_data: Path, meta_name: str, *, version_min: str, version_max: str
-) -> Literal["tsv", "hdf5", "root", "npz"]:
+    path_data: Path,
+    meta_name: str,
+    *,
+    version_min: str,
+    version_max: str,
+    check_index: bool = False,
+) -> Literal["tsv", "hdf5", "root", "npz", "compiled"]:
     """Validate the dataset version based on `meta_name` yaml file (`dataset_information.yaml`).
 
     Read or autodetect the source type (format).
@@ -18,9 +28,32 @@ def validate_dataset_get_source_type(
     model, but not the current one and it is suggested to update the model. The current model is
     newer and thus the dataset should be updated. When the dataset's version is higher than maximal
     it means that the dataset is newer than the current model, thus the model should be updated.
+
+    The dataset index is read only if `meta_name` is missing or `check_index` is set. With
+    `check_index` the files, listed in the index, are checked by `validate_dataset_index()`.
     """
+    index = None
+    if check_index:
+        index = load_dataset_index(path_data)
+        if index is not None:
+            modified = validate_dataset_index(path_data, index)
+            if modified:
+                logger.warning(
+                    f"{Fore.RED}"
+                    f"The following files were modified after {DATASET_INDEX_NAME} was written: "
+                    f"{', '.join(modified)}. Consider updating the index"
+                    f"{Fore.RESET}"
+                )
+
     source_type, version = load_manifest(path_data, meta_name)
     if source_type is None:
+        if index is None:
+            index = load_dataset_index(path_data)
+        if index is not None:
+            source_type = index["format"]
+            logger.info(f"Source type from {DATASET_INDEX_NAME}: {source_type}")
+            return source_type
+
         source_type = auto_detect_source_type(path_data)
         logger.info(f"Source type automatically detected: {source_type}")
         return source_type
@@ -46,11 +79,11 @@ def validate_dataset_get_source_type(
     return source_type
 
 
-def auto_detect_source_type(path_data: Path) -> Literal["tsv", "hdf5", "root", "npz"]:
+def auto_detect_source_type(path_data: Path) -> Literal["tsv", "hdf5", "root", "npz", "compiled"]:
     """Automatic detection of source type of data.
 
     It determines source type by path of data. Data must contain one of the next
-    types: `tsv`, `hdf5`, `root`, or `npz`. It is not possible to mix data of
+    types: `tsv`, `hdf5`, `root`, `npz` or `compiled`. It is not possible to mix data of
     different types. Parameters directory doesn't used in source type determination.
 
     Parameters
@@ -60,19 +93,26 @@ def auto_detect_source_type(path_data: Path) -> Literal["tsv", "hdf5", "root", "
 
     Returns
     -------
-    Literal["tsv", "hdf5", "root", "npz"]
+    Literal["tsv", "hdf5", "root", "npz", "compiled"]
         Type of source data
     """
+    return _detect_source_type(
+        path_data,
+        (path.relative_to(path_data) for path in path_data.rglob("*.*") if path.is_file()),
+    )
+
+
+def _detect_source_type(
+    path_data: Path, paths: Iterable[Path]
+) -> Literal["tsv", "hdf5", "root", "npz", "compiled"]:
+    """Detect the source type by the extensions of the `paths`, relative to `path_data`."""
     extensions = {
-        path.suffix[1:]
-        for path in filter(
-            lambda path: path.is_file() and "parameters" not in path.parts, path_data.rglob("*.*")
-        )
+        path.suffix[1:] for path in paths if path.suffix and "parameters" not in path.parts
     }
     extensions -= {"py", "yaml"}
     if len(extensions) == 1:
         source_type = extensions.pop()
-        if source_type not in {"tsv", "hdf5", "root", "npz", "bz2"}:
+        if source_type not in {"tsv", "hdf5", "root", "npz", "compiled", "bz2"}:
             message = f"Unexpected data extension: {source_type}"
             logger.critical(message)
             raise RuntimeError(message)
@@ -94,7 +134,7 @@ def auto_detect_source_type(path_data: Path) -> Literal["tsv", "hdf5", "root", "
 
 def load_manifest(
     path_data: Path, meta_name: str
-) -> tuple[Literal["tsv", "hdf5", "root", "npz"] | None, Version | None]:
+) -> tuple[Literal["tsv", "hdf5", "root", "npz", "compiled"] | None, Version | None]:
     manifest_name = path_data / meta_name
     if not manifest_name.is_file():
         logger.warning(
@@ -126,9 +166,144 @@ def load_manifest(
         logger.critical(message)
         raise RuntimeError(message) from e
 
-    if source_type not in {"tsv", "hdf5", "root", "npz"}:
+    if source_type not in {"tsv", "hdf5", "root", "npz", "compiled"}:
         message = f"Source type {source_type}, reported by {meta_name} is not supported"
         logger.critical(message)
         raise RuntimeError(message)
 
     return source_type, version
+
+
+def make_dataset_index(path_data: Path, meta_name: str = "dataset_info.yaml") -> dict[str, Any]:
+    """Make the index of the dataset: the source type and the list of all the files.
+
+    The tree of the dataset is walked once. For each file the size, the modification time
+    (ns) and the SHA-256 of the content are saved. The source type is read from `meta_name`
+    or detected by the extensions of the files.
+
+    Parameters
+    ----------
+    path_data : Path
+        Path to data
+    meta_name : str
+        Name of the dataset manifest file.
+
+    Returns
+    -------
+    dict[str, Any]
+        `format`: source type, `files`: {relative path: {size, mtime_ns, sha256}}
+    """
+    paths = sorted(
+        path.relative_to(path_data)
+        for path in path_data.rglob("*")
+        if path.is_file() and path.name != DATASET_INDEX_NAME
+    )
+    files = {}
+    for path in paths:
+        stat = (path_data / path).stat()
+        files[path.as_posix()] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": _file_hash(path_data / path),
+        }
+
+    source_type, _ = load_manifest(path_data, meta_name)
+    if source_type is None:
+        source_type = _detect_source_type(path_data, paths)
+
+    return {"format": source_type, "files": files}
+
+
+def write_dataset_index(path_data: Path, index: dict[str, Any] | None = None) -> Path:
+    """Write the index of the dataset to `path_data/dataset_index.yaml`.
+
+    Parameters
+    ----------
+    path_data : Path
+        Path to data
+    index : dict[str, Any] | None
+        The index, made by `make_dataset_index()` if None.
+
+    Returns
+    -------
+    Path
+        Path to the index file.
+    """
+    from yaml import safe_dump
+
+    if index is None:
+        index = make_dataset_index(path_data)
+
+    path_index = path_data / DATASET_INDEX_NAME
+    path_temporary = path_index.with_name(f"{path_index.name}.tmp")
+    with path_temporary.open("w") as file:
+        safe_dump(index, file, sort_keys=False)
+    replace(path_temporary, path_index)
+    logger.info(f"Write: {path_index!s}")
+
+    return path_index
+
+
+def load_dataset_index(path_data: Path) -> dict[str, Any] | None:
+    """Read the index of the dataset or return None if the index does not exist."""
+    path_index = path_data / DATASET_INDEX_NAME
+    if not path_index.is_file():
+        return None
+
+    index = LoadYaml(path_index)
+    if not isinstance(index, dict) or "format" not in index or "files" not in index:
+        message = f"Can not obtain 'format' and 'files' from {path_index!s}"
+        logger.critical(message)
+        raise RuntimeError(message)
+
+    return index
+
+
+def validate_dataset_index(
+    path_data: Path, index: dict[str, Any], *, check_hash: bool = False
+) -> list[str]:
+    """Check the files of the dataset against the index without walking the tree.
+
+    By default only the sizes and the modification times of the files, listed in the index,
+    are checked. With `check_hash` the content of the files is hashed as well.
+
+    Parameters
+    ----------
+    path_data : Path
+        Path to data
+    index : dict[str, Any]
+        The index, read by `load_dataset_index()`.
+    check_hash : bool
+        Compare the SHA-256 of the content of the files.
+
+    Returns
+    -------
+    list[str]
+        Relative paths of the files, which are missing or modified.
+    """
+    modified = []
+    for name, entry in index["files"].items():
+        path = path_data / name
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            modified.append(name)
+            continue
+
+        if stat.st_size != entry["size"]:
+            modified.append(name)
+        elif check_hash:
+            if _file_hash(path) != entry["sha256"]:
+                modified.append(name)
+        elif stat.st_mtime_ns != entry["mtime_ns"]:
+            modified.append(name)
+
+    return modified
+
+
+def _file_hash(path: Path) -> str:
+    hash = sha256()
+    with path.open("rb") as file:
+        while chunk := file.read(1 << 20):
+            hash.update(chunk)
+    return hash.hexdigest()
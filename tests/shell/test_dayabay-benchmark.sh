@@ -0,0 +1,8 @@
+#!/usr/bin/env bash
+
+./extras/scripts/dayabay-benchmark.py --source-types hdf5 \
+                                      --repeat 1 \
+                                      --jacobian-mode forward \
+                                      --ntoys 2 \
+                                      --output output/benchmark.json && \
+./extras/scripts/dayabay-benchmark-compare.py output/benchmark.json output/benchmark.json
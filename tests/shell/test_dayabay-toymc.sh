@@ -0,0 +1,8 @@
+#!/usr/bin/env bash
+
+./extras/scripts/dayabay-toymc.py --ntoys 4 \
+                                  --nworkers 2 \
+                                  --chunk-size 1 \
+                                  --outputs statistic.stat.chi2cnp data.pseudo.self \
+                                  --output output/toymc.npz \
+                                           output/toymc.hdf5
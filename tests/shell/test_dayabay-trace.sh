@@ -0,0 +1,4 @@
+#!/usr/bin/env bash
+
+./extras/scripts/dayabay-trace.py --par survival_probability.SinSq2Theta13 0.09 \
+                                  --output output/trace.json
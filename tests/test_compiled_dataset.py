@@ -0,0 +1,64 @@
+from dag_modelling.bundles.file_reader import FileReader
+from numpy import arange, array_equal, linspace
+
+from dayabay_model import model_dayabay
+from dayabay_model.tools.compiled_dataset import (
+    COMPILED_DATASET_NAME,
+    FileReaderCompiled,
+    compile_dataset,
+    write_compiled_dataset,
+)
+
+
+def test_compiled_dataset_container(tmp_path):
+    edges = linspace(0.0, 1.0, 11)
+    objects = {
+        ("detector_iav_matrix", "array", "iav_matrix"): arange(12.0).reshape(3, 4),
+        ("spectra", "hist", "spectrum"): (edges, arange(10.0)),
+        ("spectra", "graph", None): (edges, edges**2),
+        ("dayabay_dataset/daily", "record", "6AD"): {"day": arange(5), "livetime": arange(5.0)},
+    }
+    write_compiled_dataset(tmp_path / COMPILED_DATASET_NAME, objects)
+    assert (tmp_path / COMPILED_DATASET_NAME).stat().st_size % 64 == 0
+
+    reader = FileReaderCompiled(tmp_path / "detector_iav_matrix.compiled")
+    matrix = reader.get_array("iav_matrix")
+    assert array_equal(matrix, objects["detector_iav_matrix", "array", "iav_matrix"])
+    assert matrix.ctypes.data % 64 == 0
+    reader._close()
+
+    reader = FileReaderCompiled(tmp_path / "spectra.compiled")
+    assert reader.keys() == ("spectrum",)
+    x, y = reader.get_hist("spectrum")
+    assert array_equal(x, edges) and array_equal(y, arange(10.0))
+    x, y = reader.get_graph(None)
+    assert array_equal(y, edges**2)
+    reader._close()
+
+    reader = FileReaderCompiled(tmp_path / "dayabay_dataset/daily.compiled")
+    record = reader.get_record("6AD")
+    assert record["day"].dtype == arange(5).dtype
+    assert array_equal(record["livetime"], arange(5.0))
+    reader._close()
+
+
+def test_compiled_dataset_model(tmp_path):
+    compile_dataset("data", tmp_path)
+    # All the objects of the files are converted, not only the ones read by the model
+    for name in ("detector_lsnl_curves", "dayabay_dataset/dayabay_daily_detector_data"):
+        reader = FileReader.open(f"data/{name}.hdf5")
+        reader_compiled = FileReaderCompiled(tmp_path / f"{name}.compiled")
+        assert set(reader_compiled.keys()) == set(reader.keys())
+        reader._close()
+        reader_compiled._close()
+
+    model_compiled = model_dayabay(path_data=tmp_path)
+    assert model_compiled.source_type == "compiled"
+
+    model = model_dayabay()
+    for name in (
+        "outputs.eventscount.final.concatenated.selected",
+        "outputs.data.real.concatenated.selected",
+        "outputs.statistic.full.pull.chi2cnp",
+    ):
+        assert array_equal(model_compiled.storage[name].data, model.storage[name].data)
@@ -0,0 +1,59 @@
+from os import utime
+
+from dayabay_model.tools.validate_dataset import (
+    DATASET_INDEX_NAME,
+    load_dataset_index,
+    make_dataset_index,
+    validate_dataset_get_source_type,
+    validate_dataset_index,
+    write_dataset_index,
+)
+
+
+def test_dataset_index(tmp_path):
+    (tmp_path / "dayabay_dataset").mkdir()
+    (tmp_path / "parameters").mkdir()
+    (tmp_path / "detector_iav_matrix.npz").write_bytes(b"iav")
+    (tmp_path / "dayabay_dataset" / "dayabay_ibd_spectra_6AD.npz").write_bytes(b"ibd")
+    (tmp_path / "parameters" / "baselines.yaml").write_text("baselines: {}\n")
+    (tmp_path / "parameters" / "final_erec_bin_edges.tsv").write_text("0.7\n")
+
+    index = make_dataset_index(tmp_path)
+    assert index["format"] == "npz"
+    assert set(index["files"]) == {
+        "detector_iav_matrix.npz",
+        "dayabay_dataset/dayabay_ibd_spectra_6AD.npz",
+        "parameters/baselines.yaml",
+        "parameters/final_erec_bin_edges.tsv",
+    }
+
+    path_index = write_dataset_index(tmp_path, index)
+    assert path_index == tmp_path / DATASET_INDEX_NAME
+    assert load_dataset_index(tmp_path) == index
+    assert validate_dataset_index(tmp_path, index, check_hash=True) == []
+
+    # Tree walk would fail due to mixed extensions, the index is used instead
+    (tmp_path / "notes.txt").write_text("notes")
+    source_type = validate_dataset_get_source_type(
+        tmp_path, "dataset_info.yaml", version_min="1.0.0", version_max="2.0.0"
+    )
+    assert source_type == "npz"
+
+    path = tmp_path / "detector_iav_matrix.npz"
+    stat = path.stat()
+    utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert validate_dataset_index(tmp_path, index) == ["detector_iav_matrix.npz"]
+    assert validate_dataset_index(tmp_path, index, check_hash=True) == []
+    source_type = validate_dataset_get_source_type(
+        tmp_path, "dataset_info.yaml", version_min="1.0.0", version_max="2.0.0", check_index=True
+    )
+    assert source_type == "npz"
+
+    path.write_bytes(b"IAV")
+    assert validate_dataset_index(tmp_path, index, check_hash=True) == ["detector_iav_matrix.npz"]
+
+    (tmp_path / "dayabay_dataset" / "dayabay_ibd_spectra_6AD.npz").unlink()
+    assert validate_dataset_index(tmp_path, index) == [
+        "dayabay_dataset/dayabay_ibd_spectra_6AD.npz",
+        "detector_iav_matrix.npz",
+    ]
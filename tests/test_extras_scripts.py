@@ -163,3 +163,34 @@ def test_run_mwe_scripts():
     _, stderr, code = _run_script(
         "./tests/shell/test_mwe_scripts.sh",
     )
+
+
+def test_run_dayabay_toymc():
+    output_paths = ["output/toymc.npz", "output/toymc.hdf5"]
+    _, stderr, code = _run_script(
+        "./tests/shell/test_dayabay-toymc.sh",
+    )
+
+    _check_script_result(code, stderr, None, output_paths)
+
+
+def test_run_dayabay_benchmark():
+    output_path = "output/benchmark.json"
+    stdout, stderr, code = _run_script(
+        "./tests/shell/test_dayabay-benchmark.sh",
+    )
+
+    _check_script_result(code, stderr, None, output_path)
+    assert "toymc.next_sample" in stdout
+    assert "regression" not in stdout
+
+
+def test_run_dayabay_trace():
+    output_path = "output/trace.json"
+    stdout, stderr, code = _run_script(
+        "./tests/shell/test_dayabay-trace.sh",
+    )
+
+    _check_script_result(code, stderr, None, output_path)
+    assert "node" in stdout
+    assert "refine" in stdout
@@ -0,0 +1,6 @@
+from dayabay_model.tools.benchmark import find_imported_modules
+
+
+def test_import_deferred_modules():
+    # The import time itself is checked by the benchmark
+    assert find_imported_modules("dayabay_model") == []
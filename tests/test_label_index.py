@@ -0,0 +1,63 @@
+from dag_modelling.core import NodeStorage
+from dag_modelling.core.graph import Graph
+from dag_modelling.lib.common import Array
+from numpy import arange
+from yaml import safe_dump
+
+from dayabay_model.tools.label_index import LabelIndex
+
+LABELS = {
+    "spectrum": {
+        "group": {
+            "text": "Spectrum in {key}",
+            "latex": r"Spectrum $S_{{\rm {key}}}$",
+            "axis": "entries",
+        },
+    },
+    "total": {"node": {"text": "Total", "mark": "Σ"}, "text": "Total output"},
+    "unused": {"text": "Unused"},
+}
+
+
+def make_storage() -> NodeStorage:
+    storage = NodeStorage()
+    with Graph(close_on_exit=True):
+        for key in ("AD11.6AD", "AD11.8AD", "AD21.8AD", "total"):
+            name = key if key == "total" else f"spectrum.{key}"
+            node = Array(name, arange(3.0))
+            storage[f"nodes.{name}"] = node
+            storage[f"outputs.{name}"] = node.outputs[0]
+    return storage
+
+
+def test_label_index(tmp_path):
+    filename = tmp_path / "labels.yaml"
+    filename.write_text(safe_dump(LABELS, allow_unicode=True))
+
+    storage_expected = make_storage()
+    processed_keys_expected = set()
+    for name in ("nodes", "outputs"):
+        storage_expected(name).read_labels(LABELS, processed_keys_set=processed_keys_expected)
+
+    path = tmp_path / "cache"
+    for _ in range(2):
+        storage = make_storage()
+        index = LabelIndex.load(filename, storage, path=path)
+        index.apply(storage)
+        assert len(tuple(path.glob("label_index_*.pickle"))) == 1
+        assert index.processed_keys == processed_keys_expected
+        assert len(index) == 8
+        for name in ("nodes", "outputs"):
+            for key, object in storage(name).walkjoineditems():
+                object_expected = storage_expected[f"{name}.{key}"]
+                assert str(object.labels) == str(object_expected.labels)
+
+    assert storage["nodes.spectrum.AD21.8AD"].labels.text == "Spectrum in AD21.8AD"
+    assert storage["nodes.total"].labels.text == "Total"
+
+    storage = make_storage()
+    del storage["nodes.total"]
+    index = LabelIndex.load(filename, storage, path=path)
+    assert len(tuple(path.glob("label_index_*.pickle"))) == 2
+    assert len(index) == 7
+
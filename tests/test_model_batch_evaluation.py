@@ -0,0 +1,43 @@
+from numpy import allclose, linspace
+from pytest import raises
+
+from dayabay_model import model_dayabay
+
+
+def test_model_dayabay_evaluate_batch():
+    model = model_dayabay()
+
+    npoints = 5
+    parameter_grid = {
+        "survival_probability.SinSq2Theta13": linspace(0.07, 0.1, npoints),
+        "survival_probability.DeltaMSq32": linspace(2.3e-3, 2.6e-3, npoints),
+        # Constrained parameter, which contributes to the nuisance term
+        "survival_probability.DeltaMSq21": linspace(7.4e-5, 7.6e-5, npoints),
+    }
+    outputs = (
+        "eventscount.final.concatenated.selected",
+        "statistic.stat.chi2cnp",
+        "statistic.full.pull.chi2p",
+        "statistic.full.covmat.chi2cnp",
+    )
+    parameter = model.storage["parameters.all.survival_probability.SinSq2Theta13"]
+    value_initial = parameter.value
+
+    result_batch = model.evaluate_batch(parameter_grid, outputs, mode="batch")
+    result_loop = model.evaluate_batch(parameter_grid, outputs, mode="loop")
+
+    assert parameter.value == value_initial
+    for name in outputs:
+        output = model.storage["outputs"][name]
+        assert result_batch[name].shape == (npoints,) + output.dd.shape
+        assert allclose(result_batch[name], result_loop[name], rtol=1e-10, atol=0)
+
+    # The kernel is reused until the other parameters are changed
+    kernel = model.oscillation_kernel
+    model.evaluate_batch(parameter_grid, outputs, mode="batch")
+    assert model.oscillation_kernel is kernel
+    model.storage["parameters.all.detector.global_normalization"].value = 1.01
+    assert model.oscillation_kernel is not kernel
+
+    with raises(RuntimeError):
+        model.evaluate_batch({"detector.global_normalization": [1.0, 1.1]}, mode="batch")
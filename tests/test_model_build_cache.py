@@ -0,0 +1,24 @@
+from numpy import allclose
+
+from dayabay_model import model_dayabay
+
+
+def test_model_dayabay_build_cache(tmp_path):
+    model_cold = model_dayabay(build_cache=tmp_path)
+    (path_cache,) = tmp_path.glob("build_cache_*.pickle")
+    mtime = path_cache.stat().st_mtime_ns
+
+    model_warm = model_dayabay(build_cache=tmp_path)
+    # All the objects are read from the cache, therefore the cache is not written again
+    assert path_cache.stat().st_mtime_ns == mtime
+    assert "storage:daily_data" in model_warm._build_cache
+    assert "storage:data.detector.lsnl.curves" in model_warm._build_cache
+
+    for name in (
+        "outputs.eventscount.final.concatenated.selected",
+        "outputs.data.real.concatenated.selected",
+        "outputs.statistic.full.pull.chi2cnp",
+    ):
+        assert allclose(
+            model_cold.storage[name].data, model_warm.storage[name].data, rtol=0, atol=0
+        )
@@ -0,0 +1,26 @@
+from numpy import abs, allclose
+
+from dayabay_model import model_dayabay
+
+
+def test_model_dayabay_covariance_update():
+    model = model_dayabay(covariance_groups=["eres", "background_rate"], strict=False)
+    storage = model.storage
+    covariance = storage["outputs.covariance.covmat_syst.sum"]
+
+    assert model.update_covariance_matrix() == ["eres", "background_rate"]
+    assert model.update_covariance_matrix() == []
+
+    # Background is added to the IBD spectrum: the Jacobians are not affected
+    parameter_background = next(storage["parameters.all.background"].walkvalues())
+    parameter_background.value *= 1.1
+    assert model.update_covariance_matrix() == []
+
+    theta13 = storage["parameters.all.survival_probability.SinSq2Theta13"]
+    theta13.value = 0.09
+    assert model.update_covariance_matrix() == ["eres"]
+    covariance_incremental = covariance.data.copy()
+
+    assert model.update_covariance_matrix(force=True) == ["eres", "background_rate"]
+    atol = 1e-10 * abs(covariance.data).max()
+    assert allclose(covariance_incremental, covariance.data, rtol=0, atol=atol)
@@ -0,0 +1,43 @@
+from numpy import allclose
+
+from dayabay_model import model_dayabay
+
+
+def test_model_dayabay_daily_data_sums():
+    model_arrays = model_dayabay(daily_data_mode="arrays")
+    model_sums = model_dayabay(daily_data_mode="sums")
+    models = (model_arrays, model_sums)
+    assert "daily_data" not in model_sums.storage["outputs"]
+
+    names = (
+        "detector.livetime",
+        "detector.eff_livetime",
+        "background.count_acc_fixed_s_day",
+        "reactor_detector.thermal_energy_MeV",
+        "eventscount.final.detector_period",
+    )
+    name_chi2 = "statistic.full.pull.chi2cnp"
+
+    def check():
+        outputs_arrays, outputs_sums = (model.storage["outputs"] for model in models)
+        for name in names:
+            items_arrays = dict(outputs_arrays[name].walkjoineditems())
+            items_sums = dict(outputs_sums[name].walkjoineditems())
+            assert items_arrays.keys() == items_sums.keys()
+            for key, output in items_arrays.items():
+                assert allclose(output.data, items_sums[key].data, rtol=1e-12, atol=0)
+        assert allclose(
+            outputs_arrays[name_chi2].data, outputs_sums[name_chi2].data, rtol=1e-12, atol=0
+        )
+
+    check()
+    for group in ("reactor", "detector"):
+        for model in models:
+            parameter = next(model.storage[f"parameters.normalized.{group}"].walkvalues())
+            parameter.value = 1.0
+        check()
+
+    for model in models:
+        parameter = next(model.storage["parameters.all.reactor.energy_per_fission"].walkvalues())
+        parameter.value *= 1.01
+    check()
@@ -0,0 +1,31 @@
+from numpy import array_equal
+
+from dayabay_model import model_dayabay
+
+
+def test_model_dayabay_deferred_outputs():
+    model = model_dayabay()
+    model_deferred = model_dayabay(statistics=["statistic.full.pull.chi2cnp"])
+
+    outputs = model.storage["outputs"]
+    outputs_deferred = model_deferred.storage["outputs"]
+    assert array_equal(
+        outputs_deferred["statistic.full.pull.chi2cnp"].data,
+        outputs["statistic.full.pull.chi2cnp"].data,
+    )
+    assert "statistic.full.covmat" not in outputs_deferred
+    assert "summary" not in outputs_deferred
+
+    model_deferred.build_outputs(["statistic.full.covmat"])
+    assert "statistic.stat.chi2p_unbiased" not in outputs_deferred
+    # The items are built on first access
+    for name in ("statistic.full.covmat.chi2cnp", "statistic.stat.chi2p_unbiased"):
+        output, output_deferred = outputs[name], outputs_deferred[name]
+        assert array_equal(output_deferred.data, output.data)
+        assert output_deferred.labels.text == output.labels.text
+        assert output_deferred.labels.paths == output.labels.paths
+    assert "statistic.stat.chi2poisson" not in outputs_deferred
+    assert model_deferred.storage.get_value("outputs.statistic.stat.chi2poisson") is not None
+    assert "statistic.stat.chi2poisson" in outputs_deferred
+
+    assert model_deferred.make_summary_table().equals(model.make_summary_table())
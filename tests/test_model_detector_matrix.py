@@ -0,0 +1,100 @@
+from dag_modelling.core.graph import Graph
+from dag_modelling.lib.calculus.jacobian import compute_jacobian
+from dag_modelling.lib.common import Array
+from dag_modelling.lib.hist import AxisDistortionMatrixPointwise
+from numpy import abs, allclose, linspace
+
+from dayabay_model import model_dayabay
+
+
+def lsnl_matrix(node):
+    """Compute the LSNL matrix for the inputs of the node by `AxisDistortionMatrixPointwise`."""
+    names = ("EdgesOriginal", "EdgesTarget", "DistortionOriginal", "DistortionTarget")
+    with Graph(close_on_exit=True):
+        matrix = AxisDistortionMatrixPointwise("matrix")
+        for name in names:
+            Array(name, node.inputs[name].data.copy()) >> matrix.inputs[name]
+    return matrix.outputs[0].data
+
+
+def test_model_dayabay_detector_matrix_banded():
+    groups = ["eres", "iav", "lsnl", "detector_relative"]
+    model = model_dayabay(
+        detector_matrix_mode="banded",
+        eres_nsigma=5.0,
+        covariance_groups=groups,
+        jacobian_mode="forward",
+        strict=False,
+    )
+    storage = model.storage
+    nodes = storage["nodes.eventscount.stages"]
+    assert "detector.lsnl.matrix" not in storage["nodes"]
+
+    # The band of each matrix is stored once and is shared by the periods
+    bands_iav = set(storage["nodes.detector.iav.matrix_banded"].walkvalues())
+    assert len(bands_iav) == len(model.index["detector"])
+    assert {node.banded_matrix for node in nodes["iav"].walkvalues()} == bands_iav
+    band_eres = storage["nodes.detector.eres.matrix_banded"]
+    assert {node.banded_matrix for node in nodes["erec"].walkvalues()} == {band_eres}
+
+    def check():
+        # The tolerance is relative to the maximal value of the result
+        for stage, tolerance in (("iav", 1e-12), ("erec", 1e-6)):
+            for node in nodes[stage].walkvalues():
+                result = node.outputs[0].data
+                matrix = node.banded_matrix.inputs["matrix"].data
+                expected = matrix @ node.inputs["vector"].data
+                assert allclose(result, expected, rtol=0, atol=tolerance * abs(expected).max())
+                assert node.nnz < matrix.size
+
+        # The node of each detector is shared by the periods
+        assert len(set(nodes["evis"].walkvalues())) == len(model.index["detector"])
+        for node in set(nodes["evis"].walkvalues()):
+            matrix = lsnl_matrix(node)
+            assert allclose(node.dense_matrix(), matrix, rtol=0, atol=1e-14)
+            for input, output in zip(node.inputs, node.outputs):
+                expected = matrix @ input.data
+                result = output.data
+                assert allclose(result, expected, rtol=0, atol=1e-12 * abs(expected).max())
+
+    check()
+    nnz = band_eres.nnz
+    for group in groups:
+        parameters = storage["parameters.normalized"][model.systematic_uncertainties_groups[group]]
+        parameter = next(parameters.walkvalues())
+        parameter.value = 1.0
+        check()
+    # The support of the band is fixed
+    assert band_eres.nnz == nnz
+
+    name = "eventscount.final.concatenated.selected"
+    parameter_grid = {"survival_probability.SinSq2Theta13": linspace(0.07, 0.1, 3)}
+    result_batch = model.evaluate_batch(parameter_grid, (name,), mode="batch")
+    result_loop = model.evaluate_batch(parameter_grid, (name,), mode="loop")
+    assert allclose(result_batch[name], result_loop[name], rtol=1e-10, atol=0)
+
+    # The prediction is a smooth function of the parameters: the forward Jacobians agree with
+    # the numerical ones and the truncation of the energy resolution is small
+    model = model_dayabay(
+        detector_matrix_mode="banded",
+        covariance_groups=groups,
+        jacobian_mode="forward",
+        strict=False,
+    )
+    model_dense = model_dayabay(covariance_groups=["eres"], strict=False)
+    storage = model.storage
+    output = storage["outputs.eventscount.final.concatenated.selected"]
+    model.update_covariance_matrix()
+    for group in groups:
+        jacobian_forward = storage[f"outputs.covariance.jacobians.{group}"].data.copy()
+        parameters = storage["parameters.normalized"][model.systematic_uncertainties_groups[group]]
+        jacobian_numerical = compute_jacobian(output, list(parameters.walkvalues()))
+
+        atol = 1e-6 * abs(jacobian_numerical).max()
+        assert allclose(jacobian_forward, jacobian_numerical, rtol=0, atol=atol)
+
+        if group == "eres":
+            model_dense.update_covariance_matrix()
+            jacobian_dense = model_dense.storage["outputs.covariance.jacobians.eres"].data
+            atol = 1e-5 * abs(jacobian_dense).max()
+            assert allclose(jacobian_numerical, jacobian_dense, rtol=0, atol=atol)
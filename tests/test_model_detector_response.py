@@ -0,0 +1,27 @@
+from numpy import allclose, linspace
+
+from dayabay_model import model_dayabay
+
+
+def test_model_dayabay_detector_response_fused():
+    model = model_dayabay(detector_response_mode="fused")
+    storage = model.storage
+    outputs_fused = storage["outputs.eventscount.final.ibd"]
+    outputs_stages = storage["outputs.eventscount.final.ibd_stages"]
+
+    def check():
+        for key, output in outputs_fused.walkitems():
+            assert allclose(output.data, outputs_stages[key].data, rtol=1e-12, atol=0)
+
+    check()
+    for group in ("eres", "lsnl", "iav", "detector_relative"):
+        parameters = storage["parameters.normalized"][model.systematic_uncertainties_groups[group]]
+        parameter = next(parameters.walkvalues())
+        parameter.value = 1.0
+        check()
+
+    name = "eventscount.final.concatenated.selected"
+    parameter_grid = {"survival_probability.SinSq2Theta13": linspace(0.07, 0.1, 3)}
+    result_batch = model.evaluate_batch(parameter_grid, (name,), mode="batch")
+    result_loop = model.evaluate_batch(parameter_grid, (name,), mode="loop")
+    assert allclose(result_batch[name], result_loop[name], rtol=1e-10, atol=0)
@@ -0,0 +1,26 @@
+from dag_modelling.lib.calculus.jacobian import compute_jacobian
+from nested_mapping import NestedMapping
+from numpy import abs, allclose
+
+from dayabay_model import model_dayabay
+
+
+def test_model_dayabay_forward_jacobian():
+    groups = ["eres", "detector_relative", "fission_fractions", "background_rate", "hm_corr"]
+    model = model_dayabay(covariance_groups=groups, jacobian_mode="forward", strict=False)
+    storage = model.storage
+    output = storage["outputs.eventscount.final.concatenated.selected"]
+
+    model.update_covariance_matrix()
+    for group in groups:
+        jacobian_forward = storage[f"outputs.covariance.jacobians.{group}"].data.copy()
+
+        parameters = storage["parameters.normalized"][model.systematic_uncertainties_groups[group]]
+        if isinstance(parameters, NestedMapping):
+            parameters = list(parameters.walkvalues())
+        else:
+            parameters = [parameters]
+        jacobian_numerical = compute_jacobian(output, parameters)
+
+        atol = 1e-6 * abs(jacobian_numerical).max()
+        assert allclose(jacobian_forward, jacobian_numerical, rtol=0, atol=atol)
@@ -0,0 +1,39 @@
+from numpy import allclose, linspace
+
+from dayabay_model import model_dayabay
+
+
+def test_model_dayabay_integration_mode_kernel():
+    model_parts = model_dayabay(integration_mode="parts")
+    model_kernel = model_dayabay(integration_mode="kernel")
+    nodes_kernel = model_kernel.storage["nodes"]
+    for name in ("kinematics.integral", "eventscount.parts"):
+        assert name not in nodes_kernel, name
+
+    name_output = "eventscount.final.concatenated.selected"
+    name_chi2 = "statistic.full.pull.chi2cnp"
+    models = (model_parts, model_kernel)
+    outputs = [model.storage["outputs"][name_output] for model in models]
+    chi2s = [model.storage["outputs"][name_chi2] for model in models]
+
+    def check():
+        assert allclose(outputs[0].data, outputs[1].data, rtol=1e-12, atol=0)
+        assert allclose(chi2s[0].data, chi2s[1].data, rtol=1e-12, atol=0)
+
+    check()
+    for value_theta13, value_dm32 in ((0.07, 2.3e-3), (0.1, 2.6e-3)):
+        for model in models:
+            parameters = model.storage["parameters.all.survival_probability"]
+            parameters["SinSq2Theta13"].value = value_theta13
+            parameters["DeltaMSq32"].value = value_dm32
+        check()
+
+    for model in models:
+        parameter = next(model.storage["parameters.normalized.detector"].walkvalues())
+        parameter.value = 1.0
+    check()
+
+    parameter_grid = {"survival_probability.SinSq2Theta13": linspace(0.07, 0.1, 3)}
+    result_batch = model_kernel.evaluate_batch(parameter_grid, (name_output,), mode="batch")
+    result_loop = model_kernel.evaluate_batch(parameter_grid, (name_output,), mode="loop")
+    assert allclose(result_batch[name_output], result_loop[name_output], rtol=1e-10, atol=0)
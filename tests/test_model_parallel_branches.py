@@ -0,0 +1,40 @@
+from numpy import array_equal
+
+from dayabay_model import model_dayabay
+
+
+def test_model_dayabay_parallel_branches():
+    statistics = ("statistic.full.pull.chi2cnp",)
+    model = model_dayabay(statistics=statistics)
+    model_parallel = model_dayabay(statistics=statistics, evaluation_threads=4)
+    models = (model, model_parallel)
+    assert model_parallel._parallel_branches.nbranches == (48, 384, 21)
+
+    names = (
+        "outputs.eventscount.final.concatenated.selected",
+        "outputs.statistic.full.pull.chi2cnp",
+    )
+
+    def check():
+        for name in names:
+            data, data_parallel = (model.storage[name].data for model in models)
+            assert array_equal(data, data_parallel)
+
+    check()
+    for name, value in (
+        ("survival_probability.SinSq2Theta13", 0.08),
+        ("detector.eres.b_stat", 0.09),
+        ("detector.global_normalization", 1.01),
+    ):
+        for model in models:
+            model.storage[f"parameters.all.{name}"].value = value
+        check()
+
+    # The branches are found again, when the graph is extended by the deferred outputs
+    for model in models:
+        model.build_outputs(("statistic.full.covmat.chi2cnp",))
+    assert model_parallel._parallel_branches.active
+    for model in models:
+        model.storage["parameters.all.survival_probability.SinSq2Theta13"].value = 0.09
+    names += ("outputs.statistic.full.covmat.chi2cnp",)
+    check()
@@ -0,0 +1,60 @@
+from dag_modelling.core.graph import Graph
+from dag_modelling.lib.common import Array
+from nested_mapping import walkvalues
+from numpy import array_equal, float32, linspace
+
+from dayabay_model import model_dayabay
+from dayabay_model.lib import Cast
+
+
+def test_cast():
+    data = linspace(0.0, 1.0, 11)
+    with Graph(close_on_exit=True):
+        array = Array("array", data)
+        cast = Cast("cast", dtype="f")
+        array >> cast
+    result = cast.outputs[0].data
+    assert result.dtype == float32
+    assert array_equal(result, data.astype("f"))
+
+
+def test_model_dayabay_precision():
+    statistics = ("statistic.full.pull.chi2cnp",)
+    model = model_dayabay(statistics=statistics, rebin_mode="segments")
+    model_mixed = model_dayabay(statistics=statistics, rebin_mode="segments", precision="mixed")
+    assert model_mixed.precision == "mixed"
+
+    outputs = model_mixed.storage["outputs"]
+    for name in (
+        "eventscount.stages.raw_single",
+        "eventscount.stages.iav",
+        "eventscount.stages.evis",
+        "eventscount.stages.erec",
+        "eventscount.fine.ibd_normalized",
+    ):
+        assert all(output.dd.dtype == "f" for output in walkvalues(outputs[name])), name
+    # The matrices are stored only in single precision
+    for name in ("detector.iav.matrix_rescaled", "detector.lsnl.matrix"):
+        assert all(output.dd.dtype == "f" for output in walkvalues(outputs[name])), name
+    assert outputs["detector.eres.matrix"].dd.dtype == "f"
+    assert not any(key.endswith("matrix_single") for key in outputs.walkjoinedkeys())
+    for name in (
+        "eventscount.stages.raw",
+        # The rebinning sums the single precision spectra into double precision ones
+        "eventscount.final.ibd",
+        "eventscount.final.detector_period",
+        "eventscount.final.concatenated.selected",
+        "statistic.full.pull.chi2cnp",
+    ):
+        assert all(output.dd.dtype == "d" for output in walkvalues(outputs[name])), name
+
+    model_mixed.storage["parameters.all.survival_probability.SinSq2Theta13"].value = 0.08
+    model_mixed.storage["parameters.all.detector.eres.b_stat"].value = 0.09
+    report = model_mixed.make_precision_report(model)
+    assert model.storage["parameters.all.survival_probability.SinSq2Theta13"].value == 0.08
+
+    ibd = report.loc["eventscount.fine.ibd_normalized"]
+    assert ibd["count"] == 21
+    assert ibd["nbytes"] * 2 == ibd["nbytes_reference"]
+    assert report.loc["eventscount.final.concatenated.selected", "max_rel_diff"] < 1e-6
+    assert report.loc["statistic.full.pull.chi2cnp", "max_rel_diff"] < 1e-5
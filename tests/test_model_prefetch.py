@@ -0,0 +1,43 @@
+from bz2 import compress
+
+from dag_modelling.bundles.file_reader import FileReader
+from numpy import allclose, array_equal
+
+from dayabay_model import model_dayabay
+from dayabay_model.tools.prefetch import prefetch_files
+
+
+def test_prefetch_files_tsv(tmp_path):
+    path = tmp_path / "daily_data.tsv"
+    path.mkdir()
+    for detector in ("AD11", "AD12", "AD21"):
+        content = "day\tlivetime\n0\t86400.0\n1\t43200.0\n"
+        (path / f"daily_data_{detector}.tsv.bz2").write_bytes(compress(content.encode()))
+    (tmp_path / "matrix_iav.tsv").write_text("1.0 0.5\n0.0 1.0\n")
+
+    items = (
+        (path, "record"),
+        (tmp_path / "matrix.tsv", "array"),
+        (tmp_path / "missing.tsv", "hist"),
+    )
+    with FileReader:
+        assert prefetch_files(items, 2) == 4
+        reader = FileReader[path]
+        assert set(reader._read_objects) == {"AD11", "AD12", "AD21"}
+        record = FileReader.record[path, "AD12"]
+        assert array_equal(record["livetime"], [86400.0, 43200.0])
+        assert array_equal(
+            FileReader.array[tmp_path / "matrix.tsv", "iav"], [[1.0, 0.5], [0.0, 1.0]]
+        )
+
+
+def test_model_dayabay_prefetch():
+    model = model_dayabay()
+    model_prefetch = model_dayabay(prefetch_threads=4)
+
+    for name in (
+        "outputs.eventscount.final.concatenated.selected",
+        "outputs.data.real.concatenated.selected",
+        "outputs.statistic.full.pull.chi2cnp",
+    ):
+        assert allclose(model.storage[name].data, model_prefetch.storage[name].data, rtol=0, atol=0)
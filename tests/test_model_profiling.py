@@ -0,0 +1,33 @@
+from dayabay_model import model_dayabay
+
+
+def test_model_dayabay_profiling():
+    model = model_dayabay(profiling=True, statistics=("statistic.full.pull.chi2cnp",))
+    storage = model.storage
+    output = storage["outputs.statistic.full.pull.chi2cnp"]
+    output.data
+    model.make_profiling_table(reset=True)
+
+    nevaluations = 3
+    parameter = storage["parameters.all.survival_probability.SinSq2Theta13"]
+    for i in range(nevaluations):
+        parameter.value = 0.08 + 0.001 * i
+        output.data
+
+    table_path = model.make_profiling_table()
+    assert table_path["time"].is_monotonic_decreasing
+    nintegrals = len(list(storage["nodes.kinematics.integral"].walkvalues()))
+    assert table_path.loc["kinematics.integral", "calls"] == nevaluations * nintegrals
+    assert table_path.loc["kinematics.integral", "nbytes"] > 0
+
+    table_node = model.make_profiling_table("node")
+    table_detector = model.make_profiling_table("detector")
+    assert set(model.index["detector"]) <= set(table_detector.index)
+    for table in (table_node, table_detector):
+        assert table["calls"].sum() == table_path["calls"].sum()
+
+    # The nodes, built on demand, are profiled as well
+    model.make_summary_table()
+    table_path = model.make_profiling_table(depth=1, reset=True)
+    assert table_path.loc["summary", "calls"] > 0
+    assert model.make_profiling_table()["calls"].sum() == 0
@@ -0,0 +1,51 @@
+from dag_modelling.core.graph import Graph
+from dag_modelling.lib.common import Array
+from dag_modelling.lib.hist import RebinMatrix
+from numpy import allclose, array_equal, linspace
+
+from dayabay_model import model_dayabay
+from dayabay_model.lib import RebinSegments, RebinSegmentSum
+
+
+def test_model_dayabay_rebin_segments():
+    model = model_dayabay(rebin_mode="segments")
+    storage = model.storage
+    segments_output = storage["outputs.detector.rebin.segments"]
+    edges_old = storage["outputs.edges.energy_erec"].data
+    edges_new = storage["outputs.edges.energy_final"].data
+
+    with Graph(close_on_exit=True):
+        edges_old_array = Array("edges_old", edges_old)
+        edges_new_array = Array("edges_new", edges_new)
+        rebin_matrix = RebinMatrix("matrix")
+        edges_old_array >> rebin_matrix.inputs["edges_old"]
+        edges_new_array >> rebin_matrix.inputs["edges_new"]
+    matrix = rebin_matrix.outputs["matrix"].data
+
+    nodes = [node for node in storage["nodes"].walkvalues() if isinstance(node, RebinSegmentSum)]
+    assert len(nodes) > 21
+    for node in nodes:
+        assert node.inputs["segments"].parent_output is segments_output
+        assert array_equal(node.dense_matrix(), matrix)
+        expected = matrix @ node.inputs["vector"].data
+        assert allclose(node.outputs["result"].data, expected, rtol=1e-14, atol=0)
+
+    name = "eventscount.final.concatenated.selected"
+    parameter_grid = {"survival_probability.SinSq2Theta13": linspace(0.07, 0.1, 3)}
+    result_batch = model.evaluate_batch(parameter_grid, (name,), mode="batch")
+    result_loop = model.evaluate_batch(parameter_grid, (name,), mode="loop")
+    assert allclose(result_batch[name], result_loop[name], rtol=1e-10, atol=0)
+
+
+def test_model_dayabay_rebin_auto():
+    model = model_dayabay(rebin_mode="auto")
+    outputs = model.storage("outputs")
+    assert "detector.rebin.segments" in outputs
+    assert "detector.rebin.matrix_ibd" not in outputs
+
+    edges_old = outputs["edges.energy_erec"].data
+    edges_new = outputs["edges.energy_final"].data
+    assert RebinSegments.edges_are_aligned(edges_old, edges_new)
+    assert not RebinSegments.edges_are_aligned(edges_old, edges_new + 0.025)
+    assert not RebinSegments.edges_are_aligned(edges_old, [-1.0, 1.0])
+    assert not RebinSegments.edges_are_aligned(edges_old, [1.0, 13.0])
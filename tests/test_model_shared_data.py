@@ -0,0 +1,34 @@
+from pathlib import Path
+
+from numpy import array_equal, memmap
+
+from dayabay_model import model_dayabay
+
+
+def test_model_dayabay_shared_data(tmp_path):
+    models = [
+        model_dayabay(),
+        model_dayabay(shared_data=tmp_path),  # write the data
+        model_dayabay(shared_data=tmp_path),  # map the data
+    ]
+
+    # The files are named by the storage keys and the hashes of the data
+    (path_matrix,) = tmp_path.glob("shared_data_*/detector.iav.matrix_raw_*.npy")
+
+    for model in models[1:]:
+        matrix = model.storage["outputs.detector.iav.matrix_raw"]._data
+        assert Path(matrix.filename) == path_matrix.resolve()
+        assert isinstance(matrix, memmap)
+        assert not matrix.flags.writeable
+
+    def check_outputs():
+        for name in ("eventscount.final.concatenated.selected", "statistic.full.pull.chi2cnp"):
+            expected = models[0].storage["outputs"][name].data
+            for model in models[1:]:
+                assert array_equal(model.storage["outputs"][name].data, expected)
+
+    check_outputs()
+
+    for model in models:
+        model.storage["parameters.all.survival_probability.SinSq2Theta13"].value = 0.09
+    check_outputs()
@@ -0,0 +1,25 @@
+from numpy import allclose
+from numpy.random import SeedSequence
+
+from dayabay_model import model_dayabay
+from dayabay_model.tools.toymc import generate_toys
+
+
+def test_model_dayabay_toymc_reproducible():
+    model = model_dayabay(monte_carlo_mode="poisson")
+
+    ntoys = 6
+    seeds = SeedSequence(1).spawn(ntoys)
+    outputs = ("data.pseudo.self", "statistic.stat.chi2cnp")
+
+    result = generate_toys(model, seeds, outputs)
+    for name in outputs:
+        assert result[name].shape[0] == ntoys
+    assert not allclose(result["data.pseudo.self"][0], result["data.pseudo.self"][1])
+
+    # The order of generation should not affect the pseudo-experiments
+    result_second = generate_toys(model, seeds[ntoys // 2 :], outputs)
+    result_first = generate_toys(model, seeds[: ntoys // 2], outputs)
+    for name in outputs:
+        assert allclose(result[name][: ntoys // 2], result_first[name], rtol=0, atol=0)
+        assert allclose(result[name][ntoys // 2 :], result_second[name], rtol=0, atol=0)
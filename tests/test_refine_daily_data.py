@@ -0,0 +1,101 @@
+from nested_mapping import NestedMapping
+from numpy import arange, array_equal, concatenate, full, random
+from pytest import raises
+
+from dayabay_model.bundles.refine_daily_data import refine_daily_data
+
+detectors = ("AD1", "AD2", "AD3")
+reactors = ("R1", "R2")
+columns = ("livetime", "eff")
+
+
+def make_sources(nweeks: int, seed: int = 1) -> tuple[NestedMapping, NestedMapping]:
+    rng = random.default_rng(seed)
+    ndays = nweeks * 7
+    # Detector data starts 3 days after the reactor data and contains the days out of periods
+    day = arange(3, ndays - 4)
+    n = day.size // 4
+    ndet = concatenate([full(n, 6), full(n, 0), full(n, 8), full(day.size - 3 * n, 7)])
+    detector = {"day": {}, "n_det": {}} | {column: {} for column in columns}
+    for name in detectors:
+        detector["day"][name] = day
+        detector["n_det"][name] = ndet
+        for column in columns:
+            detector[column][name] = rng.random(day.size)
+
+    n_det_mask = full(nweeks, 0)
+    for period, bit in ((6, 0b001), (8, 0b010), (7, 0b100)):
+        days_p = day[ndet == period]
+        n_det_mask[days_p[0] // 7 : days_p[-1] // 7 + 1] |= bit
+    reactor = {
+        "period": {name: arange(nweeks) for name in reactors},
+        "day": {name: arange(nweeks) * 7 for name in reactors},
+        "n_days": {name: full(nweeks, 7) for name in reactors},
+        "n_det_mask": {name: n_det_mask for name in reactors},
+        "neutrino_rate_per_s": {name: rng.random(nweeks) for name in reactors},
+    }
+
+    return NestedMapping(detector, sep="."), NestedMapping(reactor, sep=".")
+
+
+def test_refine_daily_data():
+    detector, reactor = make_sources(100)
+    detector_copy, reactor_copy = detector.deepcopy(), reactor.deepcopy()
+    target = NestedMapping({}, sep=".")
+    skip = ({"8AD", "AD2"},)
+    refine_daily_data(
+        detector,
+        reactor,
+        target,
+        detectors=detectors,
+        reactors=reactors,
+        columns=columns,
+        skip=skip,
+    )
+    assert not tuple(detector.walkkeys())
+    assert not tuple(reactor.walkkeys())
+
+    for period in ("6AD", "8AD", "7AD"):
+        mask = detector_copy["n_det", "AD1"] == int(period[0])
+        days = detector_copy["day", "AD1"][mask]
+        assert array_equal(target["detector", "days", period], days)
+        assert array_equal(target["reactor", "days", period], days)
+
+        for column in columns:
+            for name in detectors:
+                key = ("detector", column, period, name)
+                if period == "8AD" and name == "AD2":
+                    assert key not in target
+                    continue
+                assert array_equal(target[key], detector_copy[column, name][mask])
+
+        for name in reactors:
+            expected = reactor_copy["neutrino_rate_per_s", name][days // 7]
+            assert array_equal(target["reactor", "antineutrino_rate_per_s", name, period], expected)
+
+
+def test_refine_daily_data_inconsistent():
+    detector, reactor = make_sources(20)
+    detector["day", "AD2"] = detector["day", "AD2"] + 1
+    with raises(RuntimeError):
+        refine_daily_data(
+            detector,
+            reactor,
+            NestedMapping({}),
+            detectors=detectors,
+            reactors=reactors,
+            columns=columns,
+        )
+
+    detector, reactor = make_sources(20)
+    reactor["day", "R1"] = reactor["day", "R1"] + 7
+    reactor["day", "R2"] = reactor["day", "R2"] + 7
+    with raises(RuntimeError):
+        refine_daily_data(
+            detector,
+            reactor,
+            NestedMapping({}),
+            detectors=detectors,
+            reactors=reactors,
+            columns=columns,
+        )
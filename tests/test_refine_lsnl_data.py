@@ -0,0 +1,63 @@
+from nested_mapping import NestedMapping
+from numpy import allclose, array_equal, linspace
+from scipy.interpolate import interp1d
+
+from dayabay_model.bundles.refine_lsnl_data import RefineGraph, refine_lsnl_data
+
+
+def make_storage() -> NestedMapping:
+    x = linspace(1.0, 12.0, 45)
+    curves = {"nominal": 1.0 - 0.1 / x}
+    for i in range(4):
+        curves[f"pull{i}"] = curves["nominal"] * (1.0 + 0.01 * (i + 1) * (x / 12.0) ** 2)
+    return NestedMapping({"escint": x, "evis_parts": curves}, sep=".")
+
+
+def test_refine_lsnl_data():
+    storage = make_storage()
+    source = storage.deepcopy()
+    refine_lsnl_data(
+        storage,
+        xname="escint",
+        nominalname="evis_parts.nominal",
+        refine_times=4,
+        newmin=0.5,
+        newmax=12.1,
+    )
+    x = source["escint"]
+    xfine = storage["escint"]
+    step = (x[1] - x[0]) / 4
+    assert xfine[0] == 0.5 and abs(xfine[-1] - 12.1) < step
+    assert allclose(xfine[1:] - xfine[:-1], step, rtol=1e-10, atol=0)
+
+    refiner = RefineGraph(x, refine_times=4, newmin=0.5, newmax=12.1)
+    xbound = refiner.xfine_bound
+    ileft = refiner.xfine_extended_stack[0].size
+    nominal = source["evis_parts.nominal"]
+    # Reference: each curve is refined separately with its own spline
+    for name, y in source("evis_parts").items():
+        spline = interp1d(x, y * x, kind="cubic")
+        extrapolate = interp1d(xbound, spline(xbound), fill_value="extrapolate")
+        expected = extrapolate(xfine)
+        expected[ileft : ileft + xbound.size] = spline(xbound)
+        if name != "nominal":
+            nominal_fine = storage["evis_parts.nominal"]
+            expected -= nominal_fine
+        assert allclose(storage["evis_parts", name], expected, rtol=1e-12, atol=1e-15)
+
+        assert array_equal(refiner.process(y, nominal), storage["evis_parts", name])
+
+
+def test_refine_lsnl_data_filter():
+    storage = make_storage()
+    source = storage.deepcopy()
+    kwargs = dict(refine_times=4, newmin=0.5, newmax=12.1, savgol_filter_smoothen=(10, 4))
+    refine_lsnl_data(storage, xname="escint", nominalname="evis_parts.nominal", **kwargs)
+
+    refiner = RefineGraph(source["escint"], **kwargs)
+    nominal = source["evis_parts.nominal"]
+    assert array_equal(refiner.process(nominal, nominal), storage["evis_parts.nominal"])
+    for name, y in source("evis_parts").items():
+        assert allclose(
+            refiner.process(y, nominal), storage["evis_parts", name], rtol=0, atol=1e-15
+        )